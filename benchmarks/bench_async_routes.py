@@ -0,0 +1,68 @@
+"""Concurrent GET /current/playing: blocking spotipy inside ``async def`` vs. the async client.
+
+python -m benchmarks.bench_async_routes [--concurrency 20] [--latency-ms 100]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime
+
+from .fake_spotify import running_fake_spotify
+
+
+async def _fire(client, path: str, concurrency: int) -> float:
+    started = time.perf_counter()
+    responses = await asyncio.gather(*[client.get(path) for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    assert all(response.status_code == 200 for response in responses), [r.text for r in responses]
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    with running_fake_spotify(handshake_delay=0, response_delay=args.latency_ms / 1000) as server:
+        os.environ["ENVIRONMENT"] = "local"
+        os.environ["SPOTIFY_API_BASE_URL"] = server.base_url
+        os.environ.setdefault("SPOTIFY_CLIENT_ID", "bench-client-id")
+        os.environ.setdefault("SPOTIFY_CLIENT_SECRET", "bench-client-secret")
+
+        import httpx
+
+        from spotify_api.infrastructure.spotipy import Spotipy
+        from spotify_api.infrastructure.token_info_local_repository import TokenInfoLocalRepository
+        from spotify_api.interface import track
+        from spotify_api.main import app
+
+        TokenInfoLocalRepository().save(
+            {"access_token": "bench-token", "refresh_token": "bench", "expires_at": datetime.now().timestamp() + 3600}
+        )
+
+        # 変更前の実装と同じく、async def の中で同期版のspotipyを呼ぶルート
+        @app.get("/bench/blocking-playing")
+        async def blocking_playing():
+            access_token = track.authorization_service.get_access_token()
+            return {"id": Spotipy.get_instance(access_token=access_token).get_current_playing().id}
+
+        async def run() -> tuple[float, float]:
+            headers = {"access-token": os.environ["SPOTIFY_CLIENT_SECRET"]}
+            async with httpx.AsyncClient(app=app, base_url="http://bench", headers=headers) as client:
+                await _fire(client, "/current/playing", 1)  # ウォームアップ
+                blocking = await _fire(client, "/bench/blocking-playing", args.concurrency)
+                non_blocking = await _fire(client, "/current/playing", args.concurrency)
+            return blocking, non_blocking
+
+        blocking, non_blocking = asyncio.run(run())
+
+    print(f"{args.concurrency} concurrent requests, upstream latency {args.latency_ms}ms")
+    print(f"blocking spotipy in async route  wall={blocking * 1000:8.1f}ms")
+    print(f"AsyncSpotipy                     wall={non_blocking * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
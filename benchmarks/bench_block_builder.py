@@ -0,0 +1,62 @@
+"""Cost of building N Slack blocks: chained add_* calls on BlockBuilder (one list copy per add),
+chained add_* calls on PersistentBlockBuilder (no copy until build) and one add_many.
+
+python -m benchmarks.bench_block_builder [--repeat 20]
+"""
+
+import argparse
+import time
+from collections.abc import Callable
+
+from spotify_api.domain.slack.block_builder import BlockBuilder, PersistentBlockBuilder
+
+SIZES = (10, 100, 1000)
+
+
+def _chained_adds(n: int) -> list[dict]:
+    builder = BlockBuilder()
+    for i in range(n):
+        builder = builder.add_section(text=str(i))
+    return builder.build()
+
+
+def _persistent_adds(n: int) -> list[dict]:
+    builder = PersistentBlockBuilder()
+    for i in range(n):
+        builder = builder.add_section(text=str(i))
+    return builder.build()
+
+
+def _add_many(n: int) -> list[dict]:
+    return (
+        BlockBuilder()
+        .add_many({"type": "section", "text": {"type": "mrkdwn", "text": str(i)}} for i in range(n))
+        .build()
+    )
+
+
+def _measure(build: Callable[[int], list[dict]], n: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        build(n)
+        best = min(best, time.perf_counter() - started)
+    return best * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'blocks':>6}  {'chained adds':>14}  {'persistent':>12}  {'add_many':>10}")
+    for n in SIZES:
+        print(
+            f"{n:>6}  {_measure(_chained_adds, n, args.repeat):>12.1f}us"
+            f"  {_measure(_persistent_adds, n, args.repeat):>10.1f}us"
+            f"  {_measure(_add_many, n, args.repeat):>8.1f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
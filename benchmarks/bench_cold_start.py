@@ -0,0 +1,65 @@
+"""Cold-start import cost of the two Lambda handlers, measured with `python -X importtime`.
+
+Each run imports the handler module in a fresh interpreter, so the numbers include
+everything a new Lambda container pays before the first event is handled.
+
+python -m benchmarks.bench_cold_start [--runs 5] [--top 10]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+HANDLERS = ("spotify_api.main", "spotify_api.notificate_current_playing")
+
+# 本番と同じ経路(S3のリポジトリ)でimportさせる。認証情報は使わないのでダミーでよい
+ENV = {
+    "ENVIRONMENT": "prod",
+    "AWS_DEFAULT_REGION": "ap-northeast-1",
+    "SPOTIFY_CLIENT_ID": "dummy",
+    "SPOTIFY_CLIENT_SECRET": "dummy",
+}
+
+
+def _import_times(module: str) -> dict[str, int]:
+    """moduleをimportし、トップレベルのパッケージごとの累積時間(us)を返す"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env={**os.environ, **ENV},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        # "import time:      self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        package = name.strip().split(".")[0]
+        # 同じパッケージの中ではインデントの浅い(=外側の)行の累積時間が最大になる
+        times[package] = max(times.get(package, 0), int(cumulative))
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    for module in HANDLERS:
+        runs = [_import_times(module) for _ in range(args.runs)]
+        total = statistics.median(run[module.split(".")[0]] for run in runs) / 1000
+        print(f"{module}: {total:.1f}ms (median of {args.runs})")
+
+        packages = {name for run in runs for name in run}
+        medians = {name: statistics.median(run.get(name, 0) for run in runs) / 1000 for name in packages}
+        for name, ms in sorted(medians.items(), key=lambda item: item[1], reverse=True)[: args.top]:
+            print(f"  {name:<28} {ms:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Per-request logging overhead on the request thread: the previous logger setup vs. the queue-backed one.
+
+One "request" logs what a GET /track/{id} + Slack notification does at INFO level: an access
+token and a track payload at DEBUG (filtered out), three Slack API calls and one stats line at INFO.
+The sink sleeps ``--sink-delay-us`` per write to stand in for a slow stdout consumer.
+
+python -m benchmarks.bench_logging [--requests 2000] [--sink-delay-us 50]
+"""
+
+import argparse
+import io
+import logging
+import os
+import sys
+import time
+
+from .fake_spotify import track_payload
+
+os.environ.setdefault("ENVIRONMENT", "prod")
+os.environ.pop("AWS_LAMBDA_FUNCTION_NAME", None)
+
+SLACK_METHODS = ("conversations.history", "chat.postMessage", "chat.postMessage")
+
+
+class _SlowSink(io.TextIOBase):
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.writes = 0
+
+    def write(self, s: str) -> int:
+        self.writes += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return len(s)
+
+
+def _before(sink: _SlowSink) -> tuple[logging.Logger, logging.Logger]:
+    """以前のget_logger: loggerごとにStreamHandlerを付けて、呼び出したスレッドで書き込む"""
+    loggers = []
+    for name in ("bench.before.app", "bench.before.slack"):
+        logger = logging.getLogger(name)
+        logger.setLevel(logging.INFO)
+        handler = logging.StreamHandler(sink)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)8s %(message)s"))
+        logger.addHandler(handler)
+        logger.propagate = False
+        loggers.append(logger)
+    return loggers[0], loggers[1]
+
+
+def _request_before(app_logger: logging.Logger, slack_logger: logging.Logger, track: dict) -> None:
+    app_logger.debug(f"access_token: {'x' * 200}")
+    app_logger.debug(f"{track}")
+    for method in SLACK_METHODS:
+        slack_logger.info(method)
+    app_logger.info(f"notify stats: {track['id']} next_poll_seconds: {30}")
+
+
+def _request_after(app_logger: logging.Logger, slack_logger: logging.Logger, track: dict) -> None:
+    app_logger.debug("%s", track)
+    for method in SLACK_METHODS:
+        slack_logger.info(method)
+    app_logger.info("notify stats: %s next_poll_seconds: %s", track["id"], 30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--sink-delay-us", type=float, default=50.0)
+    args = parser.parse_args()
+    track = track_payload("bench")
+
+    before_sink = _SlowSink(args.sink_delay_us / 1_000_000)
+    app_logger, slack_logger = _before(before_sink)
+    started = time.perf_counter()
+    for _ in range(args.requests):
+        _request_before(app_logger, slack_logger, track)
+    before = (time.perf_counter() - started) / args.requests
+
+    after_sink = _SlowSink(args.sink_delay_us / 1_000_000)
+    sys.stderr, stderr = after_sink, sys.stderr
+    try:
+        from spotify_api import custom_logger
+
+        app_logger = custom_logger.get_logger("bench.after.app")
+        slack_logger = custom_logger.get_logger("bench.after.slack", sample_every=custom_logger.LOG_SAMPLE_EVERY)
+        for logger in (app_logger, slack_logger):
+            logger.propagate = False
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            _request_after(app_logger, slack_logger, track)
+        after = (time.perf_counter() - started) / args.requests
+        custom_logger.shutdown_logging()
+        drained = (time.perf_counter() - started) / args.requests
+    finally:
+        sys.stderr = stderr
+
+    print(f"{args.requests} requests, sink delay {args.sink_delay_us}us per write")
+    print(f"{'':<24}{'request thread':>16}{'until written':>16}{'writes':>10}")
+    print(f"{'StreamHandler (before)':<24}{before * 1e6:>14.1f}us{before * 1e6:>14.1f}us{before_sink.writes:>10}")
+    print(f"{'QueueHandler (after)':<24}{after * 1e6:>14.1f}us{drained * 1e6:>14.1f}us{after_sink.writes:>10}")
+
+
+if __name__ == "__main__":
+    main()
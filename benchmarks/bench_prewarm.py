@@ -0,0 +1,105 @@
+"""Lambda cold start with and without prewarming: init time and latency of the first requests.
+
+Each mode runs in a fresh interpreter against the local fake API, whose per-connection
+``handshake_delay`` stands in for DNS + TLS against the real api.spotify.com.
+
+  off     -- Mangum(app, lifespan="off"), every client is created by the first request that needs it
+  prewarm -- the shipped handler: prewarm during init, lifespan="auto" on each invocation
+
+python -m benchmarks.bench_prewarm [--handshake-ms 80]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from .fake_spotify import running_fake_spotify
+
+MODES = ("off", "prewarm")
+REQUESTS = (
+    ("GET /track/{id} (spotipy)", "/track/first"),
+    ("GET /current/playing (httpx)", "/current/playing"),
+    ("GET /track/{id} (warm)", "/track/second"),
+)
+
+
+def _event(path: str) -> dict:
+    """API Gateway(REST)のイベント"""
+    return {
+        "resource": "/{proxy+}",
+        "path": path,
+        "httpMethod": "GET",
+        "headers": {"access-token": os.environ["SPOTIFY_CLIENT_SECRET"]},
+        "multiValueHeaders": {},
+        "queryStringParameters": None,
+        "multiValueQueryStringParameters": None,
+        "requestContext": {"resourcePath": "/{proxy+}", "httpMethod": "GET", "path": path, "stage": "bench"},
+        "body": None,
+        "isBase64Encoded": False,
+    }
+
+
+def _child(mode: str, handshake_ms: float) -> None:
+    with running_fake_spotify(handshake_delay=handshake_ms / 1000) as server:
+        os.environ["ENVIRONMENT"] = "local"
+        os.environ["SPOTIFY_API_BASE_URL"] = server.base_url
+        if mode == "prewarm":
+            os.environ["AWS_LAMBDA_FUNCTION_NAME"] = "bench"
+
+        from spotify_api.infrastructure.token_info_local_repository import TokenInfoLocalRepository
+
+        TokenInfoLocalRepository().save(
+            {"access_token": "bench-token", "refresh_token": "bench", "expires_at": datetime.now().timestamp() + 3600}
+        )
+
+        started = time.perf_counter()
+        from mangum import Mangum
+
+        from spotify_api.main import app, handler
+
+        if mode == "off":
+            handler = Mangum(app, lifespan="off")
+        init_ms = (time.perf_counter() - started) * 1000
+
+        latencies = []
+        for _, path in REQUESTS:
+            started = time.perf_counter()
+            response = handler(_event(path), None)
+            latencies.append((time.perf_counter() - started) * 1000)
+            assert response["statusCode"] == 200, response
+        print(json.dumps({"init_ms": init_ms, "latencies_ms": latencies, "connections": server.connections}))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--handshake-ms", type=float, default=80.0)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child, args.handshake_ms)
+        return
+
+    env = {**os.environ, "SPOTIFY_CLIENT_ID": "bench-client-id", "SPOTIFY_CLIENT_SECRET": "bench-client-secret"}
+    env.pop("AWS_LAMBDA_FUNCTION_NAME", None)
+    print(f"handshake {args.handshake_ms}ms per new connection")
+    print(f"{'':<30}" + "".join(f"{mode:>12}" for mode in MODES))
+    results = {}
+    for mode in MODES:
+        command = [sys.executable, "-m", "benchmarks.bench_prewarm", "--child", mode]
+        command += ["--handshake-ms", str(args.handshake_ms)]
+        output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{'init (import + prewarm)':<30}" + "".join(f"{results[m]['init_ms']:>10.1f}ms" for m in MODES))
+    for i, (label, _) in enumerate(REQUESTS):
+        print(f"{label:<30}" + "".join(f"{results[m]['latencies_ms'][i]:>10.1f}ms" for m in MODES))
+    print(f"{'upstream connections':<30}" + "".join(f"{results[m]['connections']:>12}" for m in MODES))
+
+
+if __name__ == "__main__":
+    main()
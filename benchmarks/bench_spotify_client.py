@@ -0,0 +1,66 @@
+"""Per-request latency of a fresh spotipy.Spotify per request vs. the shared pooled client.
+
+python -m benchmarks.bench_spotify_client [--requests 200] [--handshake-ms 20]
+"""
+
+import argparse
+import os
+import statistics
+import time
+from collections.abc import Callable
+
+os.environ.setdefault("ENVIRONMENT", "local")
+
+import spotipy  # noqa: E402
+
+from spotify_api.infrastructure import spotipy as spotipy_module  # noqa: E402
+from spotify_api.infrastructure.spotipy import Spotipy  # noqa: E402
+
+from .fake_spotify import running_fake_spotify  # noqa: E402
+
+
+def _measure(n: int, get_client: Callable[[], Spotipy]) -> list[float]:
+    samples = []
+    for i in range(n):
+        started = time.perf_counter()
+        get_client().get_track(f"track{i % 10}")
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def _report(label: str, samples: list[float]) -> None:
+    p95 = statistics.quantiles(samples, n=20)[-1]
+    print(
+        f"{label:<28} mean={statistics.mean(samples):7.2f}ms  p50={statistics.median(samples):7.2f}ms  p95={p95:7.2f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--handshake-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    with running_fake_spotify(handshake_delay=args.handshake_ms / 1000) as server:
+        spotipy_module.API_BASE_URL = server.base_url
+
+        def fresh_client() -> Spotipy:
+            sp = spotipy.Spotify(auth="bench-token")
+            sp.prefix = server.base_url
+            return Spotipy(sp)
+
+        connections_before = server.connections
+        fresh = _measure(args.requests, fresh_client)
+        fresh_connections = server.connections - connections_before
+
+        connections_before = server.connections
+        pooled = _measure(args.requests, lambda: Spotipy.get_instance(access_token="bench-token"))
+        pooled_connections = server.connections - connections_before
+
+    print(f"{args.requests} GET /tracks/{{id}} against {server.base_url} (simulated handshake {args.handshake_ms}ms)")
+    _report(f"fresh client ({fresh_connections} conns)", fresh)
+    _report(f"shared client ({pooled_connections} conns)", pooled)
+
+
+if __name__ == "__main__":
+    main()
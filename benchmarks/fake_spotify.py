@@ -0,0 +1,121 @@
+"""Local stand-in for api.spotify.com used by the benchmarks.
+
+Each new TCP connection pays ``handshake_delay`` seconds (a stand-in for the TLS
+handshake against the real API) and each request pays ``response_delay`` seconds.
+"""
+
+import json
+import re
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def track_payload(track_id: str) -> dict:
+    return {
+        "album": {
+            "name": "Bench Album",
+            "id": "album123",
+            "release_date": "2024-01-15",
+            "images": [{"url": "https://example.com/cover.jpg"}],
+        },
+        "artists": [{"name": "Bench Artist", "id": "artist123"}],
+        "available_markets": ["JP", "US"],
+        "disc_number": 1,
+        "duration_ms": 180000,
+        "explicit": False,
+        "external_ids": {"isrc": "BENCH1234567"},
+        "external_urls": {"spotify": f"https://open.spotify.com/track/{track_id}"},
+        "href": f"https://api.spotify.com/v1/tracks/{track_id}",
+        "id": track_id,
+        "is_local": False,
+        "name": f"Bench Track {track_id}",
+        "popularity": 50,
+        "preview_url": None,
+        "track_number": 1,
+        "type": "track",
+        "uri": f"spotify:track:{track_id}",
+    }
+
+
+class FakeSpotifyServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, handshake_delay: float = 0.02, response_delay: float = 0.0) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.handshake_delay = handshake_delay
+        self.response_delay = response_delay
+        self.connections = 0
+        self.requests = 0
+        self._counter_lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1/"
+
+    def count(self, attr: str) -> None:
+        with self._counter_lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: FakeSpotifyServer
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.count("connections")
+        time.sleep(self.server.handshake_delay)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self.server.count("requests")
+        time.sleep(self.server.response_delay)
+        path = self.path.split("?")[0]
+        if m := re.fullmatch(r"/v1/tracks/(\w+)", path):
+            self._send(200, track_payload(m.group(1)))
+        elif path == "/v1/tracks":
+            ids = re.search(r"ids=([\w,%]+)", self.path)
+            track_ids = ids.group(1).replace("%2C", ",").split(",") if ids else []
+            self._send(200, {"tracks": [track_payload(t) for t in track_ids]})
+        elif path == "/v1/me/player/currently-playing":
+            self._send(200, {"is_playing": True, "progress_ms": 1000, "item": track_payload("playing")})
+        elif path == "/v1/me/tracks/contains":
+            ids = re.search(r"ids=([\w,%]+)", self.path)
+            count = len(ids.group(1).replace("%2C", ",").split(",")) if ids else 0
+            self._send(200, [False] * count)
+        else:
+            self._send(404, {"error": {"status": 404, "message": "not found"}})
+
+    def do_PUT(self) -> None:
+        self.server.count("requests")
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        time.sleep(self.server.response_delay)
+        self._send(200, None)
+
+    def _send(self, status: int, payload: object) -> None:
+        body = b"" if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@contextmanager
+def running_fake_spotify(handshake_delay: float = 0.02, response_delay: float = 0.0) -> Iterator[FakeSpotifyServer]:
+    server = FakeSpotifyServer(handshake_delay=handshake_delay, response_delay=response_delay)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
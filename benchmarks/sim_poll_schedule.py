@@ -0,0 +1,132 @@
+"""Simulated now-playing polling: fixed one-minute schedule vs. PollScheduler.
+
+python -m benchmarks.sim_poll_schedule [--hours 24] [--seed 0]
+
+A synthetic listening day (tracks of mixed length, skips, idle gaps) is replayed
+against both schedules. Reports API calls per hour, how many tracks were never
+observed, and how long after a track started it was first seen. Fails if the
+adaptive schedule misses more tracks than the fixed one.
+"""
+
+import argparse
+import bisect
+import random
+import statistics
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from spotify_api.domain.model.playback import Playback
+from spotify_api.domain.model.track import Track
+from spotify_api.service.poll_scheduler import PollScheduler
+
+FIXED_INTERVAL_SECONDS = 60.0
+
+
+@dataclass(frozen=True)
+class Segment:
+    start: float
+    end: float
+    # 再生中のトラック。Noneなら何も再生していない
+    track_id: str | None
+    duration_ms: int
+
+
+def _track(track_id: str, duration_ms: int) -> Track:
+    return Track(
+        album={},
+        artists=[],
+        available_markets=[],
+        disc_number=1,
+        duration_ms=duration_ms,
+        explicit=False,
+        external_ids={},
+        external_urls={},
+        href="",
+        id=track_id,
+        is_local=False,
+        name=track_id,
+        popularity=0,
+        preview_url=None,
+        track_number=1,
+        type="track",
+        uri="",
+    )
+
+
+def build_timeline(hours: float, rng: random.Random) -> list[Segment]:
+    segments: list[Segment] = []
+    t = 0.0
+    end = hours * 3600
+    n = 0
+    while t < end:
+        if rng.random() < 0.04:
+            gap = rng.uniform(300, 3600)
+            segments.append(Segment(t, t + gap, None, 0))
+            t += gap
+            continue
+        # 1分未満の短い曲もそれなりに混ぜる
+        duration = rng.uniform(20, 60) if rng.random() < 0.15 else rng.uniform(120, 420)
+        # 2割はスキップされて途中で次の曲に変わる
+        played = duration * rng.uniform(0.1, 0.9) if rng.random() < 0.2 else duration
+        segments.append(Segment(t, t + played, f"track{n}", int(duration * 1000)))
+        n += 1
+        t += played
+    return segments
+
+
+def simulate(segments: list[Segment], hours: float, next_delay: Callable[[Playback | None], float]) -> dict:
+    starts = [s.start for s in segments]
+    end = hours * 3600
+    first_seen: dict[str, float] = {}
+    calls = 0
+    t = 0.0
+    while t < end:
+        calls += 1
+        segment = segments[bisect.bisect_right(starts, t) - 1]
+        playback = None
+        if segment.track_id is not None:
+            first_seen.setdefault(segment.track_id, t - segment.start)
+            progress_ms = int((t - segment.start) * 1000)
+            playback = Playback(
+                track=_track(segment.track_id, segment.duration_ms), progress_ms=progress_ms, is_playing=True
+            )
+        t += next_delay(playback)
+
+    tracks = [s for s in segments if s.track_id is not None and s.start < end]
+    return {
+        "calls_per_hour": calls / hours,
+        "tracks": len(tracks),
+        "missed": len(tracks) - len(first_seen),
+        "latency": list(first_seen.values()),
+    }
+
+
+def _report(label: str, result: dict) -> None:
+    latency = result["latency"]
+    p95 = statistics.quantiles(latency, n=20)[-1] if len(latency) > 1 else 0.0
+    print(
+        f"{label:<10} calls/h={result['calls_per_hour']:6.1f}  "
+        f"missed={result['missed']:4d}/{result['tracks']:<5d}  "
+        f"first_seen mean={statistics.mean(latency):6.1f}s p95={p95:6.1f}s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    segments = build_timeline(args.hours, random.Random(args.seed))
+    fixed = simulate(segments, args.hours, lambda playback: FIXED_INTERVAL_SECONDS)
+    adaptive = simulate(segments, args.hours, PollScheduler().next_delay)
+    _report("fixed", fixed)
+    _report("adaptive", adaptive)
+    # 呼び出し回数を減らしても、毎分実行より取りこぼす曲が増えるなら意味がない
+    assert adaptive["missed"] <= fixed["missed"], (
+        f"adaptive schedule missed {adaptive['missed']} tracks, fixed missed {fixed['missed']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,82 @@
+import atexit
 import logging
+import os
+import queue
+import threading
 from logging import Logger
+from logging.handlers import QueueHandler, QueueListener
 
 from .util.environment import Environment
 
 LOG_FILE_NAME = "app.log"
+LOG_FORMAT = "%(asctime)s %(levelname)8s %(message)s"
+# 1件ごとに出るINFOログ(Slack APIの呼び出しなど)は、この件数に1件だけ出力する
+LOG_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", "10"))
 
+_lock = threading.Lock()
+_handler: logging.Handler | None = None
+_listener: QueueListener | None = None
 
-def get_logger(name: str | None = None) -> Logger:
+
+class SamplingFilter(logging.Filter):
+    """
+    INFO以下のログを、メッセージ(の書式)ごとにevery件に1件だけ通す。WARNING以上は必ず通す
+    """
+
+    def __init__(self, every: int) -> None:
+        super().__init__()
+        self.every = max(every, 1)
+        self._lock = threading.Lock()
+        self._counts: dict[str, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        key = str(record.msg)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % self.every == 0
+
+
+def _get_handler() -> logging.Handler:
+    """
+    全loggerで共有するハンドラを取得する。
+    Lambda以外ではQueueHandler経由で別スレッドから出力し、リクエストを処理するスレッドでI/Oを待たない
+    (Lambdaは呼び出しの間プロセスが凍結され、出力前のログが遅れるので直接出力する)
+    """
+    global _handler, _listener
+    if _handler is None:
+        with _lock:
+            if _handler is None:
+                stream_handler = logging.StreamHandler()
+                stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+                if Environment.is_lambda():
+                    _handler = stream_handler
+                else:
+                    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+                    _listener = QueueListener(log_queue, stream_handler)
+                    _listener.start()
+                    # プロセス終了時に、キューに残ったログを出力してから止める
+                    atexit.register(shutdown_logging)
+                    _handler = QueueHandler(log_queue)
+    return _handler
+
+
+def shutdown_logging() -> None:
+    """キューに残ったログを出力して、出力用のスレッドを止める(何度呼んでもよい)"""
+    global _listener
+    with _lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+
+def get_logger(name: str | None = None, sample_every: int | None = None) -> Logger:
+    """
+    loggerを取得する。同じnameで何度呼んでもハンドラは1つだけ付ける。
+    sample_everyを指定すると、INFO以下のログをその件数に1件だけ出力する
+    """
     logger = logging.getLogger(name)
 
     if Environment.is_dev():
@@ -14,10 +84,12 @@ def get_logger(name: str | None = None) -> Logger:
     else:
         logger.setLevel(logging.INFO)
 
-    # handler1: 標準出力
-    handler1 = logging.StreamHandler()
-    handler1.setFormatter(logging.Formatter("%(asctime)s %(levelname)8s %(message)s"))
-    logger.addHandler(handler1)
+    handler = _get_handler()
+    if handler not in logger.handlers:
+        logger.addHandler(handler)
+
+    if sample_every is not None and not any(isinstance(f, SamplingFilter) for f in logger.filters):
+        logger.addFilter(SamplingFilter(every=sample_every))
 
     # if os.getenv("ENVIRONMENT") == "dev":
     #     # handler2を作成: ファイル出力
@@ -0,0 +1,23 @@
+from abc import ABCMeta, abstractmethod
+
+from ..model.daily_digest import DailyDigest
+
+
+class DailyDigestRepository(metaclass=ABCMeta):
+    """
+    日ごとのダイジェスト(投稿したメッセージと曲の一覧)を管理する
+    """
+
+    @abstractmethod
+    def load(self, day: str) -> DailyDigest | None:
+        """
+        指定した日(YYYY-MM-DD)のダイジェストを取得する。まだない場合はNoneを返す
+        """
+        pass
+
+    @abstractmethod
+    def save(self, digest: DailyDigest) -> bool:
+        """
+        ダイジェストを保存する
+        """
+        pass
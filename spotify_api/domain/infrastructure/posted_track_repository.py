@@ -0,0 +1,22 @@
+from abc import ABCMeta, abstractmethod
+
+
+class PostedTrackRepository(metaclass=ABCMeta):
+    """
+    Slackに投稿済みのトラックIDを日付ごとに管理する
+    """
+
+    @abstractmethod
+    def load(self, day: str) -> set[str] | None:
+        """
+        指定した日(YYYY-MM-DD)に投稿済みのトラックIDを取得する。
+        まだ記録がない場合はNoneを返す
+        """
+        pass
+
+    @abstractmethod
+    def save(self, day: str, track_ids: set[str]) -> bool:
+        """
+        指定した日(YYYY-MM-DD)に投稿済みのトラックIDを保存する
+        """
+        pass
@@ -2,6 +2,12 @@ from abc import ABCMeta, abstractmethod
 from typing import Any
 
 
+class TokenInfoConflictError(Exception):
+    """
+    条件付き保存の時点で、保存先のトークン情報が他のプロセスに更新されていた
+    """
+
+
 class TokenInfoRepository(metaclass=ABCMeta):
     """
     Spotifyのトークン情報を管理する
@@ -20,3 +26,18 @@ class TokenInfoRepository(metaclass=ABCMeta):
         トークン情報を取得する
         """
         pass
+
+    def load_with_version(self) -> tuple[dict[str, Any] | None, str | None]:
+        """
+        トークン情報と、そのバージョン(S3ならETag)を取得する。
+        バージョンを管理しない保存先ではNoneを返す
+        """
+        return self.load(), None
+
+    def save_if_unchanged(self, token_info: dict[str, Any], version: str | None) -> bool:
+        """
+        保存先のトークン情報がversionから変わっていない場合のみ保存する。
+        先に他のプロセスが保存していた場合はTokenInfoConflictErrorを送出する。
+        バージョンを管理しない保存先では無条件に保存する
+        """
+        return self.save(token_info=token_info)
@@ -0,0 +1,52 @@
+from dataclasses import dataclass, field
+
+
+@dataclass
+class DigestTrack:
+    track_id: str
+    title: str
+
+
+@dataclass
+class DigestMessage:
+    """ダイジェストとして投稿したSlackのメッセージ1件"""
+
+    channel: str
+    ts: str
+    tracks: list[DigestTrack] = field(default_factory=list)
+
+
+@dataclass
+class DailyDigest:
+    """1日に聴いた曲をまとめたSlackのメッセージ群"""
+
+    day: str
+    messages: list[DigestMessage] = field(default_factory=list)
+
+    def track_ids(self) -> set[str]:
+        return {track.track_id for message in self.messages for track in message.tracks}
+
+    def to_dict(self) -> dict:
+        return {
+            "day": self.day,
+            "messages": [
+                {
+                    "channel": message.channel,
+                    "ts": message.ts,
+                    "tracks": [{"track_id": t.track_id, "title": t.title} for t in message.tracks],
+                }
+                for message in self.messages
+            ],
+        }
+
+    @staticmethod
+    def from_dict(obj: dict) -> "DailyDigest":
+        messages = [
+            DigestMessage(
+                channel=message["channel"],
+                ts=message["ts"],
+                tracks=[DigestTrack(track_id=t["track_id"], title=t["title"]) for t in message["tracks"]],
+            )
+            for message in obj["messages"]
+        ]
+        return DailyDigest(day=obj["day"], messages=messages)
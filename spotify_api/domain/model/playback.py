@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+
+from .track import Track
+
+
+@dataclass(frozen=True)
+class Playback:
+    """再生中のトラックと、その再生位置"""
+
+    track: Track
+    progress_ms: int
+    is_playing: bool
@@ -1,12 +1,20 @@
 import json
+from abc import ABCMeta, abstractmethod
+from collections.abc import Iterable
 from dataclasses import dataclass, field
+from typing import Self
 
 
-@dataclass(frozen=True)
-class BlockBuilder:
-    blocks: list[dict] = field(default_factory=list)
+class _BlockMethods(metaclass=ABCMeta):
+    """
+    ブロックを追加するメソッド。追加するたびに新しいビルダーを返し、元のビルダーは変えない
+    """
 
-    def add_checkboxes(self, action_id: str, header: str, options: list[dict[str, str]]) -> "BlockBuilder":
+    def add_many(self, blocks: Iterable[dict]) -> Self:
+        """組み立て済みのブロックをまとめて追加する(BlockBuilderでもコピーは1回で済む)"""
+        return self._extend(blocks)
+
+    def add_checkboxes(self, action_id: str, header: str, options: list[dict[str, str]]) -> Self:
         """チェックボックスを追加する
 
         Args:
@@ -26,9 +34,9 @@ class BlockBuilder:
             "text": {"type": "mrkdwn", "text": header},
             "accessory": {"type": "checkboxes", "options": accessory_options, "action_id": action_id},
         }
-        return BlockBuilder(blocks=self.blocks + [block])
+        return self._extend([block])
 
-    def add_checkboxes_action(self, action_id: str, options: list[dict[str, str]]) -> "BlockBuilder":
+    def add_checkboxes_action(self, action_id: str, options: list[dict[str, str]]) -> Self:
         """チェックボックスを追加する (アクション用)
 
         Args:
@@ -50,11 +58,9 @@ class BlockBuilder:
             "type": "actions",
             "elements": [{"type": "checkboxes", "options": element_options, "action_id": action_id}],
         }
-        return BlockBuilder(blocks=self.blocks + [block])
+        return self._extend([block])
 
-    def add_plain_text_input(
-        self, action_id: str, label: str, multiline: bool = False, optional=False
-    ) -> "BlockBuilder":
+    def add_plain_text_input(self, action_id: str, label: str, multiline: bool = False, optional=False) -> Self:
         block = {
             "type": "input",
             "element": {"type": "plain_text_input", "multiline": multiline, "action_id": action_id},
@@ -64,7 +70,7 @@ class BlockBuilder:
             },
             "optional": optional,
         }
-        return BlockBuilder(blocks=self.blocks + [block])
+        return self._extend([block])
 
     def add_multi_static_select(
         self,
@@ -73,7 +79,7 @@ class BlockBuilder:
         label: str = "選択",
         placeholder: str = "選択してください",
         optional: bool = False,
-    ) -> "BlockBuilder":
+    ) -> Self:
         return self.add_static_select(
             action_id=action_id, options=options, label=label, placeholder=placeholder, is_multi=True, optional=optional
         )
@@ -86,7 +92,7 @@ class BlockBuilder:
         placeholder: str = "選択してください",
         is_multi: bool = False,
         optional: bool = False,
-    ) -> "BlockBuilder":
+    ) -> Self:
         element_options = [
             {"text": {"type": "plain_text", "text": option["text"]}, "value": option["value"]} for option in options
         ]
@@ -101,11 +107,9 @@ class BlockBuilder:
             "label": {"type": "plain_text", "text": label},
             "optional": optional,
         }
-        return BlockBuilder(blocks=self.blocks + [block])
+        return self._extend([block])
 
-    def add_datepicker(
-        self, action_id: str, header: str, placeholder: str, initial_date: str | None = None
-    ) -> "BlockBuilder":
+    def add_datepicker(self, action_id: str, header: str, placeholder: str, initial_date: str | None = None) -> Self:
         accessory = {
             "type": "datepicker",
             "action_id": action_id,
@@ -113,11 +117,11 @@ class BlockBuilder:
             "placeholder": {"type": "plain_text", "text": placeholder},
         }
         block = {"type": "section", "text": {"type": "mrkdwn", "text": header}, "accessory": accessory}
-        return BlockBuilder(blocks=self.blocks + [block])
+        return self._extend([block])
 
     def add_timepicker(
         self, action_id: str, placeholder: str, initial_time: str | None = None, label: str | None = None
-    ) -> "BlockBuilder":
+    ) -> Self:
         element = {
             "type": "timepicker",
             "initial_time": initial_time,
@@ -136,17 +140,17 @@ class BlockBuilder:
                 "type": "plain_text",
                 "text": label,
             }
-        return BlockBuilder(blocks=self.blocks + [block])
+        return self._extend([block])
 
-    def add_mrkdwn_section(self, text: str) -> "BlockBuilder":
+    def add_mrkdwn_section(self, text: str) -> Self:
         block = {"type": "section", "block_id": "mrkdwn-section", "text": {"type": "mrkdwn", "text": text}}
-        return BlockBuilder(blocks=self.blocks + [block])
+        return self._extend([block])
 
-    def add_divider(self) -> "BlockBuilder":
+    def add_divider(self) -> Self:
         block = {"type": "divider"}
-        return BlockBuilder(blocks=self.blocks + [block])
+        return self._extend([block])
 
-    def add_button_action(self, action_id: str, text: str, value: str, style: str = "default") -> "BlockBuilder":
+    def add_button_action(self, action_id: str, text: str, value: str, style: str = "default") -> Self:
         element = {
             "type": "button",
             "text": {"type": "plain_text", "text": text},
@@ -156,25 +160,99 @@ class BlockBuilder:
         }
 
         block = {"type": "actions", "elements": [element]}
-        return BlockBuilder(blocks=self.blocks + [block])
+        return self._extend([block])
+
+    def add_button_section(
+        self, text: str, action_id: str, button_text: str, value: str, style: str = "default"
+    ) -> Self:
+        """テキストの右側にボタンを置いたセクションを追加する"""
+        block = self.button_section_block(
+            text=text, action_id=action_id, button_text=button_text, value=value, style=style
+        )
+        return self._extend([block])
+
+    @staticmethod
+    def button_section_block(text: str, action_id: str, button_text: str, value: str, style: str = "default") -> dict:
+        """add_button_sectionで追加するブロック(add_manyでまとめて追加する場合に使う)"""
+        accessory = {
+            "type": "button",
+            "text": {"type": "plain_text", "text": button_text},
+            "style": style,
+            "value": value,
+            "action_id": action_id,
+        }
+        return {"type": "section", "text": {"type": "mrkdwn", "text": text}, "accessory": accessory}
 
     # 以下、ちょっと勘違いして作ったメソッドかも。
 
-    def add_section(self, text: str) -> "BlockBuilder":
+    def add_section(self, text: str) -> Self:
         section_block = {
             "type": "section",
             "text": {"type": "mrkdwn", "text": text},
         }
-        return BlockBuilder(blocks=self.blocks + [section_block])
+        return self._extend([section_block])
 
-    def add_context(self, text: str | dict) -> "BlockBuilder":
+    def add_context(self, text: str | dict) -> Self:
         context_block = {
             "type": "context",
             "elements": [
                 {"type": "plain_text", "text": json.dumps(text, ensure_ascii=False) if isinstance(text, dict) else text}
             ],
         }
-        return BlockBuilder(blocks=self.blocks + [context_block])
+        return self._extend([context_block])
+
+    @abstractmethod
+    def build(self) -> list[dict]:
+        pass
+
+    @abstractmethod
+    def _extend(self, new_blocks: Iterable[dict]) -> Self:
+        pass
+
+
+@dataclass(frozen=True)
+class BlockBuilder(_BlockMethods):
+    """
+    Slackのブロックを組み立てる。
+    追加するたびにリストをコピーするので、たくさんのブロックはadd_manyでまとめて追加するか、PersistentBlockBuilderを使う
+    """
+
+    blocks: list[dict] = field(default_factory=list)
 
     def build(self) -> list[dict]:
         return self.blocks
+
+    def _extend(self, new_blocks: Iterable[dict]) -> "BlockBuilder":
+        return BlockBuilder(blocks=[*self.blocks, *new_blocks])
+
+
+# 1回の追加で増えたブロックと、それより前に追加された分(複数のビルダーで共有する)。
+# 追加のたびに作るので、軽いタプルにしておく
+_Chunk = tuple[tuple[dict, ...], "_Chunk | None"]
+
+
+@dataclass(frozen=True, eq=False)
+class PersistentBlockBuilder(_BlockMethods):
+    """
+    BlockBuilderと同じメソッドでブロックを組み立てる。
+    追加したブロックを前の分につなぐだけなのでコピーせず、N個のブロックをO(N)で組み立てられる。
+    リストにするのはbuildのときの1回だけ
+    """
+
+    _last: _Chunk | None = None
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PersistentBlockBuilder):
+            return NotImplemented
+        return self.build() == other.build()
+
+    def build(self) -> list[dict]:
+        chunks = []
+        chunk = self._last
+        while chunk is not None:
+            blocks, chunk = chunk
+            chunks.append(blocks)
+        return [block for blocks in reversed(chunks) for block in blocks]
+
+    def _extend(self, new_blocks: Iterable[dict]) -> "PersistentBlockBuilder":
+        return PersistentBlockBuilder((tuple(new_blocks), self._last))
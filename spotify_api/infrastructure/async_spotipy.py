@@ -0,0 +1,183 @@
+import asyncio
+import re
+import weakref
+from typing import Any, cast
+
+import httpx
+
+from ..custom_logger import get_logger
+from ..domain.model.track import Track
+from ..domain.track_translator import TrackTranslator
+from ..util.metrics import observe, record_upstream_bytes
+from ..util.server_timing import phase
+from . import spotipy as spotipy_module
+
+# spotipyと同じく、レート制限とサーバーエラーはリトライする
+RETRY_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+# GET /tracks に一度に渡せるIDの上限
+MAX_TRACK_IDS_PER_REQUEST = 50
+# SpotifyのIDは22文字のbase62。形式が違うIDが1つでも含まれると、GET /tracks全体が400になる
+TRACK_ID_PATTERN = re.compile(r"[0-9A-Za-z]{22}")
+# Saveされたトラック一覧の1ページあたりの件数(APIの上限)
+SAVED_TRACKS_PAGE_SIZE = 50
+# ライブラリ全体の同期で同時に取得するページ数(大きなライブラリで一度に投げて429にならないように抑える)
+SAVED_TRACKS_MAX_CONCURRENCY = 4
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.3
+MAX_CONNECTIONS = 20
+
+logger = get_logger(__name__)
+
+# httpx.AsyncClientはイベントループに紐づくので、ループごとに1つを使い回す
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def _get_shared_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            base_url=spotipy_module.API_BASE_URL,
+            timeout=spotipy_module.REQUESTS_TIMEOUT,
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def prewarm_shared_client(connect: bool = True) -> None:
+    """
+    共有クライアントを作っておく。connectがTrueなら1回リクエストして、TCP/TLSの接続をプールに張っておく
+    (認証なしのリクエストなのでレスポンスは使わない)
+    """
+    client = _get_shared_client()
+    if connect:
+        await client.get("")
+
+
+async def aclose_shared_client() -> None:
+    """現在のイベントループで使っているクライアントを閉じる(シャットダウン時に呼ぶ)"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def is_valid_track_id(track_id: str) -> bool:
+    return TRACK_ID_PATTERN.fullmatch(track_id) is not None
+
+
+class AsyncSpotipy:
+    """
+    Spotipyと同じ操作を、イベントループを止めずに行うクライアント
+    """
+
+    def __init__(self, client: httpx.AsyncClient, access_token: str):
+        self.client = client
+        self.access_token = access_token
+
+    @classmethod
+    def get_instance(cls, access_token: str) -> "AsyncSpotipy":
+        return cls(_get_shared_client(), access_token=access_token)
+
+    async def get_track(self, track_id: str) -> Track | None:
+        track_entity = await self._request("GET", f"tracks/{track_id}", operation="track")
+        logger.debug(track_entity)
+        if track_entity is None:
+            return None
+        with phase("translate"):
+            return TrackTranslator.from_entity(track_entity)
+
+    async def get_tracks(self, track_ids: list[str]) -> list[Track | None]:
+        """
+        複数のトラックを1回のリクエストで取得する(最大50件)。
+        見つからなかったIDはNoneとして、引数と同じ順序で返す
+        """
+        self._check_track_ids(track_ids)
+        response = await self._request("GET", "tracks", params={"ids": ",".join(track_ids)}, operation="tracks")
+        track_entities = response["tracks"] if response is not None else []
+        with phase("translate"):
+            return [TrackTranslator.from_entity(entity) if entity is not None else None for entity in track_entities]
+
+    async def get_current_playing(self) -> Track | None:
+        playing_track = await self._request("GET", "me/player/currently-playing", operation="current")
+        if playing_track is None or playing_track.get("item") is None:
+            return None
+        logger.debug(playing_track)
+        with phase("translate"):
+            return TrackTranslator.from_entity(playing_track["item"])
+
+    async def love_track(self, track_id: str) -> None:
+        await self.love_tracks([track_id])
+
+    async def love_tracks(self, track_ids: list[str]) -> None:
+        """複数のトラックを1回のリクエストでSaveする(最大50件)"""
+        self._check_track_ids(track_ids)
+        logger.debug(track_ids)
+        await self._request("PUT", "me/tracks", params={"ids": ",".join(track_ids)}, operation="save")
+
+    async def is_track_saved(self, track_id: str) -> bool:
+        """指定されたトラックがすでにSaveされているかを判定する"""
+        return (await self.are_tracks_saved([track_id]))[0]
+
+    async def are_tracks_saved(self, track_ids: list[str]) -> list[bool]:
+        """複数のトラックがSave済みかを1回のリクエストで判定する(最大50件)"""
+        self._check_track_ids(track_ids)
+        response = await self._request(
+            "GET", "me/tracks/contains", params={"ids": ",".join(track_ids)}, operation="saved"
+        )
+        logger.debug(response)
+        return [bool(is_saved) for is_saved in response]
+
+    async def get_saved_track_ids(self) -> list[str]:
+        """
+        ライブラリにSaveされているトラックIDをすべて取得する。
+        1ページ目で件数を確認し、残りのページはSAVED_TRACKS_MAX_CONCURRENCY件ずつ並行に取得する
+        """
+        first_page = await self._saved_tracks_page(offset=0)
+        offsets = range(SAVED_TRACKS_PAGE_SIZE, first_page["total"], SAVED_TRACKS_PAGE_SIZE)
+        semaphore = asyncio.Semaphore(SAVED_TRACKS_MAX_CONCURRENCY)
+
+        async def fetch_page(offset: int) -> dict[str, Any]:
+            async with semaphore:
+                return await self._saved_tracks_page(offset=offset)
+
+        pages = [first_page, *await asyncio.gather(*(fetch_page(offset) for offset in offsets))]
+        return [
+            item["track"]["id"]
+            for page in pages
+            for item in page["items"]
+            if item.get("track") is not None and item["track"].get("id") is not None
+        ]
+
+    async def _saved_tracks_page(self, offset: int) -> dict[str, Any]:
+        params = {"limit": str(SAVED_TRACKS_PAGE_SIZE), "offset": str(offset)}
+        return cast(dict[str, Any], await self._request("GET", "me/tracks", params=params, operation="saved_list"))
+
+    @staticmethod
+    def _check_track_ids(track_ids: list[str]) -> None:
+        if len(track_ids) > MAX_TRACK_IDS_PER_REQUEST:
+            raise ValueError(f"too many track ids: {len(track_ids)} > {MAX_TRACK_IDS_PER_REQUEST}")
+
+    async def _request(self, method: str, path: str, operation: str, params: dict[str, str] | None = None) -> Any:
+        """operationはメトリクスに記録する操作名(リトライを含めた1回の呼び出しとして記録する)"""
+        headers = {"Authorization": f"Bearer {self.access_token}"}
+        attempt = 0
+        with observe("spotify", operation):
+            while True:
+                response = await self.client.request(method, path, params=params, headers=headers)
+                record_upstream_bytes("spotify", len(response.request.content) + len(response.content))
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= MAX_RETRIES:
+                    break
+                await asyncio.sleep(_retry_delay(response, attempt))
+                attempt += 1
+            response.raise_for_status()
+        if response.status_code == 204 or not response.content:
+            return None
+        return response.json()
+
+
+def _retry_delay(response: httpx.Response, attempt: int) -> float:
+    retry_after = response.headers.get("Retry-After")
+    if retry_after is not None and retry_after.isdigit():
+        return float(retry_after)
+    return float(BACKOFF_FACTOR * (2**attempt))
@@ -0,0 +1,91 @@
+import io
+import threading
+import time
+from typing import Any
+
+from botocore.exceptions import ClientError
+
+from ..util.metrics import record_upstream, record_upstream_bytes
+
+_lock = threading.Lock()
+_s3_client = None
+
+
+def get_s3_client():
+    """
+    コネクションプールを共有するS3クライアントを取得する。
+    boto3のimportとクライアントの生成は重いので、初めて使うときまで遅らせる
+    """
+    global _s3_client
+    if _s3_client is None:
+        # boto3.clientの生成自体はスレッドセーフではないのでロックする
+        with _lock:
+            if _s3_client is None:
+                import boto3
+                from botocore.config import Config
+
+                # S3クライアントはスレッドセーフなので、プロセス内で1つを使い回す
+                config = Config(
+                    max_pool_connections=20,
+                    tcp_keepalive=True,
+                    connect_timeout=3,
+                    read_timeout=10,
+                    retries={"max_attempts": 3, "mode": "standard"},
+                )
+                client = boto3.client("s3", config=config)
+                _instrument(client)
+                _s3_client = client
+    return _s3_client
+
+
+def _instrument(client: Any) -> None:
+    """S3の呼び出し(GetObject/PutObjectなど)ごとの時間と転送量を、botocoreのイベントでメトリクスに記録する"""
+    client.meta.events.register("before-parameter-build.s3", _on_before_call)
+    client.meta.events.register("after-call.s3", _on_after_call)
+    client.meta.events.register("after-call-error.s3", _on_after_call_error)
+
+
+def _on_before_call(params: dict[str, Any], model: Any, context: dict[str, Any], **kwargs: Any) -> None:
+    context["metrics_operation"] = model.name
+    context["metrics_started"] = time.perf_counter()
+    body_size = _body_size(params.get("Body"))
+    if body_size:
+        record_upstream_bytes("s3", body_size)
+
+
+def _on_after_call(http_response: Any, context: dict[str, Any], **kwargs: Any) -> None:
+    # 304(変更なし)・404(未保存)・412(競合)は正常系として扱い、5xxだけを失敗にする
+    outcome = "error" if http_response.status_code >= 500 else "ok"
+    _record(context, outcome)
+    # GetObjectのBodyはまだ読んでいないので、ヘッダーのサイズで数える
+    record_upstream_bytes("s3", int(http_response.headers.get("content-length") or 0))
+
+
+def _body_size(body: Any) -> int:
+    """
+    PutObjectのBodyのバイト数。botocoreがstr/bytesをBytesIOに包んだ後に呼ばれるので、バッファのサイズを見る
+    (ファイルなどのストリームは読み進めたくないので数えない)
+    """
+    if isinstance(body, bytes):
+        return len(body)
+    if isinstance(body, str):
+        return len(body.encode())
+    if isinstance(body, io.BytesIO):
+        return body.getbuffer().nbytes
+    return 0
+
+
+def _on_after_call_error(context: dict[str, Any], **kwargs: Any) -> None:
+    _record(context, "error")
+
+
+def _record(context: dict[str, Any], outcome: str) -> None:
+    started = context.pop("metrics_started", None)
+    if started is not None:
+        record_upstream("s3", context["metrics_operation"], time.perf_counter() - started, outcome)
+
+
+def is_not_modified(error: ClientError) -> bool:
+    """IfNoneMatchつきのGETで、オブジェクトが変わっていなかった(304)かを判定する"""
+    status_code = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    return status_code == 304 or error.response.get("Error", {}).get("Code") in ("304", "NotModified")
@@ -0,0 +1,37 @@
+import json
+from pathlib import Path
+
+from ..custom_logger import get_logger
+from ..domain.infrastructure.daily_digest_repository import DailyDigestRepository
+from ..domain.model.daily_digest import DailyDigest
+
+DIRECTORY = "/tmp"
+
+logger = get_logger(__name__)
+
+
+class DailyDigestLocalRepository(DailyDigestRepository):
+    def __init__(self, directory: str = DIRECTORY) -> None:
+        self.directory = Path(directory)
+
+    def load(self, day: str) -> DailyDigest | None:
+        """
+        ダイジェストを取得する
+        """
+        try:
+            with open(self._file_path(day)) as f:
+                return DailyDigest.from_dict(json.load(f))
+        except FileNotFoundError:
+            logger.debug("daily digest file not found: %s", day)
+            return None
+
+    def save(self, digest: DailyDigest) -> bool:
+        """
+        ダイジェストを保存する
+        """
+        with open(self._file_path(digest.day), "w") as f:
+            json.dump(digest.to_dict(), f, ensure_ascii=False)
+        return True
+
+    def _file_path(self, day: str) -> Path:
+        return self.directory / f"daily_digest_{day}.json"
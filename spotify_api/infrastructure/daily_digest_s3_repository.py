@@ -0,0 +1,66 @@
+import json
+
+from botocore.exceptions import ClientError, NoCredentialsError
+
+from ..custom_logger import get_logger
+from ..domain.infrastructure.daily_digest_repository import DailyDigestRepository
+from ..domain.model.daily_digest import DailyDigest
+from .aws_client import get_s3_client
+from .token_info_s3_repository import BUCKET_NAME
+
+KEY_PREFIX = "daily_digests/"
+
+logger = get_logger(__name__)
+
+
+class DailyDigestS3Repository(DailyDigestRepository):
+    """
+    S3上に日付ごとのJSON(daily_digests/YYYY-MM-DD.json)として保存する
+    """
+
+    def __init__(self, s3_client=None):
+        self._s3_client = s3_client
+
+    @property
+    def s3_client(self):
+        # コールドスタートを軽くするため、S3クライアントは初めて使うときに取得する
+        if self._s3_client is None:
+            self._s3_client = get_s3_client()
+        return self._s3_client
+
+    def load(self, day: str) -> DailyDigest | None:
+        """
+        ダイジェストを取得する
+        """
+        try:
+            response = self.s3_client.get_object(Bucket=BUCKET_NAME, Key=self._key(day))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "NoSuchKey":
+                logger.error(e)
+            return None
+        except NoCredentialsError:
+            logger.error("認証情報が不足しています。")
+            return None
+        except Exception as e:
+            logger.error(e)
+            return None
+        return DailyDigest.from_dict(json.loads(response["Body"].read()))
+
+    def save(self, digest: DailyDigest) -> bool:
+        """
+        ダイジェストを保存する
+        """
+        body = json.dumps(digest.to_dict(), ensure_ascii=False).encode()
+        try:
+            self.s3_client.put_object(Bucket=BUCKET_NAME, Key=self._key(digest.day), Body=body)
+        except NoCredentialsError:
+            logger.error("認証情報が不足しています。")
+            return False
+        except Exception as e:
+            logger.error(e)
+            return False
+        return True
+
+    @staticmethod
+    def _key(day: str) -> str:
+        return f"{KEY_PREFIX}{day}.json"
@@ -0,0 +1,36 @@
+import json
+from pathlib import Path
+
+from ..custom_logger import get_logger
+from ..domain.infrastructure.posted_track_repository import PostedTrackRepository
+
+DIRECTORY = "/tmp"
+
+logger = get_logger(__name__)
+
+
+class PostedTrackLocalRepository(PostedTrackRepository):
+    def __init__(self, directory: str = DIRECTORY) -> None:
+        self.directory = Path(directory)
+
+    def load(self, day: str) -> set[str] | None:
+        """
+        投稿済みのトラックIDを取得する
+        """
+        try:
+            with open(self._file_path(day)) as f:
+                return set(json.load(f))
+        except FileNotFoundError:
+            logger.debug("posted track file not found: %s", day)
+            return None
+
+    def save(self, day: str, track_ids: set[str]) -> bool:
+        """
+        投稿済みのトラックIDを保存する
+        """
+        with open(self._file_path(day), "w") as f:
+            json.dump(sorted(track_ids), f)
+        return True
+
+    def _file_path(self, day: str) -> Path:
+        return self.directory / f"posted_tracks_{day}.json"
@@ -0,0 +1,87 @@
+import json
+import threading
+
+from botocore.exceptions import ClientError, NoCredentialsError
+
+from ..custom_logger import get_logger
+from ..domain.infrastructure.posted_track_repository import PostedTrackRepository
+from .aws_client import get_s3_client, is_not_modified
+from .token_info_s3_repository import BUCKET_NAME
+
+KEY_PREFIX = "posted_tracks/"
+
+logger = get_logger(__name__)
+
+
+class PostedTrackS3Repository(PostedTrackRepository):
+    """
+    S3上に日付ごとのJSON(posted_tracks/YYYY-MM-DD.json)として保存する。
+    最後に読み書きした日のETagを覚えておき、変更がなければ304で本文の転送を省略する。
+    """
+
+    def __init__(self, s3_client=None):
+        self._s3_client = s3_client
+        self._lock = threading.Lock()
+        self._day: str | None = None
+        self._track_ids: set[str] | None = None
+        self._etag: str | None = None
+
+    @property
+    def s3_client(self):
+        # コールドスタートを軽くするため、S3クライアントは初めて使うときに取得する
+        if self._s3_client is None:
+            self._s3_client = get_s3_client()
+        return self._s3_client
+
+    def load(self, day: str) -> set[str] | None:
+        """
+        投稿済みのトラックIDを取得する
+        """
+        with self._lock:
+            track_ids, etag = (self._track_ids, self._etag) if self._day == day else (None, None)
+
+        condition = {"IfNoneMatch": etag} if etag is not None else {}
+        try:
+            response = self.s3_client.get_object(Bucket=BUCKET_NAME, Key=self._key(day), **condition)
+        except ClientError as e:
+            if is_not_modified(e):
+                return set(track_ids) if track_ids is not None else None
+            if e.response.get("Error", {}).get("Code") != "NoSuchKey":
+                logger.error(e)
+            return None
+        except NoCredentialsError:
+            logger.error("認証情報が不足しています。")
+            return None
+        except Exception as e:
+            logger.error(e)
+            return None
+
+        track_ids = set(json.loads(response["Body"].read()))
+        self._remember(day, track_ids, response["ETag"])
+        return set(track_ids)
+
+    def save(self, day: str, track_ids: set[str]) -> bool:
+        """
+        投稿済みのトラックIDを保存する
+        """
+        body = json.dumps(sorted(track_ids)).encode()
+        try:
+            response = self.s3_client.put_object(Bucket=BUCKET_NAME, Key=self._key(day), Body=body)
+        except NoCredentialsError:
+            logger.error("認証情報が不足しています。")
+            return False
+        except Exception as e:
+            logger.error(e)
+            return False
+        self._remember(day, set(track_ids), response.get("ETag"))
+        return True
+
+    def _remember(self, day: str, track_ids: set[str], etag: str | None) -> None:
+        with self._lock:
+            self._day = day
+            self._track_ids = track_ids if etag is not None else None
+            self._etag = etag
+
+    @staticmethod
+    def _key(day: str) -> str:
+        return f"{KEY_PREFIX}{day}.json"
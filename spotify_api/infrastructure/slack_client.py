@@ -0,0 +1,207 @@
+import os
+import threading
+import time
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..custom_logger import LOG_SAMPLE_EVERY, get_logger
+from ..util.metrics import observe, record_upstream_bytes
+
+# ローカルの偽サーバーなどに向ける場合に上書きする
+API_BASE_URL = os.getenv("SLACK_API_BASE_URL", "https://slack.com/api/")
+# (接続, 読み込み)のタイムアウト秒数
+REQUESTS_TIMEOUT = (3.05, 10)
+POOL_MAXSIZE = 4
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5
+RETRY_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+
+# メソッドごとのレート制限(1分あたりの回数)。https://api.slack.com/docs/rate-limits
+TIER_2 = 20
+TIER_3 = 50
+# chat.postMessageは「1チャンネルにつき1秒1回程度」
+SPECIAL_POST_MESSAGE = 60
+RATE_LIMITS_PER_MINUTE = {
+    "chat.postMessage": SPECIAL_POST_MESSAGE,
+    "chat.update": TIER_3,
+    "conversations.history": TIER_3,
+}
+DEFAULT_RATE_LIMIT_PER_MINUTE = TIER_2
+# 上限のペースとは別に、続けて呼べる回数(投稿の直後のスレッドへの返信などを待たせない)
+RATE_LIMIT_BURST = 3
+
+# API呼び出しごとのログは間引く
+logger = get_logger(__name__, sample_every=LOG_SAMPLE_EVERY)
+
+
+class SlackApiError(Exception):
+    """Slack APIがok: falseを返した、またはリトライしても成功しなかった"""
+
+    def __init__(self, method: str, error: str) -> None:
+        super().__init__(f"{method} failed: {error}")
+        self.method = method
+        self.error = error
+
+
+class _RateLimiter:
+    """
+    メソッドごとのトークンバケット。burst回までは続けて呼べて、使い切った後は上限のペースで待つ
+    """
+
+    def __init__(self, burst: int = RATE_LIMIT_BURST) -> None:
+        self.burst = burst
+        self._lock = threading.Lock()
+        # メソッドごとの(残りの回数, 最後に計算した時刻)
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._deferred_until: dict[str, float] = {}
+
+    def wait(self, method: str) -> None:
+        per_second = RATE_LIMITS_PER_MINUTE.get(method, DEFAULT_RATE_LIMIT_PER_MINUTE) / 60
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated_at = self._buckets.get(method, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated_at) * per_second)
+            delay = max((1 - tokens) / per_second, self._deferred_until.get(method, now) - now, 0.0)
+            # 待つ場合も先に1回分を使っておき、同時に呼んだ他のスレッドはその後ろに並ぶ
+            self._buckets[method] = (tokens - 1, now)
+        if delay > 0:
+            time.sleep(delay)
+
+    def defer(self, method: str, seconds: float) -> None:
+        """429で指定された秒数だけ、そのメソッドの呼び出しを止める"""
+        with self._lock:
+            self._deferred_until[method] = max(self._deferred_until.get(method, 0), time.monotonic() + seconds)
+
+
+class SlackClient:
+    """
+    Slack Web APIのクライアント。セッションを使い回し、429はRetry-Afterに従ってリトライする
+    """
+
+    def __init__(self, token: str, session: requests.Session | None = None, base_url: str = API_BASE_URL) -> None:
+        self.token = token
+        self.base_url = base_url
+        self.session = session or _new_session()
+        self._rate_limiter = _RateLimiter()
+
+    def conversations_history(
+        self, channel: str, oldest: str, latest: str, cursor: str | None = None
+    ) -> dict[str, Any]:
+        params = {"channel": channel, "oldest": oldest, "latest": latest}
+        if cursor is not None:
+            params["cursor"] = cursor
+        return self.api_call("conversations.history", params=params)
+
+    def chat_post_message(
+        self, channel: str, text: str, blocks: list[dict] | None = None, thread_ts: str | None = None
+    ) -> dict[str, Any]:
+        payload: dict[str, Any] = {"channel": channel, "text": text}
+        if blocks is not None:
+            payload["blocks"] = blocks
+        if thread_ts is not None:
+            payload["thread_ts"] = thread_ts
+        return self.api_call("chat.postMessage", json=payload)
+
+    def chat_update(self, channel: str, ts: str, text: str, blocks: list[dict] | None = None) -> dict[str, Any]:
+        payload: dict[str, Any] = {"channel": channel, "ts": ts, "text": text}
+        if blocks is not None:
+            payload["blocks"] = blocks
+        return self.api_call("chat.update", json=payload)
+
+    def api_call(
+        self, method: str, params: dict[str, str] | None = None, json: dict[str, Any] | None = None
+    ) -> dict[str, Any]:
+        """
+        Slack APIを呼び出す。jsonを指定した場合はPOST、それ以外はGETで送る
+        """
+        http_method = "POST" if json is not None else "GET"
+        headers = {"Authorization": f"Bearer {self.token}"}
+        attempt = 0
+        while True:
+            self._rate_limiter.wait(method)
+            logger.info(method)
+            try:
+                with observe("slack", method) as call:
+                    response = self.session.request(
+                        http_method,
+                        self.base_url + method,
+                        params=params,
+                        json=json,
+                        headers=headers,
+                        timeout=REQUESTS_TIMEOUT,
+                    )
+                    if response.status_code >= 400:
+                        call.outcome = "error"
+                record_upstream_bytes("slack", _message_size(response))
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # 読み込みのタイムアウトは投稿が届いている可能性があるので、POSTは二重投稿を避けてリトライしない
+                is_retryable = isinstance(e, requests.ConnectionError) or http_method == "GET"
+                if not is_retryable or attempt >= MAX_RETRIES:
+                    raise SlackApiError(method, str(e)) from e
+                time.sleep(BACKOFF_FACTOR * (2**attempt))
+                attempt += 1
+                continue
+
+            # POSTは5xxでも投稿が届いている可能性があるので、二重投稿を避けて429だけリトライする
+            is_retryable = response.status_code == 429 or (
+                http_method == "GET" and response.status_code in RETRY_STATUS_CODES
+            )
+            if not is_retryable:
+                break
+            if attempt >= MAX_RETRIES:
+                raise SlackApiError(method, f"HTTP {response.status_code}")
+            delay = _retry_delay(response, attempt)
+            logger.warning("%s returned %s. retry after %s seconds.", method, response.status_code, delay)
+            if response.status_code == 429:
+                self._rate_limiter.defer(method, delay)
+            else:
+                time.sleep(delay)
+            attempt += 1
+
+        try:
+            body = response.json()
+        except ValueError as e:
+            # プロキシのエラーページなど、JSONではないレスポンス
+            raise SlackApiError(method, f"HTTP {response.status_code} with a non-JSON body") from e
+        if not isinstance(body, dict):
+            raise SlackApiError(method, f"HTTP {response.status_code} with an unexpected body")
+        if not body.get("ok", False):
+            raise SlackApiError(method, body.get("error", f"HTTP {response.status_code}"))
+        return body
+
+
+def _new_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=POOL_MAXSIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _message_size(response: requests.Response) -> int:
+    """リクエストとレスポンスのボディの合計バイト数"""
+    body = response.request.body or b""
+    return len(body) + len(response.content)
+
+
+def _retry_delay(response: requests.Response, attempt: int) -> float:
+    retry_after = response.headers.get("Retry-After")
+    if retry_after is not None and retry_after.isdigit():
+        return float(retry_after)
+    return float(BACKOFF_FACTOR * (2**attempt))
+
+
+_lock = threading.Lock()
+_shared_client: SlackClient | None = None
+
+
+def get_slack_client() -> SlackClient:
+    """プロセス内で1つのSlackClient(とセッション)を使い回す"""
+    global _shared_client
+    if _shared_client is None:
+        with _lock:
+            if _shared_client is None:
+                _shared_client = SlackClient(token=os.environ["SLACK_BOT_TOKEN"])
+    return _shared_client
@@ -1,7 +1,10 @@
 import os
-from typing import Any, cast
+from typing import TYPE_CHECKING, Any, cast
 
-from spotipy.oauth2 import SpotifyOAuth
+from ..util.metrics import observe
+
+if TYPE_CHECKING:
+    from spotipy.oauth2 import SpotifyOAuth
 
 CLIENT_ID = os.getenv("SPOTIFY_CLIENT_ID")
 CLIENT_SECRET = os.getenv("SPOTIFY_CLIENT_SECRET")
@@ -27,9 +30,18 @@ def get_callback_url() -> str:
 
 class SpotifyOauth:
     def __init__(self):
-        self.sp_oauth = SpotifyOAuth(
-            client_id=CLIENT_ID, client_secret=CLIENT_SECRET, redirect_uri=get_callback_url(), scope=SCOPE
-        )
+        self._sp_oauth: SpotifyOAuth | None = None
+
+    @property
+    def sp_oauth(self) -> "SpotifyOAuth":
+        # トークンが有効な間は使わないので、初めて必要になったときに作る
+        if self._sp_oauth is None:
+            from spotipy.oauth2 import SpotifyOAuth
+
+            self._sp_oauth = SpotifyOAuth(
+                client_id=CLIENT_ID, client_secret=CLIENT_SECRET, redirect_uri=get_callback_url(), scope=SCOPE
+            )
+        return self._sp_oauth
 
     def get_authorize_url(self) -> str:
         """
@@ -42,11 +54,13 @@ class SpotifyOauth:
         認証コールバック
         token_infoを返す
         """
-        return cast(dict[str, Any], self.sp_oauth.get_access_token(code))
+        with observe("spotify_oauth", "authorize"):
+            return cast(dict[str, Any], self.sp_oauth.get_access_token(code))
 
     def refresh_access_token(self, refresh_token: str) -> dict[str, Any]:
         """
         アクセストークンをリフレッシュ
         token_infoを返す
         """
-        return cast(dict[str, Any], self.sp_oauth.refresh_access_token(refresh_token))
+        with observe("spotify_oauth", "refresh"):
+            return cast(dict[str, Any], self.sp_oauth.refresh_access_token(refresh_token))
@@ -1,10 +1,65 @@
+import os
+import threading
+
+import requests
 import spotipy
+from requests.adapters import HTTPAdapter
+
 from ..custom_logger import get_logger
+from ..domain.model.playback import Playback
 from ..domain.model.track import Track
 from ..domain.track_translator import TrackTranslator
+from ..util.metrics import observe, record_upstream_bytes
+from ..util.server_timing import phase
+
+# ローカルの偽サーバーなどに向ける場合に上書きする
+API_BASE_URL = os.getenv("SPOTIFY_API_BASE_URL", "https://api.spotify.com/v1/")
+REQUESTS_TIMEOUT = 5
+# FastAPIのスレッドプールから同時に使われるので、その分のコネクションを保持しておく
+POOL_MAXSIZE = 20
 
 logger = get_logger(__name__)
 
+_lock = threading.Lock()
+_shared_client: spotipy.Spotify | None = None
+
+
+def _get_shared_client() -> spotipy.Spotify:
+    """
+    ワーカー(またはLambdaコンテナ)の間使い回すspotipy.Spotifyを取得する。
+    requestsのセッションを共有するので、リクエストごとのTCP/TLSハンドシェイクが不要になる。
+    """
+    global _shared_client
+    if _shared_client is None:
+        with _lock:
+            if _shared_client is None:
+                sp = spotipy.Spotify(requests_timeout=REQUESTS_TIMEOUT)
+                # spotipyが作るセッションのリトライ設定はそのままに、コネクションプールだけ広げる
+                retry = sp._session.get_adapter(API_BASE_URL).max_retries
+                adapter = HTTPAdapter(pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+                sp._session.mount("https://", adapter)
+                sp._session.mount("http://", adapter)
+                sp._session.hooks["response"].append(_record_message_size)
+                sp.prefix = API_BASE_URL
+                _shared_client = sp
+    return _shared_client
+
+
+def _record_message_size(response: requests.Response, *args, **kwargs) -> None:
+    """spotipyは呼び出しの中でレスポンスを読むので、セッションのフックで転送量を数える"""
+    body = response.request.body or b""
+    record_upstream_bytes("spotify", len(body) + len(response.content))
+
+
+def prewarm_shared_client(connect: bool = True) -> None:
+    """
+    共有クライアントを作っておく。connectがTrueなら1回リクエストして、TCP/TLSの接続をプールに張っておく
+    (認証なしのリクエストなのでレスポンスは使わない)
+    """
+    sp = _get_shared_client()
+    if connect:
+        sp._session.get(sp.prefix, timeout=REQUESTS_TIMEOUT)
+
 
 class Spotipy:
     def __init__(self, sp: spotipy.Spotify):
@@ -12,34 +67,52 @@ class Spotipy:
 
     @classmethod
     def get_instance(cls, access_token: str) -> "Spotipy":
-        logger.debug(f"access_token: {access_token}")
-        return cls(spotipy.Spotify(auth=access_token))
+        # 利用者は1人なので、共有クライアントのトークンを差し替えても他のリクエストに影響しない
+        sp = _get_shared_client()
+        sp.set_auth(access_token)
+        return cls(sp)
 
     def current_user_recently_played(self) -> list:
         raise NotImplementedError()
 
     def get_track(self, track_id: str) -> Track | None:
-        track_entity = self.sp.track(track_id=track_id)
+        with observe("spotify", "track"):
+            track_entity = self.sp.track(track_id=track_id)
         logger.debug(track_entity)
         if track_entity is None:
             return None
-        return TrackTranslator.from_entity(track_entity)
+        with phase("translate"):
+            return TrackTranslator.from_entity(track_entity)
 
     def get_current_playing(self) -> Track | None:
-        playing_track = self.sp.current_user_playing_track()
-        if playing_track is None:
+        playback = self.get_playback()
+        return playback.track if playback is not None else None
+
+    def get_playback(self) -> Playback | None:
+        """再生中のトラックを再生位置とあわせて取得する"""
+        with observe("spotify", "current"):
+            playing_track = self.sp.current_user_playing_track()
+        if playing_track is None or playing_track.get("item") is None:
             return None
         logger.debug(playing_track)
-        return TrackTranslator.from_entity(playing_track["item"])
+        with phase("translate"):
+            track = TrackTranslator.from_entity(playing_track["item"])
+        return Playback(
+            track=track,
+            progress_ms=playing_track.get("progress_ms") or 0,
+            is_playing=bool(playing_track.get("is_playing")),
+        )
 
     def love_track(self, track_id: str) -> None:
         logger.debug(track_id)
-        response = self.sp.current_user_saved_tracks_add(tracks=[track_id])
+        with observe("spotify", "save"):
+            response = self.sp.current_user_saved_tracks_add(tracks=[track_id])
         logger.debug(response)
 
     def is_track_saved(self, track_id: str) -> bool:
         """指定されたトラックがすでにSaveされているかを判定する"""
-        response = self.sp.current_user_saved_tracks_contains(tracks=[track_id])
+        with observe("spotify", "saved"):
+            response = self.sp.current_user_saved_tracks_contains(tracks=[track_id])
         logger.debug(response)
         return bool(response[0])
 
@@ -0,0 +1,123 @@
+import threading
+from dataclasses import dataclass
+from datetime import datetime as DateTime
+from typing import Any
+
+from ..custom_logger import get_logger
+from ..domain.infrastructure.token_info_repository import TokenInfoRepository
+from ..util.memory import register_cache
+
+# 有効期限のこの秒数前になったらキャッシュを使わず、保存先から読み直す
+EXPIRY_MARGIN_SECONDS = 60
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class TokenInfoCacheStats:
+    hits: int
+    misses: int
+
+
+class TokenInfoCache:
+    """
+    プロセス内でトークン情報を保持するキャッシュ。
+    expires_atを見て、期限が近い(または切れている)トークンはヒット扱いにしない。
+    """
+
+    def __init__(self, margin_seconds: float = EXPIRY_MARGIN_SECONDS) -> None:
+        self.margin_seconds = margin_seconds
+        self._lock = threading.Lock()
+        self._token_info: dict[str, Any] | None = None
+        self._hits = 0
+        self._misses = 0
+
+    def get(self) -> dict[str, Any] | None:
+        with self._lock:
+            token_info = self._token_info
+            if token_info is not None and self._is_fresh(token_info):
+                self._hits += 1
+                return token_info
+            self._misses += 1
+            return None
+
+    def put(self, token_info: dict[str, Any]) -> None:
+        with self._lock:
+            self._token_info = token_info
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._token_info = None
+
+    def stats(self) -> TokenInfoCacheStats:
+        with self._lock:
+            return TokenInfoCacheStats(hits=self._hits, misses=self._misses)
+
+    def _is_fresh(self, token_info: dict[str, Any]) -> bool:
+        expires_at = token_info.get("expires_at")
+        if expires_at is None:
+            return False
+        return bool(expires_at - self.margin_seconds > DateTime.now().timestamp())
+
+
+# ワーカー(またはLambdaコンテナ)ごとに1つだけ持つ
+token_info_cache = TokenInfoCache()
+register_cache("token_info", token_info_cache)
+
+
+class TokenInfoCachedRepository(TokenInfoRepository):
+    """
+    別のTokenInfoRepositoryの前段にプロセス内キャッシュを置く
+    """
+
+    def __init__(self, repository: TokenInfoRepository, cache: TokenInfoCache = token_info_cache) -> None:
+        self.repository = repository
+        self.cache = cache
+
+    def save(self, token_info: dict[str, Any]) -> bool:
+        """
+        トークン情報を保存する。
+        古いキャッシュは必ず破棄し、保存に成功した場合のみ新しいトークンをキャッシュする。
+        """
+        self.cache.invalidate()
+        is_success = self.repository.save(token_info=token_info)
+        if is_success:
+            self.cache.put(token_info)
+        return is_success
+
+    def load(self) -> dict[str, Any] | None:
+        """
+        トークン情報を取得する。
+        キャッシュが有効な間は保存先にアクセスしない。
+        """
+        token_info = self.cache.get()
+        if token_info is not None:
+            return token_info
+
+        logger.debug("token cache miss")
+        token_info = self.repository.load()
+        if token_info is not None:
+            self.cache.put(token_info)
+        return token_info
+
+    def load_with_version(self) -> tuple[dict[str, Any] | None, str | None]:
+        """
+        トークン情報とバージョンを取得する。
+        条件付き保存の前提になるので、キャッシュは使わず必ず保存先から読む
+        """
+        token_info, version = self.repository.load_with_version()
+        if token_info is not None:
+            self.cache.put(token_info)
+        return token_info, version
+
+    def save_if_unchanged(self, token_info: dict[str, Any], version: str | None) -> bool:
+        """
+        保存先のトークン情報がversionから変わっていない場合のみ保存する。
+        競合(TokenInfoConflictError)した場合もキャッシュは破棄済みなので、次のloadで最新のトークンを読み直す
+        """
+        self.cache.invalidate()
+        is_success = self.repository.save_if_unchanged(token_info=token_info, version=version)
+        if is_success:
+            # 次回の条件付き保存では保存先から読み直すので、バージョンはキャッシュしない
+            self.cache.put(token_info)
+        return is_success
@@ -30,7 +30,7 @@ class TokenInfoLocalRepository(TokenInfoRepository):
                 token_info = json.load(f)
             return cast(dict[str, Any], token_info)
         except FileNotFoundError:
-            logger.warning(f"Token file not found: {FILE_PATH}")
+            logger.warning("Token file not found: %s", FILE_PATH)
             return None
 
 
@@ -1,71 +1,101 @@
 import json
+import threading
 from typing import Any, cast
 
-import boto3
-from botocore.exceptions import NoCredentialsError
+from botocore.exceptions import ClientError, NoCredentialsError
+
 from ..custom_logger import get_logger
-from ..domain.infrastructure.token_info_repository import TokenInfoRepository
+from ..domain.infrastructure.token_info_repository import TokenInfoConflictError, TokenInfoRepository
+from .aws_client import get_s3_client, is_not_modified
 
 BUCKET_NAME = "spotify-api-bucket-koboriakira"
 FILE_NAME = "token_info.json"
-FILE_PATH = "/tmp/" + FILE_NAME
+# 条件付き書き込みが競合したときにS3が返すエラーコード
+CONFLICT_ERROR_CODES = ("PreconditionFailed", "ConditionalRequestConflict")
 
 logger = get_logger(__name__)
 
 
 class TokenInfoS3Repository(TokenInfoRepository):
-    def __init__(self):
-        self.s3_client = boto3.client("s3")
+    """
+    S3上のtoken_info.jsonをメモリ上で読み書きする。
+    最後に読み書きしたETagを覚えておき、変更がなければ304で本文の転送とパースを省略する。
+    """
+
+    def __init__(self, s3_client=None):
+        self._s3_client = s3_client
+        self._lock = threading.Lock()
+        self._token_info: dict[str, Any] | None = None
+        self._etag: str | None = None
+
+    @property
+    def s3_client(self):
+        # コールドスタートを軽くするため、S3クライアントは初めて使うときに取得する
+        if self._s3_client is None:
+            self._s3_client = get_s3_client()
+        return self._s3_client
 
     def save(self, token_info: dict[str, Any]) -> bool:
         """
         トークン情報を保存する
         """
-        # token_info.jsonを出力
-        with open(FILE_PATH, "w") as f:
-            json.dump(token_info, f, indent=4)
-
-        # S3にアップロード
-        is_success = self.upload_to_s3()
-        logger.info("is_success: " + str(is_success))
+        is_success = self._put(token_info)
+        logger.info("is_success: %s", is_success)
         return is_success
 
     def load(self) -> dict[str, Any] | None:
         """
         トークン情報を取得する
         """
-        # S3からダウンロード
-        is_success = self.download_from_s3()
-        if not is_success:
+        token_info, _ = self.load_with_version()
+        if token_info is None:
             logger.error("S3からのダウンロードに失敗しました。")
-            return None
+        return token_info
 
-        # token_info.jsonを読み込み
-        with open(FILE_PATH) as f:
-            token_info = json.load(f)
-        return cast(dict[str, Any], token_info)
+    def load_with_version(self) -> tuple[dict[str, Any] | None, str | None]:
+        """
+        トークン情報とETagを取得する
+        """
+        with self._lock:
+            token_info, etag = self._token_info, self._etag
 
-    def upload_to_s3(self) -> bool:
+        condition = {"IfNoneMatch": etag} if etag is not None else {}
         try:
-            # ファイルをアップロード
-            self.s3_client.upload_file(FILE_PATH, BUCKET_NAME, FILE_NAME)
-        except FileNotFoundError:
-            logger.error("ファイルが見つかりませんでした。")
-            return False
+            response = self.s3_client.get_object(Bucket=BUCKET_NAME, Key=FILE_NAME, **condition)
+        except ClientError as e:
+            if is_not_modified(e):
+                return token_info, etag
+            logger.error(e)
+            return None, None
         except NoCredentialsError:
             logger.error("認証情報が不足しています。")
-            return False
+            return None, None
         except Exception as e:
             logger.error(e)
-            return False
-        return True
+            return None, None
+
+        token_info = cast(dict[str, Any], json.loads(response["Body"].read()))
+        etag = response["ETag"]
+        self._remember(token_info, etag)
+        return token_info, etag
+
+    def save_if_unchanged(self, token_info: dict[str, Any], version: str | None) -> bool:
+        """
+        S3上のトークン情報のETagがversionと一致する場合のみ保存する。
+        versionがNoneの場合は、まだオブジェクトが存在しない場合のみ保存する
+        """
+        condition = {"IfMatch": version} if version is not None else {"IfNoneMatch": "*"}
+        return self._put(token_info, **condition)
 
-    def download_from_s3(self) -> bool:
+    def _put(self, token_info: dict[str, Any], **condition: str) -> bool:
+        body = json.dumps(token_info, indent=4).encode()
         try:
-            # ファイルをダウンロード
-            self.s3_client.download_file(BUCKET_NAME, FILE_NAME, FILE_PATH)
-        except FileNotFoundError:
-            logger.error("ファイルが見つかりませんでした。")
+            response = self.s3_client.put_object(Bucket=BUCKET_NAME, Key=FILE_NAME, Body=body, **condition)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in CONFLICT_ERROR_CODES:
+                self._remember(None, None)
+                raise TokenInfoConflictError("token_info was updated by another process.") from e
+            logger.error(e)
             return False
         except NoCredentialsError:
             logger.error("認証情報が不足しています。")
@@ -73,8 +103,14 @@ class TokenInfoS3Repository(TokenInfoRepository):
         except Exception as e:
             logger.error(e)
             return False
+        self._remember(token_info, response.get("ETag"))
         return True
 
+    def _remember(self, token_info: dict[str, Any] | None, etag: str | None) -> None:
+        with self._lock:
+            self._token_info = token_info if etag is not None else None
+            self._etag = etag
+
 
 if __name__ == "__main__":
     # python -m infrastructure.token_info_s3_repository
@@ -1,14 +1,15 @@
 from typing import Any
 
+from ..infrastructure.token_info_cached_repository import TokenInfoCachedRepository
 from ..infrastructure.token_info_local_repository import TokenInfoLocalRepository
 from ..infrastructure.token_info_s3_repository import TokenInfoS3Repository
 from ..usecase.authorize_usecase import AuthorizeUsecase
 from ..util.environment import Environment
 
 if Environment.is_dev() or Environment.is_local():
-    repository = TokenInfoLocalRepository()
+    repository = TokenInfoCachedRepository(TokenInfoLocalRepository())
 else:
-    repository = TokenInfoS3Repository()
+    repository = TokenInfoCachedRepository(TokenInfoS3Repository())
 authorizeUsecase = AuthorizeUsecase(repository=repository)
 
 
@@ -1,17 +1,52 @@
+import asyncio
+import os
+import time
+from typing import TYPE_CHECKING
+
+from ..custom_logger import get_logger
+from ..domain.infrastructure.daily_digest_repository import DailyDigestRepository
+from ..domain.infrastructure.posted_track_repository import PostedTrackRepository
 from ..domain.model.track import Track
+from ..infrastructure import spotipy as spotipy_module
+from ..infrastructure.daily_digest_local_repository import DailyDigestLocalRepository
+from ..infrastructure.daily_digest_s3_repository import DailyDigestS3Repository
+from ..infrastructure.posted_track_local_repository import PostedTrackLocalRepository
+from ..infrastructure.posted_track_s3_repository import PostedTrackS3Repository
+from ..infrastructure.slack_client import get_slack_client
+from ..infrastructure.token_info_cached_repository import TokenInfoCachedRepository
 from ..infrastructure.token_info_local_repository import TokenInfoLocalRepository
 from ..infrastructure.token_info_s3_repository import TokenInfoS3Repository
 from ..service.authorization_service import AuthorizationService
-from ..usecase.current_playing_usecase import CurrentPlayingUsecase
-from ..usecase.get_track_usecase import GetTrackUsecase
-from ..usecase.love_track_usecase import LoveTrackResponse, LoveTrackUsecase
+from ..service.poll_scheduler import PollScheduler
+from ..service.token_refresher import TokenRefresher
+from ..usecase.current_playing_usecase import CurrentPlayingUsecase, NotifyStats, notify_state
+from ..usecase.get_track_usecase import GetTrackUsecase, track_cache
 from ..util.environment import Environment
+from ..util.ttl_lru_cache import CacheStats
+
+if TYPE_CHECKING:
+    from ..usecase.love_track_usecase import LoveTrackResponse, LoveTrackResult
+
+# NOTE: httpxを使う非同期系のモジュールは通知用のLambdaでは使わないので、関数の中でimportする
+#       (コールドスタート時のimportを軽くするため)
+
+# 起動時にSpotify APIへの接続(DNS解決とTLSハンドシェイク)まで済ませておくか
+PREWARM_CONNECTIONS = os.getenv("PREWARM_CONNECTIONS", "true") == "true"
+
+logger = get_logger(__name__)
 
 if Environment.is_dev() or Environment.is_local():
-    repository = TokenInfoLocalRepository()
+    repository = TokenInfoCachedRepository(TokenInfoLocalRepository())
+    posted_track_repository: PostedTrackRepository = PostedTrackLocalRepository()
+    daily_digest_repository: DailyDigestRepository = DailyDigestLocalRepository()
 else:
-    repository = TokenInfoS3Repository()
+    repository = TokenInfoCachedRepository(TokenInfoS3Repository())
+    posted_track_repository = PostedTrackS3Repository()
+    daily_digest_repository = DailyDigestS3Repository()
 authorization_service = AuthorizationService(token_repository=repository)
+token_refresher = TokenRefresher(authorization_service=authorization_service)
+poll_scheduler = PollScheduler()
+_is_prewarmed = False
 
 
 def get_track(track_id: str) -> Track | None:
@@ -19,16 +54,91 @@ def get_track(track_id: str) -> Track | None:
     return get_track_usecase.execute(track_id=track_id)
 
 
-def get_current_playing() -> Track | None:
-    current_playing_usecase = CurrentPlayingUsecase(authorization_service=authorization_service)
-    return current_playing_usecase.get_current_playing()
+def get_track_cache_stats() -> CacheStats:
+    return track_cache.stats()
+
+
+async def get_tracks(track_ids: list[str]) -> list[Track | None]:
+    from ..usecase.get_tracks_usecase import GetTracksUsecase
+
+    get_tracks_usecase = GetTracksUsecase(authorization_service=authorization_service)
+    return await get_tracks_usecase.execute(track_ids=track_ids)
+
+
+async def get_current_playing() -> Track | None:
+    from ..usecase.get_current_playing_usecase import GetCurrentPlayingUsecase
+
+    get_current_playing_usecase = GetCurrentPlayingUsecase(authorization_service=authorization_service)
+    return await get_current_playing_usecase.execute()
 
 
 def post_current_playing() -> bool:
-    current_playing_usecase = CurrentPlayingUsecase(authorization_service=authorization_service)
+    current_playing_usecase = CurrentPlayingUsecase(
+        authorization_service=authorization_service,
+        posted_track_repository=posted_track_repository,
+        slack_client=get_slack_client(),
+        daily_digest_repository=daily_digest_repository if Environment.is_digest_mode() else None,
+    )
     return current_playing_usecase.notificate_current_playing()
 
 
-def love_track(track_id: str) -> LoveTrackResponse:
+def get_notify_stats() -> NotifyStats:
+    return notify_state.stats()
+
+
+def next_poll_seconds() -> float:
+    """直近の通知で見た再生状態から、次に確認するまでの秒数を返す"""
+    return poll_scheduler.next_delay(notify_state.last_playback())
+
+
+async def love_track(track_id: str) -> "LoveTrackResponse":
+    from ..usecase.love_track_usecase import LoveTrackUsecase
+
     love_track_usecase = LoveTrackUsecase(authorization_service=authorization_service)
-    return love_track_usecase.execute(track_id=track_id)
+    return await love_track_usecase.execute(track_id=track_id)
+
+
+async def love_tracks(track_ids: list[str]) -> "dict[str, LoveTrackResult]":
+    from ..usecase.love_track_usecase import LoveTrackUsecase
+
+    love_track_usecase = LoveTrackUsecase(authorization_service=authorization_service)
+    return await love_track_usecase.execute_many(track_ids=track_ids)
+
+
+def prerefresh_token() -> bool:
+    return token_refresher.refresh_if_expiring()
+
+
+async def prewarm() -> bool:
+    """
+    最初のリクエストが払うコストを起動時に先に払っておく。
+    - トークンの読み込み(本番ではS3クライアントの生成と接続を含む)
+    - Spotify APIの共有クライアント(同期/非同期)の生成と接続
+    Mangumはリクエストごとにlifespanを実行するので、プロセスで1回だけ行う。行った場合はTrueを返す
+    """
+    global _is_prewarmed
+    if _is_prewarmed:
+        return False
+    _is_prewarmed = True
+
+    from ..infrastructure import async_spotipy
+
+    started = time.perf_counter()
+    steps = {
+        "token": authorization_service.get_access_token_async(),
+        "spotipy": asyncio.to_thread(spotipy_module.prewarm_shared_client, PREWARM_CONNECTIONS),
+        "async_spotipy": async_spotipy.prewarm_shared_client(PREWARM_CONNECTIONS),
+    }
+    results = await asyncio.gather(*steps.values(), return_exceptions=True)
+    for step, result in zip(steps, results, strict=True):
+        # 未認可などで失敗しても起動は止めず、最初のリクエストでやり直す
+        if isinstance(result, Exception):
+            logger.warning("failed to prewarm %s: %s", step, result)
+    logger.info("prewarmed in %.0fms", (time.perf_counter() - started) * 1000)
+    return True
+
+
+async def shutdown() -> None:
+    from ..infrastructure.async_spotipy import aclose_shared_client
+
+    await aclose_shared_client()
@@ -1,21 +1,60 @@
-from .custom_logger import get_logger
+import asyncio
+from contextlib import asynccontextmanager
+
+from .custom_logger import LOG_SAMPLE_EVERY, get_logger
 from fastapi import FastAPI
+from .interface import track
 from mangum import Mangum
 from .router import authorize as authorize_router
 from .router import current as current_router
+from .router import memory as memory_router
+from .router import metrics as metrics_router
+from .router import profiling as profiling_router
+from .router import server_timing as server_timing_router
 from .router import track as track_router
+from .util.environment import Environment
+from .util.invocation_metrics import instrument_handler
+from .util.memory import tracker as memory_tracker
 
-logger = get_logger(__name__)
+# healthcheckのログは間引く
+logger = get_logger(__name__, sample_every=LOG_SAMPLE_EVERY)
 logger.info("start")
 logger.debug("debug: ON")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await track.prewarm()
+    if Environment.is_lambda():
+        # Mangumはリクエストごとにstartup/shutdownを実行するので、
+        # コネクションプールは閉じずにコンテナが生きている間使い回す
+        yield
+        return
+    # トークンの先行リフレッシュをバックグラウンドで回す(uvicornで起動した場合のみ)
+    track.token_refresher.start()
+    yield
+    await track.token_refresher.stop()
+    await track.shutdown()
+
+
 app = FastAPI(
     title="My Spotify API",
     version="0.0.1",
+    lifespan=lifespan,
 )
 app.include_router(track_router.router, prefix="/track", tags=["track"])
 app.include_router(current_router.router, prefix="/current", tags=["current"])
 app.include_router(authorize_router.router, tags=["authorize"])
+app.include_router(metrics_router.router, tags=["metrics"])
+app.add_middleware(metrics_router.MetricsMiddleware)
+app.add_middleware(server_timing_router.ServerTimingMiddleware)
+if Environment.is_profiling_enabled():
+    app.include_router(profiling_router.router, tags=["profiling"])
+    app.add_middleware(profiling_router.ProfilingMiddleware)
+if Environment.is_memory_tracking_enabled():
+    memory_tracker.start()
+    app.include_router(memory_router.router, tags=["memory"])
+    app.add_middleware(memory_router.MemoryTrackingMiddleware)
 
 
 @app.get("/healthcheck")
@@ -30,4 +69,10 @@ def hello():
     }
 
 
-handler = Mangum(app, lifespan="off")
+# 呼び出しごとに上流サービスの呼び出し回数などをEMFのログに出す
+handler = instrument_handler("main")(Mangum(app, lifespan="auto"))
+
+if Environment.is_lambda():
+    # Lambdaでは初期化フェーズ(import時)に済ませて、最初のリクエストから外す。
+    # Mangumと同じイベントループで実行して、非同期クライアントの接続をそのまま使い回す
+    asyncio.get_event_loop().run_until_complete(track.prewarm())
@@ -1,12 +1,44 @@
+from dataclasses import asdict
+
+from .custom_logger import get_logger
 from .interface import track
+from .usecase.current_playing_usecase import NotifyStats
+from .util.invocation_metrics import instrument_handler
+
+logger = get_logger(__name__)
+
+
+def _to_dict(stats: NotifyStats) -> dict:
+    result = asdict(stats)
+    result["last_result"] = stats.last_result.value if stats.last_result is not None else None
+    return result
 
 
+@instrument_handler("notificate_current_playing")
 def handler(event, context):
     try:
+        # 回数はコンテナが使い回される間ずっと積み上がるので、この実行の前との差分を返す
+        before = track.get_notify_stats()
+        # 毎分実行されるので、APIのリクエストより先にトークンをリフレッシュしておく
+        track.prerefresh_token()
         is_success = track.post_current_playing()
         if not is_success:
             return {"status": "ERROR", "message": "Failed to post current playing."}
-        return {"status": "SUCCESS"}
+        lifetime_stats = track.get_notify_stats()
+        stats = _to_dict(lifetime_stats.since(before))
+        next_poll_seconds = track.next_poll_seconds()
+        logger.info(
+            "notify stats: %s lifetime: %s next_poll_seconds: %s",
+            stats,
+            _to_dict(lifetime_stats),
+            next_poll_seconds,
+        )
+        return {
+            "status": "SUCCESS",
+            "stats": stats,
+            "lifetime_stats": _to_dict(lifetime_stats),
+            "next_poll_seconds": next_poll_seconds,
+        }
     except Exception as e:
         return {"status": "ERROR", "message": str(e)}
 
@@ -0,0 +1,50 @@
+import asyncio
+import signal
+from contextlib import suppress
+
+from .custom_logger import get_logger
+from .interface import track
+
+logger = get_logger(__name__)
+
+# 通知に失敗したときに再実行するまでの秒数
+RETRY_INTERVAL_SECONDS = 30
+
+
+async def run(stop_event: asyncio.Event) -> None:
+    """
+    現在再生中の曲の通知を、stop_eventがセットされるまで繰り返す。
+    Lambdaと違い、Spotifyクライアント・トークン・投稿済みの記録はプロセス内に持ち続ける
+    """
+    track.token_refresher.start()
+    try:
+        while not stop_event.is_set():
+            try:
+                # 通知処理は同期的(spotipy/requests)なので、スレッドで実行してループを止めない
+                await asyncio.to_thread(track.post_current_playing)
+                delay = track.next_poll_seconds()
+            except Exception as e:
+                logger.warning("failed to notify current playing: %s", e)
+                delay = RETRY_INTERVAL_SECONDS
+            logger.debug("next poll in %s seconds", delay)
+            with suppress(TimeoutError):
+                await asyncio.wait_for(stop_event.wait(), timeout=delay)
+    finally:
+        await track.token_refresher.stop()
+        await track.shutdown()
+        logger.info("poller stopped")
+
+
+async def main() -> None:
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        # docker compose stopはSIGTERMを送るので、実行中の通知を終えてから止める
+        loop.add_signal_handler(sig, stop_event.set)
+    logger.info("poller started")
+    await run(stop_event)
+
+
+if __name__ == "__main__":
+    # python -m spotify_api.poller
+    asyncio.run(main())
@@ -2,10 +2,11 @@ from ..custom_logger import get_logger
 from fastapi import APIRouter, HTTPException, Request, Response
 from ..interface import authorize
 from .response import BaseResponse
+from .server_timing import TimingRoute
 
 logger = get_logger(__name__)
 
-router = APIRouter()
+router = APIRouter(route_class=TimingRoute)
 
 
 @router.get("/authorize", status_code=303)
@@ -25,5 +26,6 @@ async def authorize_callback(request: Request):
     if code is None:
         raise HTTPException(status_code=400, detail="code is not found.")
     result = authorize.authorize_callback(code=code)
-    logger.debug(result)
+    # トークンそのものはログに出さない
+    logger.debug("authorized. expires_at: %s", result.get("expires_at"))
     return BaseResponse()
@@ -2,9 +2,10 @@ from fastapi import APIRouter, Header
 from ..interface import track
 from .response import BaseResponse, TrackResponse
 from .response.track_response_translator import TrackResponseTranslator
+from .server_timing import TimingRoute
 from ..util.environment import Environment
 
-router = APIRouter()
+router = APIRouter(route_class=TimingRoute)
 
 
 @router.get("/playing", response_model=TrackResponse | BaseResponse)
@@ -13,7 +14,7 @@ async def get_current_playing(access_token: str | None = Header(None)):
     現在流れている曲を取得する
     """
     Environment.valid_access_token(access_token)
-    track_model = track.get_current_playing()
+    track_model = await track.get_current_playing()
     if track_model is None:
         return BaseResponse(message="no track is playing now.")
     data = TrackResponseTranslator.to_entity(track_model)
@@ -21,7 +22,7 @@ async def get_current_playing(access_token: str | None = Header(None)):
 
 
 @router.post("/playing", response_model=BaseResponse)
-async def post_current_playing(access_token: str | None = Header(None)):
+def post_current_playing(access_token: str | None = Header(None)):
     """
     現在流れている曲を取得して、Slackに通知する
     """
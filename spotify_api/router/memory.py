@@ -0,0 +1,54 @@
+from dataclasses import asdict
+
+from fastapi import APIRouter, Header
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..custom_logger import get_logger
+from ..util.environment import Environment
+from ..util.memory import tracker
+from .server_timing import TimingRoute
+
+logger = get_logger(__name__)
+
+router = APIRouter(route_class=TimingRoute)
+
+
+@router.get("/memory")
+def get_memory(access_token: str | None = Header(None)):
+    """
+    前回のレポートから増えたメモリの割り当て箇所と、キャッシュごとのサイズを返す(プロセス/Lambdaコンテナ単位)
+    """
+    Environment.valid_access_token(access_token or "")
+    return asdict(tracker.report())
+
+
+class MemoryTrackingMiddleware:
+    """
+    リクエストの数を数えて、MEMORY_REPORT_EVERYリクエストごとにメモリのレポートをログに出すASGIミドルウェア。
+    MEMORY_TRACKING=trueのときだけ登録するので、無効な間は何もしない
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if scope["type"] == "http":
+                _log_report()
+
+
+def _log_report() -> None:
+    report = tracker.on_request()
+    if report is None:
+        return
+    logger.info(
+        "memory: %s requests, traced %s bytes, retained %.0f bytes/request, caches %s",
+        report.requests,
+        report.traced_bytes,
+        report.retained_bytes_per_request,
+        report.cache_sizes,
+    )
+    for site in report.top_allocations:
+        logger.info("memory: %s %+d bytes (%+d blocks)", site.location, site.size_diff, site.count_diff)
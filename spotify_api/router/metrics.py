@@ -0,0 +1,69 @@
+import time
+from collections.abc import Callable
+from typing import Any
+
+from fastapi import APIRouter, Header
+from fastapi.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..util.environment import Environment
+from ..util.metrics import http_request_duration_seconds, http_requests_total, registry
+from .server_timing import TimingRoute
+
+router = APIRouter(route_class=TimingRoute)
+
+# Prometheusのテキスト形式
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics(access_token: str | None = Header(None)):
+    """
+    ルートごと・上流サービスごとのリクエスト数とレイテンシを返す(プロセス/Lambdaコンテナ単位)
+    """
+    Environment.valid_access_token(access_token or "")
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+
+
+class MetricsMiddleware:
+    """
+    ルート(パスのテンプレート)ごとのリクエスト数とレイテンシを記録するASGIミドルウェア
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self._route_paths: dict[Callable[..., Any], str] | None = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = self._route_path(scope)
+            http_request_duration_seconds.observe(time.perf_counter() - started, scope["method"], route)
+            http_requests_total.inc(scope["method"], route, str(status))
+
+    def _route_path(self, scope: Scope) -> str:
+        """
+        マッチしたルートのパスのテンプレート(/track/{track_id}など)を返す。
+        実際のパスをラベルにすると、トラックIDの数だけ系列が増えてしまうため
+        """
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._route_paths is None:
+            routes = scope["app"].routes
+            self._route_paths = {route.endpoint: route.path for route in routes if hasattr(route, "endpoint")}
+        return self._route_paths.get(endpoint, "unmatched")
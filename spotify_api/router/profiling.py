@@ -0,0 +1,77 @@
+import asyncio
+import uuid
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..custom_logger import get_logger
+from ..util.environment import Environment
+from ..util.profiling import SamplingProfiler, instrument_loop, profiles
+from .server_timing import TimingRoute
+
+logger = get_logger(__name__)
+
+router = APIRouter(route_class=TimingRoute)
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+def get_profile(
+    profile_id: str,
+    format: str = Query("tree", regex="^(tree|collapsed)$"),
+    access_token: str | None = Header(None),
+):
+    """
+    X-Profile-Idで返したプロファイルを取得する。collapsedはflamegraph.plやspeedscopeに渡せる形式
+    """
+    Environment.valid_access_token(access_token or "")
+    profile = profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="profile not found.")
+    return profile.collapsed() if format == "collapsed" else profile.tree()
+
+
+class ProfilingMiddleware:
+    """
+    X-Profile: trueと正しいaccess-tokenがついたリクエストを、サンプリングプロファイラーで計測するASGIミドルウェア。
+    結果はX-Profile-Idで返したIDで/profiles/{profile_id}から取得できる。
+    PROFILING=trueのときだけ登録するので、無効な間は何もしない
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not _is_requested(Headers(scope=scope)):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Profile-Id", profile_id)
+            await send(message)
+
+        instrument_loop(asyncio.get_running_loop())
+        profiler = SamplingProfiler()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.stop()
+            profile = profiler.to_profile(profile_id, scope["method"], scope["path"])
+            profiles.add(profile)
+            logger.info("profile %s: %s %s %s samples", profile_id, profile.method, profile.path, profile.samples)
+
+
+def _is_requested(headers: Headers) -> bool:
+    if headers.get("x-profile") != "true":
+        return False
+    try:
+        Environment.valid_access_token(headers.get("access-token", ""))
+    except Exception:
+        # 認証に失敗したリクエストはプロファイルせずにそのまま通す(エンドポイント側で弾かれる)
+        return False
+    return True
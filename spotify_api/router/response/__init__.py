@@ -1,3 +1,4 @@
 from .authorize_response import AuthorizeResponse as AuthorizeResponse
 from .base_response import BaseResponse as BaseResponse
 from .track_response import TrackResponse as TrackResponse
+from .track_response import TracksResponse as TracksResponse
@@ -21,3 +21,7 @@ class Track(BaseModel):
 
 class TrackResponse(BaseResponse):
     data: Track = Field(description="Track data")
+
+
+class TracksResponse(BaseResponse):
+    data: list[Track | None] = Field(description="Track data in the requested order (null if not found)")
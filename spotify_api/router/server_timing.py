@@ -0,0 +1,104 @@
+import asyncio
+import functools
+import time
+from collections.abc import Callable, Coroutine
+from typing import Any
+
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..util import profiling, server_timing
+from ..util.environment import Environment
+
+
+class ServerTimingMiddleware:
+    """
+    SERVER_TIMING=trueのとき、フェーズごとの処理時間をServer-Timingヘッダーで返すASGIミドルウェア
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not Environment.is_server_timing_enabled():
+            await self.app(scope, receive, send)
+            return
+
+        timing, token = server_timing.begin()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                total = time.perf_counter() - timing.started_at
+                MutableHeaders(scope=message).append("Server-Timing", timing.header_value(total))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            server_timing.end(token)
+
+
+class TimingRoute(APIRoute):
+    """
+    エンドポイントの関数の処理時間(endpoint)と、その後のレスポンスの検証・シリアライズの時間(serialize)を計測するルート。
+    SERVER_TIMINGはリクエストごとに見るので、無効でもラップは常に入る(計測中でなければそのまま呼ぶだけ)
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        # FastAPIはdependant.callを呼び出すので、同期/非同期を保ったまま差し替える
+        if self.dependant.call is not None:
+            self.dependant.call = _timed_endpoint(self.dependant.call)
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            response = await handler(request)
+            timing = server_timing.current()
+            if timing is not None and timing.endpoint_finished_at is not None:
+                timing.add("serialize", time.perf_counter() - timing.endpoint_finished_at)
+            return response
+
+        return timed_handler
+
+
+def _timed_endpoint(call: Callable[..., Any]) -> Callable[..., Any]:
+    if asyncio.iscoroutinefunction(call):
+
+        @functools.wraps(call)
+        async def timed_async(*args: Any, **kwargs: Any) -> Any:
+            if server_timing.current() is None:
+                return await call(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                _finish_endpoint(started)
+
+        return timed_async
+
+    @functools.wraps(call)
+    def timed(*args: Any, **kwargs: Any) -> Any:
+        if server_timing.current() is None:
+            return call(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return call(*args, **kwargs)
+        finally:
+            _finish_endpoint(started)
+
+    if profiling.ENABLED:
+        # 同期のエンドポイントはスレッドプールで動くので、プロファイル中ならこのスレッドも対象にする
+        return profiling.sampled_in_thread(timed)
+    return timed
+
+
+def _finish_endpoint(started: float) -> None:
+    timing = server_timing.current()
+    if timing is not None:
+        timing.endpoint_finished_at = time.perf_counter()
+        timing.add("endpoint", timing.endpoint_finished_at - started)
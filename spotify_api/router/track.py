@@ -1,10 +1,31 @@
-from fastapi import APIRouter, Header
+from fastapi import APIRouter, Header, HTTPException, Query
+from pydantic import BaseModel, Field
 from ..interface import track
-from .response import BaseResponse, TrackResponse
+from .response import BaseResponse, TrackResponse, TracksResponse
 from .response.track_response_translator import TrackResponseTranslator
+from .server_timing import TimingRoute
 from ..util.environment import Environment
 
-router = APIRouter()
+router = APIRouter(route_class=TimingRoute)
+
+# 1リクエストで指定できるIDの上限
+MAX_TRACK_IDS = 500
+
+
+@router.get("", response_model=TracksResponse)
+async def get_tracks(
+    ids: str = Query(description="Comma-separated Spotify track IDs"), access_token: str | None = Header(None)
+):
+    """
+    指定した曲をまとめて取得する。見つからなかった曲はnullになる
+    """
+    Environment.valid_access_token(access_token)
+    track_ids = [track_id.strip() for track_id in ids.split(",") if track_id.strip() != ""]
+    if len(track_ids) > MAX_TRACK_IDS:
+        raise HTTPException(status_code=400, detail=f"too many ids. max is {MAX_TRACK_IDS}.")
+    track_models = await track.get_tracks(track_ids=track_ids)
+    data = [TrackResponseTranslator.to_entity(t) if t is not None else None for t in track_models]
+    return TracksResponse(data=data)
 
 
 @router.get("/{track_id}", response_model=TrackResponse)
@@ -14,8 +35,26 @@ def get_track(track_id: str, access_token: str | None = Header(None)):
     """
     Environment.valid_access_token(access_token)
     track_model = track.get_track(track_id=track_id)
-    data = TrackResponseTranslator.to_entity(track_model) if track_model is not None else None
-    return TrackResponse(data=data)
+    if track_model is None:
+        # 存在しない(または不正な)IDは、ネガティブキャッシュから返す場合も404にする
+        raise HTTPException(status_code=404, detail="track not found.")
+    return TrackResponse(data=TrackResponseTranslator.to_entity(track_model))
+
+
+class LoveTracksRequest(BaseModel):
+    track_ids: list[str] = Field(description="Spotify track IDs")
+
+
+@router.post("/love", response_model=BaseResponse)
+async def love_tracks(request: LoveTracksRequest, access_token: str | None = Header(None)):
+    """
+    指定した曲をまとめて「いいね」する。結果は曲ごとに返す
+    """
+    Environment.valid_access_token(access_token)
+    if len(request.track_ids) > MAX_TRACK_IDS:
+        raise HTTPException(status_code=400, detail=f"too many ids. max is {MAX_TRACK_IDS}.")
+    results = await track.love_tracks(track_ids=request.track_ids)
+    return BaseResponse(data={"results": {track_id: result.value for track_id, result in results.items()}})
 
 
 @router.post("/{track_id}/love", response_model=BaseResponse)
@@ -24,5 +63,5 @@ async def love_track(track_id: str, access_token: str | None = Header(None)):
     指定した曲を「いいね」する
     """
     Environment.valid_access_token(access_token)
-    response = track.love_track(track_id=track_id)
+    response = await track.love_track(track_id=track_id)
     return BaseResponse(data={"result": response.result.value})
@@ -1,26 +1,103 @@
+import asyncio
+import threading
+from dataclasses import dataclass
 from datetime import datetime as DateTime
-from typing import cast
+from typing import Any, cast
 
 from ..custom_logger import get_logger
-from ..domain.infrastructure.token_info_repository import TokenInfoRepository
+from ..domain.infrastructure.token_info_repository import TokenInfoConflictError, TokenInfoRepository
 from ..infrastructure.spotify_oauth import SpotifyOauth
+from ..util.server_timing import phase
 
 logger = get_logger(__name__)
 
+# プロセス内でリフレッシュを1本にまとめるためのロック
+_refresh_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class RefreshStats:
+    # リクエストの処理中に同期的にリフレッシュした回数
+    inline: int
+    # バックグラウンド(先行リフレッシュ)でリフレッシュした回数
+    background: int
+
 
 class AuthorizationService:
     def __init__(self, token_repository: TokenInfoRepository):
         self.token_repository = token_repository
         self.spotify_oauth = SpotifyOauth()
+        self._inline_refresh_count = 0
+        self._background_refresh_count = 0
 
     def get_access_token(self) -> str:
-        token_info = self.token_repository.load()
+        with phase("token"):
+            token_info = self.token_repository.load()
         if token_info is None:
             raise Exception("Spotify token not found. Please authorize first by accessing /authorize endpoint")
 
-        expires_at = token_info["expires_at"]
-        if expires_at < DateTime.now().timestamp():
+        if self._is_expired(token_info):
             # 期限切れの場合はリフレッシュトークンを使ってアクセストークンを更新する
-            token_info = self.spotify_oauth.refresh_access_token(token_info["refresh_token"])
-            self.token_repository.save(token_info=token_info)
+            with phase("refresh"):
+                token_info, _ = self._refresh()
         return cast(str, token_info["access_token"])
+
+    async def get_access_token_async(self) -> str:
+        """get_access_tokenをイベントループを止めずに実行する(S3へのアクセスやリフレッシュが発生しうるため)"""
+        return await asyncio.to_thread(self.get_access_token)
+
+    def get_expires_at(self) -> float | None:
+        """保存済みトークンの有効期限(unixtime)を返す。未認可の場合はNone"""
+        token_info = self.token_repository.load()
+        if token_info is None:
+            return None
+        return float(token_info["expires_at"])
+
+    def refresh_if_expiring(self, lead_seconds: float) -> bool:
+        """
+        有効期限までlead_seconds未満になっていれば、リクエストを待たずにリフレッシュする。
+        リフレッシュした場合はTrueを返す
+        """
+        token_info = self.token_repository.load()
+        if token_info is None or not self._is_expired(token_info, lead_seconds=lead_seconds):
+            return False
+        _, is_refreshed = self._refresh(lead_seconds=lead_seconds, background=True)
+        return is_refreshed
+
+    def refresh_stats(self) -> RefreshStats:
+        return RefreshStats(inline=self._inline_refresh_count, background=self._background_refresh_count)
+
+    def _refresh(self, lead_seconds: float = 0, background: bool = False) -> tuple[dict[str, Any], bool]:
+        """
+        アクセストークンをリフレッシュして、(トークン情報, このスレッドでリフレッシュしたか) を返す。
+        同じプロセス内の同時リクエストはロックで待たせ、先に終わったリフレッシュの結果を使う。
+        別プロセスとの競合は条件付き保存で検知し、負けた側は保存済みのトークンを読み直す。
+        """
+        with _refresh_lock:
+            token_info, version = self.token_repository.load_with_version()
+            if token_info is None:
+                raise Exception("Spotify token not found. Please authorize first by accessing /authorize endpoint")
+            if not self._is_expired(token_info, lead_seconds=lead_seconds):
+                # ロック待ちの間に他のスレッド(またはプロセス)がリフレッシュ済み
+                return token_info, False
+
+            new_token_info = self.spotify_oauth.refresh_access_token(token_info["refresh_token"])
+            # 実際にリフレッシュした回数だけを数える(ロックの中なので、スレッド間で競合しない)
+            if background:
+                self._background_refresh_count += 1
+            else:
+                # 先行リフレッシュが間に合わなかったケースなので記録しておく
+                self._inline_refresh_count += 1
+                logger.info("token refreshed inline. count=%s", self._inline_refresh_count)
+            try:
+                self.token_repository.save_if_unchanged(token_info=new_token_info, version=version)
+            except TokenInfoConflictError:
+                logger.info("token_info was refreshed by another process. reload it.")
+                latest_token_info = self.token_repository.load()
+                if latest_token_info is not None and not self._is_expired(latest_token_info):
+                    return latest_token_info, True
+            return new_token_info, True
+
+    @staticmethod
+    def _is_expired(token_info: dict[str, Any], lead_seconds: float = 0) -> bool:
+        return bool(token_info["expires_at"] - lead_seconds < DateTime.now().timestamp())
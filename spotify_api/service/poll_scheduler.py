@@ -0,0 +1,48 @@
+import os
+
+from ..domain.model.playback import Playback
+
+# 曲が切り替わる予定時刻から、この秒数だけ遅らせて確認する(切り替え直後のずれを吸収する)
+POLL_MARGIN_SECONDS = 2.0
+MIN_POLL_SECONDS = float(os.getenv("POLL_MIN_SECONDS", "5"))
+# スキップや一時停止に気づくまでの最大の遅れ
+MAX_POLL_SECONDS = float(os.getenv("POLL_MAX_SECONDS", "60"))
+# 何も再生していないときの間隔。続く限り倍々に伸ばす(一時停止からの再開にすぐ気づけるように短くから始める)
+IDLE_POLL_SECONDS = 15.0
+# 毎分実行より間隔を空けると、その間に始まって終わった曲を取りこぼすので、MAX_POLL_SECONDSを超えないようにする
+MAX_IDLE_POLL_SECONDS = float(os.getenv("POLL_MAX_IDLE_SECONDS", str(MAX_POLL_SECONDS)))
+
+
+class PollScheduler:
+    """
+    現在再生中のトラックを次にいつ確認すればよいかを決める。
+    再生中は曲の残り時間(duration_ms - progress_ms)の後、何も再生していなければmax_secondsまで間隔を伸ばしていく
+    """
+
+    def __init__(
+        self,
+        min_seconds: float = MIN_POLL_SECONDS,
+        max_seconds: float = MAX_POLL_SECONDS,
+        idle_seconds: float = IDLE_POLL_SECONDS,
+        max_idle_seconds: float = MAX_IDLE_POLL_SECONDS,
+        margin_seconds: float = POLL_MARGIN_SECONDS,
+    ) -> None:
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.idle_seconds = idle_seconds
+        self.max_idle_seconds = min(max_idle_seconds, max_seconds)
+        self.margin_seconds = margin_seconds
+        self._idle_count = 0
+
+    def next_delay(self, playback: Playback | None) -> float:
+        """
+        今回の確認結果から、次に確認するまでの秒数を返す
+        """
+        if playback is None or not playback.is_playing:
+            delay = min(self.idle_seconds * (2**self._idle_count), self.max_idle_seconds)
+            self._idle_count += 1
+            return delay
+
+        self._idle_count = 0
+        remaining_seconds = max(playback.track.duration_ms - playback.progress_ms, 0) / 1000
+        return min(max(remaining_seconds + self.margin_seconds, self.min_seconds), self.max_seconds)
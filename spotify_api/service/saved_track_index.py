@@ -0,0 +1,130 @@
+import asyncio
+import os
+import threading
+import time
+from collections.abc import Awaitable, Callable, Iterable
+
+from ..custom_logger import get_logger
+from ..util.environment import Environment
+
+logger = get_logger(__name__)
+
+# ライブラリの同期からこの秒数が経ったら、インデックスは古いとみなしてAPIで確認する
+SAVED_TRACK_INDEX_TTL_SECONDS = float(os.getenv("SAVED_TRACK_INDEX_TTL_SECONDS", "600"))
+# バックグラウンドで同期できない場合(Lambda)に、リクエストの中で同期を待つ最大の秒数
+SAVED_TRACK_INDEX_INLINE_SYNC_SECONDS = float(os.getenv("SAVED_TRACK_INDEX_INLINE_SYNC_SECONDS", "3"))
+
+
+class SavedTrackIndex:
+    """
+    ユーザーがSave(いいね)済みのトラックIDをプロセス内で保持する。
+    ライブラリ全体の同期で作り直し、いいねに成功するたびに追加する。
+    background_syncがFalseなら、古くなったときの最初のリクエストの中でinline_sync_seconds以内だけ同期を待つ
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = SAVED_TRACK_INDEX_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+        background_sync: bool = True,
+        inline_sync_seconds: float = SAVED_TRACK_INDEX_INLINE_SYNC_SECONDS,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.background_sync = background_sync
+        self.inline_sync_seconds = inline_sync_seconds
+        self._clock = clock
+        # 最後にリクエストの中での同期が時間切れ・失敗した時刻(ttl_secondsの間は待たずにAPIで確認する)
+        self._inline_sync_failed_at: float | None = None
+        self._lock = threading.Lock()
+        self._track_ids: set[str] = set()
+        self._synced_at: float | None = None
+        # 同期中に追加されたID(同期結果で上書きされて消えないようにする)
+        self._added_while_syncing: set[str] | None = None
+        self._sync_task: asyncio.Task | None = None
+
+    def is_stale(self) -> bool:
+        with self._lock:
+            return self._synced_at is None or self._clock() - self._synced_at >= self.ttl_seconds
+
+    def lookup(self, track_ids: list[str]) -> list[bool] | None:
+        """
+        Save済みかどうかを返す。インデックスが古い場合はNoneを返すので、呼び出し側でAPIに問い合わせる
+        """
+        if self.is_stale():
+            return None
+        with self._lock:
+            return [track_id in self._track_ids for track_id in track_ids]
+
+    def add(self, track_ids: Iterable[str]) -> None:
+        track_ids = list(track_ids)
+        with self._lock:
+            self._track_ids.update(track_ids)
+            if self._added_while_syncing is not None:
+                self._added_while_syncing.update(track_ids)
+
+    def replace(self, track_ids: Iterable[str]) -> None:
+        """同期した結果でインデックスを作り直す"""
+        with self._lock:
+            self._track_ids = set(track_ids) | (self._added_while_syncing or set())
+            self._added_while_syncing = None
+            self._synced_at = self._clock()
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._track_ids)
+
+    async def sync(self, fetch_saved_track_ids: Callable[[], Awaitable[Iterable[str]]]) -> None:
+        with self._lock:
+            self._added_while_syncing = set()
+        try:
+            track_ids = await fetch_saved_track_ids()
+        except BaseException:
+            # 時間切れで取りやめた(CancelledError)場合も、同期中の状態を戻す
+            with self._lock:
+                self._added_while_syncing = None
+            raise
+        self.replace(track_ids)
+        logger.info("saved track index synced. size=%s", self.size())
+
+    async def refresh_if_stale(self, fetch_saved_track_ids: Callable[[], Awaitable[Iterable[str]]]) -> None:
+        """
+        インデックスが古ければ同期する。background_syncならバックグラウンドで始めるだけで待たない。
+        そうでなければinline_sync_secondsまで待ち、終わらなければ取りやめる(呼び出し側はAPIで確認する)
+        """
+        if self.background_sync:
+            self.schedule_sync(fetch_saved_track_ids)
+            return
+        with self._lock:
+            failed_at = self._inline_sync_failed_at
+        if not self.is_stale() or (failed_at is not None and self._clock() - failed_at < self.ttl_seconds):
+            return
+        try:
+            await asyncio.wait_for(self.sync(fetch_saved_track_ids), timeout=self.inline_sync_seconds)
+        except Exception as e:
+            # ライブラリが大きすぎて間に合わない場合に、毎回待たされないようにする
+            logger.warning("failed to sync saved track index within %ss: %r", self.inline_sync_seconds, e)
+            with self._lock:
+                self._inline_sync_failed_at = self._clock()
+
+    def schedule_sync(self, fetch_saved_track_ids: Callable[[], Awaitable[Iterable[str]]]) -> None:
+        """
+        インデックスが古ければ、リクエストを待たせずにバックグラウンドで同期する。
+        同期中であれば新たには始めない
+        """
+        if not self.background_sync:
+            return
+        if not self.is_stale() or (self._sync_task is not None and not self._sync_task.done()):
+            return
+        self._sync_task = asyncio.create_task(self._sync_quietly(fetch_saved_track_ids))
+
+    async def _sync_quietly(self, fetch_saved_track_ids: Callable[[], Awaitable[Iterable[str]]]) -> None:
+        try:
+            await self.sync(fetch_saved_track_ids)
+        except Exception as e:
+            logger.warning("failed to sync saved track index: %s", e)
+
+
+# ワーカーごとに1つだけ持つ。
+# Lambdaではレスポンスを返すとコンテナが止まり、バックグラウンドの同期が次の呼び出しまで進まないので、
+# 古くなったときの最初のリクエストの中で同期する(コンテナが温かい間は、その後のリクエストはインデックスで答える)
+saved_track_index = SavedTrackIndex(background_sync=not Environment.is_lambda())
@@ -0,0 +1,85 @@
+import asyncio
+import random
+from datetime import datetime as DateTime
+
+from ..custom_logger import get_logger
+from .authorization_service import AuthorizationService
+
+logger = get_logger(__name__)
+
+# 有効期限のこの秒数前になったら先行してリフレッシュする
+REFRESH_LEAD_SECONDS = 300
+# 複数のワーカーが同時にリフレッシュしないよう、lead_secondsにこの範囲のゆらぎを加える
+REFRESH_JITTER_SECONDS = 60
+# トークン未保存やリフレッシュ失敗時に再確認するまでの秒数
+RETRY_INTERVAL_SECONDS = 60
+
+
+class TokenRefresher:
+    """
+    アクセストークンを有効期限より前にリフレッシュして、リクエスト処理中のリフレッシュを避ける
+    """
+
+    def __init__(
+        self,
+        authorization_service: AuthorizationService,
+        lead_seconds: float = REFRESH_LEAD_SECONDS,
+        jitter_seconds: float = REFRESH_JITTER_SECONDS,
+    ) -> None:
+        self.authorization_service = authorization_service
+        self.lead_seconds = lead_seconds
+        self.jitter_seconds = jitter_seconds
+        self._task: asyncio.Task | None = None
+
+    def refresh_if_expiring(self, lead_seconds: float | None = None) -> bool:
+        """
+        期限が近ければリフレッシュする(cronの1ステップとして同期的にも使える)
+        """
+        if lead_seconds is None:
+            lead_seconds = self._lead_with_jitter()
+        try:
+            return self.authorization_service.refresh_if_expiring(lead_seconds=lead_seconds)
+        except Exception as e:
+            logger.warning("failed to refresh token in advance: %s", e)
+            return False
+
+    def start(self) -> None:
+        """FastAPIのlifespanなど、イベントループ上でバックグラウンドタスクとして開始する"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            lead_seconds = self._lead_with_jitter()
+            delay = await asyncio.to_thread(self._seconds_until_refresh, lead_seconds)
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            is_refreshed = await asyncio.to_thread(self.refresh_if_expiring, lead_seconds)
+            if not is_refreshed:
+                await asyncio.sleep(RETRY_INTERVAL_SECONDS)
+
+    def _seconds_until_refresh(self, lead_seconds: float) -> float:
+        """リフレッシュすべき時刻までの秒数。長くても一定間隔で保存先の状態を確認し直す"""
+        try:
+            expires_at = self.authorization_service.get_expires_at()
+        except Exception as e:
+            logger.warning("failed to load token: %s", e)
+            return RETRY_INTERVAL_SECONDS
+        if expires_at is None:
+            return RETRY_INTERVAL_SECONDS
+        seconds = expires_at - lead_seconds - DateTime.now().timestamp()
+        return min(seconds, RETRY_INTERVAL_SECONDS * 10)
+
+    def _lead_with_jitter(self) -> float:
+        return self.lead_seconds + random.uniform(0, self.jitter_seconds)
@@ -14,7 +14,7 @@ class AuthorizeUsecase:
 
     def get_authorize_url(self) -> str:
         authorize_url = self.spotify_oauth.get_authorize_url()
-        logger.info("authorize_url: " + authorize_url)
+        logger.info("authorize_url: %s", authorize_url)
         return authorize_url
 
     def authorize_callback(self, code: str) -> dict[str, Any]:
@@ -1,66 +1,164 @@
+import threading
+from dataclasses import dataclass
+from enum import Enum
+
 from ..custom_logger import get_logger
+from ..domain.infrastructure.daily_digest_repository import DailyDigestRepository
+from ..domain.infrastructure.posted_track_repository import PostedTrackRepository
+from ..domain.model.daily_digest import DailyDigest, DigestMessage, DigestTrack
+from ..domain.model.playback import Playback
 from ..domain.model.track import Track
 from ..domain.slack.block_builder import BlockBuilder
+from ..infrastructure.slack_client import SlackClient
 from ..infrastructure.spotipy import Spotipy
 from ..service.authorization_service import AuthorizationService
-from ..util.datetime import get_current_day_and_tomorrow
+from ..util.datetime import get_current_date_str, get_current_day_and_tomorrow
+from ..util.memory import register_cache
 
 logger = get_logger(__name__)
 
 CHANNEL_ID = "C05HGA2TK26"  # musicチャンネル
+# Slackの1メッセージのブロック数の上限は50。見出しの1ブロックを除いた分だけ曲を載せる
+MAX_TRACKS_PER_DIGEST_MESSAGE = 49
+
+
+class NotifyResult(Enum):
+    POSTED = "posted"
+    # 前回と同じ再生が続いている(Slackへの問い合わせ・投稿をしない)
+    SAME_AS_LAST = "same_as_last"
+    # 今日すでに投稿済み
+    ALREADY_POSTED = "already_posted"
+    NOT_PLAYING = "not_playing"
+
+
+@dataclass(frozen=True)
+class LastNotified:
+    track_id: str
+    progress_ms: int
+
+
+@dataclass(frozen=True)
+class NotifyStats:
+    posted: int
+    skipped_same_as_last: int
+    skipped_already_posted: int
+    not_playing: int
+    last_result: NotifyResult | None
+
+    def since(self, previous: "NotifyStats") -> "NotifyStats":
+        """previousを取ってからの回数(1回の実行の分だけを取り出すのに使う)"""
+        return NotifyStats(
+            posted=self.posted - previous.posted,
+            skipped_same_as_last=self.skipped_same_as_last - previous.skipped_same_as_last,
+            skipped_already_posted=self.skipped_already_posted - previous.skipped_already_posted,
+            not_playing=self.not_playing - previous.not_playing,
+            last_result=self.last_result,
+        )
+
+
+class NotifyState:
+    """
+    最後に通知(または通知済みと判定)した再生と、結果ごとの回数を保持する。
+    Lambdaのコンテナが使い回される間は、呼び出しをまたいで残る
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._last_notified: LastNotified | None = None
+        self._counts = dict.fromkeys(NotifyResult, 0)
+        self._last_result: NotifyResult | None = None
+        self._last_playback: Playback | None = None
+
+    def is_same_as_last(self, playback: Playback) -> bool:
+        """同じトラックで、再生位置が前回から進んでいるだけなら同じ再生とみなす"""
+        with self._lock:
+            last = self._last_notified
+        return last is not None and last.track_id == playback.track.id and playback.progress_ms >= last.progress_ms
+
+    def remember(self, playback: Playback) -> None:
+        with self._lock:
+            self._last_notified = LastNotified(track_id=playback.track.id, progress_ms=playback.progress_ms)
+
+    def record(self, result: NotifyResult, playback: Playback | None = None) -> None:
+        with self._lock:
+            self._counts[result] += 1
+            self._last_result = result
+            self._last_playback = playback
+
+    def last_playback(self) -> Playback | None:
+        """直近の実行で取得した再生状態(何も再生していなければNone)"""
+        with self._lock:
+            return self._last_playback
+
+    def stats(self) -> NotifyStats:
+        with self._lock:
+            return NotifyStats(
+                posted=self._counts[NotifyResult.POSTED],
+                skipped_same_as_last=self._counts[NotifyResult.SAME_AS_LAST],
+                skipped_already_posted=self._counts[NotifyResult.ALREADY_POSTED],
+                not_playing=self._counts[NotifyResult.NOT_PLAYING],
+                last_result=self._last_result,
+            )
+
+
+notify_state = NotifyState()
+register_cache("notify_state", notify_state)
 
 
 class CurrentPlayingUsecase:
-    def __init__(self, authorization_service: AuthorizationService):
+    def __init__(
+        self,
+        authorization_service: AuthorizationService,
+        posted_track_repository: PostedTrackRepository,
+        slack_client: SlackClient,
+        state: NotifyState = notify_state,
+        daily_digest_repository: DailyDigestRepository | None = None,
+    ):
+        """
+        daily_digest_repositoryを渡した場合は、1曲ずつ投稿する代わりに1日分を1つのメッセージにまとめる
+        """
         access_token = authorization_service.get_access_token()
         self.spotipy = Spotipy.get_instance(access_token=access_token)
+        self.posted_track_repository = posted_track_repository
+        self.slack_client = slack_client
+        self.state = state
+        self.daily_digest_repository = daily_digest_repository
 
     def get_current_playing(self) -> Track | None:
         return self.spotipy.get_current_playing()
 
     def notificate_current_playing(self) -> bool:
-        track = self.get_current_playing()
-        if track is None:
+        playback = self.spotipy.get_playback()
+        if playback is None:
             logger.debug("no track is playing now.")
+            self.state.record(NotifyResult.NOT_PLAYING)
             return True
-        self._post_to_slack(track=track)
+        if self.state.is_same_as_last(playback):
+            # 毎分の実行のほとんどはこのケースなので、Slack側には何もしない
+            logger.debug("same track as last notification.")
+            self.state.record(NotifyResult.SAME_AS_LAST, playback)
+            self.state.remember(playback)
+            return True
+        if self.daily_digest_repository is not None:
+            result = self._add_to_digest(track=playback.track, daily_digest_repository=self.daily_digest_repository)
+        else:
+            result = self._post_to_slack(track=playback.track)
+        self.state.remember(playback)
+        self.state.record(result, playback)
         return True
 
-    def _post_to_slack(self, track: Track) -> None:
-        # 面倒だし使い回さないので、このファイルに実装する
-        import json
-        import os
-
-        import requests
-
+    def _post_to_slack(self, track: Track) -> NotifyResult:
         logger.info("post_to_slack")
 
         # 同じ曲が投稿されているかどうかを調べる
-        today, tomorrow = get_current_day_and_tomorrow()
-        url = "https://slack.com/api/conversations.history"
-        params = {
-            "channel": CHANNEL_ID,  # musicチャンネル
-            "oldest": str(today),
-            "latest": str(tomorrow),
-        }
-        headers = {
-            "Authorization": "Bearer " + os.environ["SLACK_BOT_TOKEN"],
-        }
-        logger.info("conversations.history")
-        response = requests.request("GET", url, headers=headers, params=params)
-        response = json.loads(response.text)
-        print(json.dumps(response))
-        for m in response["messages"]:
-            for block in m["blocks"]:
-                logger.info(block)
-                if block["type"] == "actions":
-                    try:
-                        element = block["elements"][0]
-                        spotify_id = element["value"]
-                        if spotify_id == track.id:
-                            return
-                    except Exception:
-                        pass
+        day = get_current_date_str()
+        posted_track_ids = self.posted_track_repository.load(day)
+        if posted_track_ids is None:
+            # 記録がない(初回やストアが消えた)場合だけ、Slackの履歴から作り直す
+            posted_track_ids = self._fetch_posted_track_ids(day)
+            self.posted_track_repository.save(day, posted_track_ids)
+        if track.id in posted_track_ids:
+            return NotifyResult.ALREADY_POSTED
 
         # Slackに投稿する
         block_builder = BlockBuilder().add_section(text=track.title_for_slack())
@@ -69,32 +167,95 @@ class CurrentPlayingUsecase:
         )
         # block_builder = block_builder.add_context(text=track.id)
         blocks = block_builder.build()
-        logger.info("chat.postMessage")
-        url = "https://slack.com/api/chat.postMessage"
-        payload = json.dumps(
-            {
-                "channel": CHANNEL_ID,  # musicチャンネル
-                "text": track.title_for_slack(),
-                "blocks": blocks,
-            }
+        response = self.slack_client.chat_post_message(
+            channel=CHANNEL_ID,  # musicチャンネル
+            text=track.title_for_slack(),
+            blocks=blocks,
         )
-        headers = {
-            "Authorization": "Bearer " + os.environ["SLACK_BOT_TOKEN"],
-            "Content-Type": "application/json",
-        }
-        response = requests.request("POST", url, headers=headers, data=payload)
-        response_json = response.json()
-        # print(json.dumps(response_json))
-
-        thread_ts = response_json["ts"]
-        channel_id = response_json["channel"]
-        payload = json.dumps(
-            {
-                "channel": channel_id,
-                "text": track.spotify_url,
-                "thread_ts": thread_ts,
-            }
-        )
-        response = requests.request("POST", url, headers=headers, data=payload)
-        response_json = response.json()
-        print(json.dumps(response_json))
+        posted_track_ids.add(track.id)
+        self.posted_track_repository.save(day, posted_track_ids)
+
+        # ローカルファイルなどSpotifyのURLがない曲は、スレッドに返信しない
+        if track.spotify_url is not None:
+            self.slack_client.chat_post_message(
+                channel=response["channel"],
+                text=track.spotify_url,
+                thread_ts=response["ts"],
+            )
+        return NotifyResult.POSTED
+
+    def _add_to_digest(self, track: Track, daily_digest_repository: DailyDigestRepository) -> NotifyResult:
+        """
+        今日のダイジェストに曲を追加する。
+        最後のメッセージに空きがあればchat.updateで書き換え、なければ新しいメッセージを投稿する
+        """
+        day = get_current_date_str()
+        digest = daily_digest_repository.load(day) or DailyDigest(day=day)
+        if track.id in digest.track_ids():
+            return NotifyResult.ALREADY_POSTED
+
+        entry = DigestTrack(track_id=track.id, title=track.title_for_slack())
+        last_message = digest.messages[-1] if len(digest.messages) > 0 else None
+        if last_message is None or len(last_message.tracks) >= MAX_TRACKS_PER_DIGEST_MESSAGE:
+            header = self._digest_header(day, part=len(digest.messages) + 1)
+            response = self.slack_client.chat_post_message(
+                channel=CHANNEL_ID,  # musicチャンネル
+                text=header,
+                blocks=self._digest_blocks(header, [entry]),
+            )
+            digest.messages.append(DigestMessage(channel=response["channel"], ts=response["ts"], tracks=[entry]))
+        else:
+            header = self._digest_header(day, part=len(digest.messages))
+            tracks = last_message.tracks + [entry]
+            self.slack_client.chat_update(
+                channel=last_message.channel,
+                ts=last_message.ts,
+                text=header,
+                blocks=self._digest_blocks(header, tracks),
+            )
+            last_message.tracks = tracks
+        daily_digest_repository.save(digest)
+        return NotifyResult.POSTED
+
+    @staticmethod
+    def _digest_header(day: str, part: int) -> str:
+        return f"{day} に聴いた曲" + (f" ({part})" if part > 1 else "")
+
+    @staticmethod
+    def _digest_blocks(header: str, tracks: list[DigestTrack]) -> list[dict]:
+        track_blocks = [
+            BlockBuilder.button_section_block(
+                text=digest_track.title,
+                action_id="LOVE_SPOTIFY_TRACK",
+                button_text="Love",
+                value=digest_track.track_id,
+                style="primary",
+            )
+            for digest_track in tracks
+        ]
+        return BlockBuilder().add_section(text=f"*{header}*").add_many(track_blocks).build()
+
+    def _fetch_posted_track_ids(self, day: str) -> set[str]:
+        """
+        指定した日のSlackの履歴から、投稿済みのトラックIDを集める
+        """
+        today, tomorrow = get_current_day_and_tomorrow(date_str=day)
+        track_ids: set[str] = set()
+        cursor = None
+        while True:
+            response = self.slack_client.conversations_history(
+                channel=CHANNEL_ID,  # musicチャンネル
+                oldest=str(today),
+                latest=str(tomorrow),
+                cursor=cursor,
+            )
+            for m in response.get("messages", []):
+                for block in m.get("blocks", []):
+                    if block["type"] == "actions":
+                        try:
+                            track_ids.add(block["elements"][0]["value"])
+                        except (KeyError, IndexError):
+                            pass
+            cursor = response.get("response_metadata", {}).get("next_cursor")
+            if not response.get("has_more") or not cursor:
+                return track_ids
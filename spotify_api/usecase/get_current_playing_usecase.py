@@ -0,0 +1,13 @@
+from ..domain.model.track import Track
+from ..infrastructure.async_spotipy import AsyncSpotipy
+from ..service.authorization_service import AuthorizationService
+
+
+class GetCurrentPlayingUsecase:
+    def __init__(self, authorization_service: AuthorizationService) -> None:
+        self.authorization_service = authorization_service
+
+    async def execute(self) -> Track | None:
+        access_token = await self.authorization_service.get_access_token_async()
+        spotipy = AsyncSpotipy.get_instance(access_token=access_token)
+        return await spotipy.get_current_playing()
@@ -1,12 +1,46 @@
+import os
+
+from spotipy.exceptions import SpotifyException
+
 from ..domain.model.track import Track
 from ..infrastructure.spotipy import Spotipy
 from ..service.authorization_service import AuthorizationService
+from ..util.memory import register_cache
+from ..util.ttl_lru_cache import TTLLRUCache
+
+TRACK_CACHE_MAX_SIZE = int(os.getenv("TRACK_CACHE_MAX_SIZE", "1000"))
+TRACK_CACHE_TTL_SECONDS = float(os.getenv("TRACK_CACHE_TTL_SECONDS", "3600"))
+# 見つからなかったIDは、後から参照できるようになる可能性があるので短めに保持する
+TRACK_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("TRACK_CACHE_NEGATIVE_TTL_SECONDS", "60"))
+# このステータスで失敗したIDは、見つからなかったものとしてキャッシュする
+NEGATIVE_CACHE_STATUS_CODES = (400, 404)
+
+# 曲のメタデータはほとんど変わらないので、プロセス内で共有してキャッシュする
+track_cache: TTLLRUCache[str, Track] = TTLLRUCache(
+    max_size=TRACK_CACHE_MAX_SIZE,
+    ttl_seconds=TRACK_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=TRACK_CACHE_NEGATIVE_TTL_SECONDS,
+)
+register_cache("track", track_cache)
 
 
 class GetTrackUsecase:
-    def __init__(self, authorization_service: AuthorizationService):
-        access_token = authorization_service.get_access_token()
-        self.spotipy = Spotipy.get_instance(access_token=access_token)
+    def __init__(self, authorization_service: AuthorizationService, cache: TTLLRUCache[str, Track] = track_cache):
+        self.authorization_service = authorization_service
+        self.cache = cache
 
     def execute(self, track_id: str) -> Track | None:
-        return self.spotipy.get_track(track_id)
+        is_cached, track = self.cache.get(track_id)
+        if is_cached:
+            return track
+
+        access_token = self.authorization_service.get_access_token()
+        try:
+            track = Spotipy.get_instance(access_token=access_token).get_track(track_id)
+        except SpotifyException as e:
+            # 存在しない(404)・形式が不正(400)なIDは例外になるので、キャッシュにあった場合と同じくNoneを返す
+            if e.http_status not in NEGATIVE_CACHE_STATUS_CODES:
+                raise
+            track = None
+        self.cache.set(track_id, track)
+        return track
@@ -0,0 +1,69 @@
+import asyncio
+
+import httpx
+
+from ..custom_logger import get_logger
+from ..domain.model.track import Track
+from ..infrastructure.async_spotipy import MAX_TRACK_IDS_PER_REQUEST, AsyncSpotipy, is_valid_track_id
+from ..service.authorization_service import AuthorizationService
+from ..util.ttl_lru_cache import TTLLRUCache
+from .get_track_usecase import track_cache
+
+logger = get_logger(__name__)
+
+
+class GetTracksUsecase:
+    def __init__(self, authorization_service: AuthorizationService, cache: TTLLRUCache[str, Track] = track_cache):
+        self.authorization_service = authorization_service
+        self.cache = cache
+
+    async def execute(self, track_ids: list[str]) -> list[Track | None]:
+        """
+        指定した曲をまとめて取得する。
+        キャッシュにない曲だけを50件ずつに分けて並行に問い合わせ、引数と同じ順序で返す。
+        見つからない曲と、IDの形式が不正な曲はNoneになる
+        """
+        tracks: dict[str, Track | None] = {}
+        missing_ids = []
+        for track_id in dict.fromkeys(track_ids):
+            if not is_valid_track_id(track_id):
+                # 1つでも混ざるとチャンク全体が400になるので、問い合わせずにNoneにする
+                tracks[track_id] = None
+                continue
+            is_cached, track = self.cache.get(track_id)
+            if is_cached:
+                tracks[track_id] = track
+            else:
+                missing_ids.append(track_id)
+
+        if len(missing_ids) > 0:
+            access_token = await self.authorization_service.get_access_token_async()
+            spotipy = AsyncSpotipy.get_instance(access_token=access_token)
+            chunks = [
+                missing_ids[i : i + MAX_TRACK_IDS_PER_REQUEST]
+                for i in range(0, len(missing_ids), MAX_TRACK_IDS_PER_REQUEST)
+            ]
+            results = await asyncio.gather(*[self._get_chunk(spotipy, chunk) for chunk in chunks])
+            for chunk, chunk_tracks in zip(chunks, results, strict=True):
+                if chunk_tracks is None:
+                    # 400になったチャンクはキャッシュせず、このリクエストだけNoneとして返す
+                    tracks.update(dict.fromkeys(chunk))
+                    continue
+                # Spotifyは不正なIDにもnullを返すので長さは一致する前提だが、念のため埋める
+                chunk_tracks = chunk_tracks + [None] * (len(chunk) - len(chunk_tracks))
+                for track_id, track in zip(chunk, chunk_tracks, strict=False):
+                    tracks[track_id] = track
+                    self.cache.set(track_id, track)
+
+        return [tracks[track_id] for track_id in track_ids]
+
+    @staticmethod
+    async def _get_chunk(spotipy: AsyncSpotipy, chunk: list[str]) -> list[Track | None] | None:
+        """チャンクの曲を取得する。Spotifyが400を返した場合は、他のチャンクの結果を残すためにNoneを返す"""
+        try:
+            return await spotipy.get_tracks(chunk)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != 400:
+                raise
+            logger.warning("GET /tracks returned 400 for %s ids: %s", len(chunk), e.response.text)
+            return None
@@ -1,8 +1,15 @@
+import asyncio
 from dataclasses import dataclass
 from enum import Enum
 
-from ..infrastructure.spotipy import Spotipy
+import httpx
+
+from ..custom_logger import get_logger
+from ..infrastructure.async_spotipy import MAX_TRACK_IDS_PER_REQUEST, AsyncSpotipy, is_valid_track_id
 from ..service.authorization_service import AuthorizationService
+from ..service.saved_track_index import SavedTrackIndex, saved_track_index
+
+logger = get_logger(__name__)
 
 
 class LoveTrackResult(Enum):
@@ -17,12 +24,108 @@ class LoveTrackResponse:
 
 
 class LoveTrackUsecase:
-    def __init__(self, authorization_service: AuthorizationService) -> None:
-        access_token = authorization_service.get_access_token()
-        self.spotipy = Spotipy.get_instance(access_token=access_token)
+    def __init__(
+        self, authorization_service: AuthorizationService, saved_track_index: SavedTrackIndex = saved_track_index
+    ) -> None:
+        self.authorization_service = authorization_service
+        self.saved_track_index = saved_track_index
 
-    def execute(self, track_id: str) -> LoveTrackResponse:
-        if self.spotipy.is_track_saved(track_id):
+    async def execute(self, track_id: str) -> LoveTrackResponse:
+        # インデックスが新しければ、Save済みの曲はSpotifyに問い合わせずに返せる
+        indexed = self.saved_track_index.lookup([track_id])
+        if indexed is not None and indexed[0]:
             return LoveTrackResponse(result=LoveTrackResult.ALREADY_LOVED)
-        self.spotipy.love_track(track_id)
+
+        access_token = await self.authorization_service.get_access_token_async()
+        spotipy = AsyncSpotipy.get_instance(access_token=access_token)
+        if indexed is None:
+            indexed = await self._refresh_index(spotipy, [track_id])
+            if indexed is not None and indexed[0]:
+                return LoveTrackResponse(result=LoveTrackResult.ALREADY_LOVED)
+        if indexed is None:
+            if await spotipy.is_track_saved(track_id):
+                self.saved_track_index.add([track_id])
+                return LoveTrackResponse(result=LoveTrackResult.ALREADY_LOVED)
+        await spotipy.love_track(track_id)
+        self.saved_track_index.add([track_id])
         return LoveTrackResponse(result=LoveTrackResult.SUCCESS)
+
+    async def execute_many(self, track_ids: list[str]) -> dict[str, LoveTrackResult]:
+        """
+        複数の曲をまとめて「いいね」する。
+        Save済みかの確認を50件ずつまとめて行い、未Saveの曲だけを集め直して50件ずつ追加する。
+        重複したIDは1つにまとめ、引数の順序で結果を返す
+        """
+        unique_ids = list(dict.fromkeys(track_ids))
+        # 1つでも混ざると確認するチャンク全体が400になるので、形式が不正なIDは問い合わせずに失敗にする
+        results = await self._love_valid_tracks([track_id for track_id in unique_ids if is_valid_track_id(track_id)])
+        return {track_id: results.get(track_id, LoveTrackResult.FAILED) for track_id in unique_ids}
+
+    async def _love_valid_tracks(self, unique_ids: list[str]) -> dict[str, LoveTrackResult]:
+        if len(unique_ids) == 0:
+            return {}
+
+        indexed = self.saved_track_index.lookup(unique_ids)
+        if indexed is not None and all(indexed):
+            return dict.fromkeys(unique_ids, LoveTrackResult.ALREADY_LOVED)
+
+        access_token = await self.authorization_service.get_access_token_async()
+        spotipy = AsyncSpotipy.get_instance(access_token=access_token)
+        if indexed is None:
+            indexed = await self._refresh_index(spotipy, unique_ids)
+        if indexed is None:
+            chunk_results = await asyncio.gather(
+                *(self._check_chunk(spotipy, chunk) for chunk in _chunks(unique_ids, MAX_TRACK_IDS_PER_REQUEST))
+            )
+            results = {track_id: result for chunk_result in chunk_results for track_id, result in chunk_result.items()}
+        else:
+            results = {
+                track_id: LoveTrackResult.ALREADY_LOVED if is_saved else LoveTrackResult.SUCCESS
+                for track_id, is_saved in zip(unique_ids, indexed, strict=True)
+            }
+        self.saved_track_index.add(
+            track_id for track_id, result in results.items() if result == LoveTrackResult.ALREADY_LOVED
+        )
+
+        # Save済みの曲が多くても追加のリクエストが少なくなるように、未Saveの曲だけを50件ずつにまとめ直す
+        unsaved_ids = [track_id for track_id, result in results.items() if result == LoveTrackResult.SUCCESS]
+        await asyncio.gather(
+            *(self._save_chunk(spotipy, chunk, results) for chunk in _chunks(unsaved_ids, MAX_TRACK_IDS_PER_REQUEST))
+        )
+        return results
+
+    async def _refresh_index(self, spotipy: AsyncSpotipy, track_ids: list[str]) -> list[bool] | None:
+        """
+        古いインデックスを同期して引き直す。
+        バックグラウンドで同期する場合や、時間内に同期できなかった場合はNone(APIで確認する)
+        """
+        await self.saved_track_index.refresh_if_stale(spotipy.get_saved_track_ids)
+        return self.saved_track_index.lookup(track_ids)
+
+    @staticmethod
+    async def _check_chunk(spotipy: AsyncSpotipy, track_ids: list[str]) -> dict[str, LoveTrackResult]:
+        """APIでSave済みかを確認して、Save済みならALREADY_LOVED、未SaveならSUCCESS(これから追加する)にする"""
+        try:
+            saved_flags = await spotipy.are_tracks_saved(track_ids)
+        except httpx.HTTPError as e:
+            logger.error("failed to check saved tracks: %s", e)
+            return dict.fromkeys(track_ids, LoveTrackResult.FAILED)
+        return {
+            track_id: LoveTrackResult.ALREADY_LOVED if is_saved else LoveTrackResult.SUCCESS
+            for track_id, is_saved in zip(track_ids, saved_flags, strict=True)
+        }
+
+    async def _save_chunk(
+        self, spotipy: AsyncSpotipy, track_ids: list[str], results: dict[str, LoveTrackResult]
+    ) -> None:
+        try:
+            await spotipy.love_tracks(track_ids)
+        except httpx.HTTPError as e:
+            logger.error("failed to save tracks: %s", e)
+            results.update(dict.fromkeys(track_ids, LoveTrackResult.FAILED))
+            return
+        self.saved_track_index.add(track_ids)
+
+
+def _chunks(track_ids: list[str], size: int) -> list[list[str]]:
+    return [track_ids[i : i + size] for i in range(0, len(track_ids), size)]
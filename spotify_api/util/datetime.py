@@ -14,3 +14,10 @@ def get_current_day_and_tomorrow(date_str: str | None = None) -> tuple[float, fl
     unix_today = DatetimeObject(selected_date.year, selected_date.month, selected_date.day).timestamp()
     unix_tomorrow = unix_today + 86400
     return unix_today, unix_tomorrow
+
+
+def get_current_date_str() -> str:
+    """
+    今日の日付をYYYY-MM-DD形式で返す
+    """
+    return DatetimeObject.now().strftime("%Y-%m-%d")
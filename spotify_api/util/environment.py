@@ -10,6 +10,31 @@ class Environment:
     def is_local():
         return os.getenv("ENVIRONMENT") == "local"
 
+    @staticmethod
+    def is_lambda():
+        # Lambdaの実行環境では関数名が環境変数に入っている
+        return os.getenv("AWS_LAMBDA_FUNCTION_NAME") is not None
+
+    @staticmethod
+    def is_server_timing_enabled():
+        # レスポンスにServer-Timingヘッダーで処理時間の内訳を付ける(調査用)
+        return os.getenv("SERVER_TIMING") == "true"
+
+    @staticmethod
+    def is_profiling_enabled():
+        # X-Profileヘッダーのついたリクエストをプロファイルできるようにする(調査用)
+        return os.getenv("PROFILING") == "true"
+
+    @staticmethod
+    def is_memory_tracking_enabled():
+        # tracemallocでメモリの割り当てを追跡して、増加をレポートする(調査用)
+        return os.getenv("MEMORY_TRACKING") == "true"
+
+    @staticmethod
+    def is_digest_mode():
+        # Slackへの通知を1日1メッセージにまとめる
+        return os.getenv("SLACK_NOTIFY_MODE") == "digest"
+
     @staticmethod
     def valid_access_token(secret: str) -> None:
         if Environment.is_dev():
@@ -0,0 +1,135 @@
+import functools
+import json
+import os
+import sys
+import time
+from collections.abc import Callable
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
+
+# CloudWatchのメトリクスの名前空間
+METRICS_NAMESPACE = os.getenv("METRICS_NAMESPACE", "SpotifyApi")
+# ログに出すメトリクス名の接頭辞(呼び出しがなかった上流サービスも0として出力する)
+UPSTREAM_METRIC_PREFIXES = {"s3": "S3", "spotify": "Spotify", "spotify_oauth": "SpotifyOAuth", "slack": "Slack"}
+
+_Handler = TypeVar("_Handler", bound=Callable[..., Any])
+
+
+@dataclass
+class UpstreamUsage:
+    calls: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    bytes: int = 0
+
+
+@dataclass
+class InvocationMetrics:
+    """
+    Lambdaの1回の呼び出しの間に行った上流サービスへの呼び出しを集計する。
+    スレッドや並行タスクにはコンテキストごとコピーされるので、同じオブジェクトに加算される
+    """
+
+    handler_name: str
+    cold_start: bool
+    started_at: float = field(default_factory=time.perf_counter)
+    upstreams: dict[str, UpstreamUsage] = field(default_factory=dict)
+
+    def add_call(self, upstream: str, seconds: float, outcome: str) -> None:
+        usage = self._usage(upstream)
+        usage.calls += 1
+        usage.seconds += seconds
+        if outcome != "ok":
+            usage.errors += 1
+
+    def add_bytes(self, upstream: str, size: int) -> None:
+        self._usage(upstream).bytes += size
+
+    def to_emf(self, duration_seconds: float, timestamp_ms: int) -> dict[str, Any]:
+        """CloudWatchの埋め込みメトリクスフォーマット(EMF)のログを作る"""
+        metrics = [("ColdStart", int(self.cold_start), "Count"), ("Duration", duration_seconds * 1000, "Milliseconds")]
+        for upstream, prefix in UPSTREAM_METRIC_PREFIXES.items():
+            usage = self.upstreams.get(upstream, UpstreamUsage())
+            metrics += [
+                (f"{prefix}Calls", usage.calls, "Count"),
+                (f"{prefix}Errors", usage.errors, "Count"),
+                (f"{prefix}Time", round(usage.seconds * 1000, 3), "Milliseconds"),
+                (f"{prefix}Bytes", usage.bytes, "Bytes"),
+            ]
+        return {
+            "_aws": {
+                "Timestamp": timestamp_ms,
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": METRICS_NAMESPACE,
+                        "Dimensions": [["Handler"]],
+                        "Metrics": [{"Name": name, "Unit": unit} for name, _, unit in metrics],
+                    }
+                ],
+            },
+            "Handler": self.handler_name,
+            **{name: value for name, value, _ in metrics},
+        }
+
+    def _usage(self, upstream: str) -> UpstreamUsage:
+        usage = self.upstreams.get(upstream)
+        if usage is None:
+            usage = self.upstreams[upstream] = UpstreamUsage()
+        return usage
+
+
+_current: ContextVar[InvocationMetrics | None] = ContextVar("invocation_metrics", default=None)
+# コンテナで最初の呼び出しかどうか
+_is_cold_start = True
+
+
+def begin(handler_name: str) -> tuple[InvocationMetrics, Token[InvocationMetrics | None]]:
+    global _is_cold_start
+    metrics = InvocationMetrics(handler_name=handler_name, cold_start=_is_cold_start)
+    _is_cold_start = False
+    return metrics, _current.set(metrics)
+
+
+def end(token: Token[InvocationMetrics | None]) -> None:
+    _current.reset(token)
+
+
+def add_call(upstream: str, seconds: float, outcome: str) -> None:
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add_call(upstream, seconds, outcome)
+
+
+def add_bytes(upstream: str, size: int) -> None:
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add_bytes(upstream, size)
+
+
+def emit(metrics: InvocationMetrics) -> None:
+    """
+    EMFのログを1行で標準出力に書く。
+    CloudWatch LogsはJSONの行をそのまま解釈するので、時刻やレベルを付けるloggerは通さない
+    """
+    record = metrics.to_emf(time.perf_counter() - metrics.started_at, int(time.time() * 1000))
+    sys.stdout.write(json.dumps(record, separators=(",", ":")) + "\n")
+    sys.stdout.flush()
+
+
+def instrument_handler(handler_name: str) -> Callable[[_Handler], _Handler]:
+    """Lambdaのハンドラーを包んで、呼び出しごとに上流サービスの呼び出し回数・時間・転送量をログに出す"""
+
+    def decorator(handler: _Handler) -> _Handler:
+        @functools.wraps(handler)
+        def wrapper(event: Any, context: Any) -> Any:
+            metrics, token = begin(handler_name)
+            try:
+                return handler(event, context)
+            finally:
+                end(token)
+                emit(metrics)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
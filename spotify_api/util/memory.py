@@ -0,0 +1,156 @@
+import os
+import sys
+import threading
+import tracemalloc
+from dataclasses import dataclass, field
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+from typing import Any
+
+# このリクエスト数ごとにスナップショットを取って、前回からの増加をレポートする
+MEMORY_REPORT_EVERY = int(os.getenv("MEMORY_REPORT_EVERY", "100"))
+# レポートに載せる割り当て箇所の数
+TOP_ALLOCATIONS = 10
+
+# 中身まで数えないもの(クラスや関数はキャッシュが保持しているデータではない)
+_OPAQUE_TYPES = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType)
+# tracemalloc自身やimportの割り当ては、アプリのメモリの増加ではないので除く
+# (Snapshot.filter_tracesは割り当て1件ごとにPythonで照合して遅いので、集計した後の割り当て箇所で除く)
+_IGNORED_FILENAMES = frozenset(
+    (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>")
+)
+
+_caches: dict[str, Any] = {}
+
+
+def register_cache(name: str, cache: Any) -> None:
+    """プロセス内に保持し続けるキャッシュを、メモリのレポートの対象にする"""
+    _caches[name] = cache
+
+
+def cache_sizes() -> dict[str, int]:
+    """登録したキャッシュごとの、中身を含めたバイト数"""
+    return {name: deep_sizeof(cache) for name, cache in _caches.items()}
+
+
+def deep_sizeof(obj: Any) -> int:
+    """
+    objから辿れるオブジェクトのバイト数の合計(sys.getsizeofの合計なので目安)。
+    同じオブジェクトを複数から参照している場合(共有している文字列など)は1回だけ数える
+    """
+    seen: set[int] = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _OPAQUE_TYPES):
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+        if isinstance(current, dict):
+            # 他のスレッドが更新中でも辿れるように、先にコピーする
+            for key, value in list(current.items()):
+                stack.append(key)
+                stack.append(value)
+        elif isinstance(current, list | tuple | set | frozenset):
+            stack.extend(current)
+        elif not isinstance(current, str | bytes | int | float):
+            if hasattr(current, "__dict__"):
+                stack.append(vars(current))
+            for slot in getattr(type(current), "__slots__", ()):
+                if hasattr(current, slot):
+                    stack.append(getattr(current, slot))
+    return total
+
+
+@dataclass(frozen=True)
+class AllocationSite:
+    location: str
+    size: int
+    size_diff: int
+    count_diff: int
+
+
+@dataclass(frozen=True)
+class MemoryReport:
+    requests: int
+    traced_bytes: int
+    peak_bytes: int
+    # 前回のレポートから増えた(解放されずに残っている)メモリを、その間のリクエスト数で割ったもの
+    retained_bytes_per_request: float
+    top_allocations: list[AllocationSite] = field(default_factory=list)
+    cache_sizes: dict[str, int] = field(default_factory=dict)
+
+
+class MemoryTracker:
+    """
+    tracemallocでメモリの割り当てを追跡して、report_everyリクエストごとに
+    増えたメモリの割り当て箇所と、キャッシュごとのサイズをレポートする
+    """
+
+    def __init__(self, report_every: int = MEMORY_REPORT_EVERY, top: int = TOP_ALLOCATIONS) -> None:
+        self.report_every = max(report_every, 1)
+        self.top = top
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._reported_requests = 0
+        self._snapshot: tracemalloc.Snapshot | None = None
+        self._traced_bytes = 0
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        with self._lock:
+            self._snapshot = tracemalloc.take_snapshot()
+            self._traced_bytes = tracemalloc.get_traced_memory()[0]
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        with self._lock:
+            self._snapshot = None
+
+    def on_request(self) -> MemoryReport | None:
+        """リクエストが終わるたびに呼ぶ。report_everyリクエストごとにレポートを返す"""
+        with self._lock:
+            self._requests += 1
+            if self._requests % self.report_every != 0:
+                return None
+        return self.report()
+
+    def report(self) -> MemoryReport:
+        """前回のレポート(またはstart)からの増加をレポートする"""
+        with self._lock:
+            if self._snapshot is None:
+                raise RuntimeError("memory tracking is not started")
+            snapshot = tracemalloc.take_snapshot()
+            traced_bytes, peak_bytes = tracemalloc.get_traced_memory()
+            requests = self._requests - self._reported_requests
+            stats = [
+                stat
+                for stat in snapshot.compare_to(self._snapshot, "lineno")
+                if stat.traceback[0].filename not in _IGNORED_FILENAMES
+            ]
+            top_allocations = [
+                AllocationSite(
+                    location=f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    size=stat.size,
+                    size_diff=stat.size_diff,
+                    count_diff=stat.count_diff,
+                )
+                for stat in stats[: self.top]
+            ]
+            report = MemoryReport(
+                requests=self._requests,
+                traced_bytes=traced_bytes,
+                peak_bytes=peak_bytes,
+                retained_bytes_per_request=(traced_bytes - self._traced_bytes) / requests if requests > 0 else 0.0,
+                top_allocations=top_allocations,
+                cache_sizes=cache_sizes(),
+            )
+            self._snapshot = snapshot
+            self._traced_bytes = traced_bytes
+            self._reported_requests = self._requests
+            return report
+
+
+# ワーカー(またはLambdaコンテナ)ごとに1つだけ持つ
+tracker = MemoryTracker()
@@ -0,0 +1,200 @@
+import bisect
+import threading
+import time
+from collections.abc import Sequence
+from types import TracebackType
+
+from . import invocation_metrics, server_timing
+from .memory import register_cache
+
+# レイテンシ(秒)のヒストグラムのバケット
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        with self._lock:
+            return self._values.get(labelvalues, 0)
+
+    def collect(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labelvalues, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # ラベルごとに[バケットごとの件数(累積しない)..., +Infの件数]と合計値を持つ
+        self._counts: dict[tuple[str, ...], list[int]] = {}
+        self._sums: dict[tuple[str, ...], float] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(labelvalues)
+            if counts is None:
+                counts = self._counts[labelvalues] = [0] * (len(self.buckets) + 1)
+            counts[index] += 1
+            self._sums[labelvalues] = self._sums.get(labelvalues, 0.0) + value
+
+    def count(self, *labelvalues: str) -> int:
+        with self._lock:
+            return sum(self._counts.get(labelvalues, ()))
+
+    def collect(self) -> list[str]:
+        with self._lock:
+            values = sorted(
+                (labelvalues, list(counts), self._sums[labelvalues]) for labelvalues, counts in self._counts.items()
+            )
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labelvalues, counts, total in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts, strict=True):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                bucket_labels = _format_labels(self.labelnames, labelvalues, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    プロセス内のメトリクスをまとめて、Prometheusのテキスト形式で出力する
+    """
+
+    def __init__(self) -> None:
+        self._metrics: list[Counter | Histogram] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = [line for metric in self._metrics for line in metric.collect()]
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+http_requests_total = registry.counter(
+    "http_requests_total", "HTTP requests handled by the API.", ("method", "route", "status")
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds", "Time spent handling HTTP requests.", ("method", "route")
+)
+upstream_requests_total = registry.counter(
+    "upstream_requests_total", "Calls to upstream services (S3, Spotify, Slack).", ("upstream", "operation", "outcome")
+)
+upstream_request_duration_seconds = registry.histogram(
+    "upstream_request_duration_seconds", "Time spent in calls to upstream services.", ("upstream", "operation")
+)
+upstream_bytes_total = registry.counter(
+    "upstream_bytes_total", "Bytes sent to and received from upstream services.", ("upstream",)
+)
+register_cache("metrics", registry)
+
+
+def record_upstream(upstream: str, operation: str, seconds: float, outcome: str = "ok") -> None:
+    """
+    上流サービス(S3/Spotify/Slack)への1回の呼び出しを記録する。
+    計測中のリクエスト(Server-Timing)やLambdaの呼び出し(EMF)があれば、そちらにも加算する
+    """
+    upstream_request_duration_seconds.observe(seconds, upstream, operation)
+    upstream_requests_total.inc(upstream, operation, outcome)
+    server_timing.add(upstream, seconds)
+    invocation_metrics.add_call(upstream, seconds, outcome)
+
+
+def record_upstream_bytes(upstream: str, size: int) -> None:
+    """上流サービスとの間で送受信したバイト数を記録する"""
+    upstream_bytes_total.inc(upstream, amount=size)
+    invocation_metrics.add_bytes(upstream, size)
+
+
+class UpstreamCall:
+    """
+    with文で囲んだ上流サービスへの1回の呼び出しの時間を記録する。
+    例外が出た場合はoutcome="error"になる。レスポンスを見て失敗扱いにする場合はoutcomeを書き換える
+    """
+
+    __slots__ = ("upstream", "operation", "outcome", "_started")
+
+    def __init__(self, upstream: str, operation: str) -> None:
+        self.upstream = upstream
+        self.operation = operation
+        self.outcome = "ok"
+        self._started = 0.0
+
+    def __enter__(self) -> "UpstreamCall":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if exc_type is not None:
+            self.outcome = "error"
+        record_upstream(self.upstream, self.operation, time.perf_counter() - self._started, self.outcome)
+
+
+def observe(upstream: str, operation: str) -> UpstreamCall:
+    """
+    上流サービスへの呼び出しを計測する
+
+        with observe("spotify", "track"):
+            ...
+    """
+    return UpstreamCall(upstream, operation)
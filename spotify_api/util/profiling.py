@@ -0,0 +1,300 @@
+import asyncio
+import functools
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import Counter, OrderedDict
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import Context, ContextVar, Token
+from dataclasses import dataclass
+from types import CodeType, FrameType
+from typing import Any, TypeVar
+
+from .environment import Environment
+from .memory import register_cache
+
+T = TypeVar("T")
+
+# PROFILING=trueのときだけ、同期のエンドポイントを動かすスレッドにフックを入れる(無効な間は何もしない)
+ENABLED = Environment.is_profiling_enabled()
+# サンプリングの間隔(秒)。短くするほど細かく取れるが、GILを取り合って計測対象が遅くなる
+SAMPLE_INTERVAL_SECONDS = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+# ダウンロード用に保持しておくプロファイルの件数
+MAX_STORED_PROFILES = 20
+# このパッケージのコードを含むスタックだけを集計する(待機中のスレッドプールやイベントループを除くため)
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_labels: dict[CodeType, str] = {}
+
+
+def _short_path(filename: str) -> str:
+    for path in sorted(sys.path, key=len, reverse=True):
+        if path and filename.startswith(path + os.sep):
+            return filename[len(path) + 1 :]
+    return filename
+
+
+def _label(code: CodeType) -> str:
+    label = _labels.get(code)
+    if label is None:
+        label = _labels[code] = f"{code.co_qualname} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+    return label
+
+
+def _stack(frame: FrameType | None) -> tuple[str, ...] | None:
+    """呼び出し元から順に並べたスタック。このパッケージのコードを含まなければNone"""
+    codes = []
+    while frame is not None:
+        codes.append(frame.f_code)
+        frame = frame.f_back
+    if not any(code.co_filename.startswith(PACKAGE_DIR) for code in codes):
+        return None
+    return tuple(_label(code) for code in reversed(codes))
+
+
+@dataclass
+class Profile:
+    profile_id: str
+    method: str
+    path: str
+    duration_seconds: float
+    samples: int
+    stacks: Counter[tuple[str, ...]]
+
+    def collapsed(self) -> str:
+        """flamegraph.plやspeedscopeで読める形式(1行に「関数;関数;... 件数」)"""
+        lines = [f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common()]
+        return "\n".join(lines) + "\n"
+
+    def tree(self, min_percent: float = 1.0) -> str:
+        """呼び出し元から展開したコールツリー。サンプル数の割合がmin_percent未満の枝は省く"""
+        root: dict = {}
+        counts: Counter[tuple[str, ...]] = Counter()
+        for stack, count in self.stacks.items():
+            node = root
+            for depth, label in enumerate(stack):
+                node = node.setdefault(label, {})
+                counts[stack[: depth + 1]] += count
+        total = sum(self.stacks.values())
+        lines = [
+            f"{self.method} {self.path} {self.duration_seconds * 1000:.1f}ms, "
+            f"{self.samples} samples every {SAMPLE_INTERVAL_SECONDS * 1000:g}ms, {total} stacks"
+        ]
+
+        def walk(node: dict, prefix: tuple[str, ...]) -> None:
+            children = sorted(node, key=lambda label: counts[(*prefix, label)], reverse=True)
+            for label in children:
+                key = (*prefix, label)
+                percent = counts[key] * 100 / total
+                if percent < min_percent:
+                    continue
+                lines.append(f"{'  ' * len(prefix)}{percent:5.1f}% {counts[key]:>5} {label}")
+                walk(node[label], key)
+
+        walk(root, ())
+        return "\n".join(lines) + "\n"
+
+
+class SamplingProfiler:
+    """
+    別スレッドから一定間隔で、計測中のリクエストを処理しているスレッドのスタックを取って、関数の呼び出し経路ごとに数える。
+    イベントループのスレッドは、リクエストのタスクか、そこから作られたタスクが動いている間だけ数える(instrument_loopが必要)。
+    それ以外のスレッドは、リクエストのコンテキストからenter_threadで入っている間だけ数える。
+    instrument_loopを入れたループのasyncio.to_threadと、PROFILING=trueのときの同期のエンドポイントは自動で入る。
+    それ以外の方法で起動したスレッド(独自のスレッドやExecutor)はサンプリングされない
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL_SECONDS) -> None:
+        self.interval = interval
+        self.samples = 0
+        self.stacks: Counter[tuple[str, ...]] = Counter()
+        self._lock = threading.Lock()
+        # スレッドIDごとの、そのスレッドに入っている数(入れ子になっても最後に抜けるまで対象にする)
+        self._thread_ids: Counter[int] = Counter()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._token: Token[SamplingProfiler | None] | None = None
+        self._started = 0.0
+        self._duration = 0.0
+
+    def start(self) -> None:
+        """
+        呼び出したタスク(ループの外ならスレッド)と、このコンテキストから作られたタスクやスレッドを対象にして計測を始める
+        """
+        self._token = _active.set(self)
+        task = _current_task()
+        if task is None:
+            self.add_thread(threading.get_ident())
+        else:
+            self._loop = task.get_loop()
+            self._loop_thread_id = threading.get_ident()
+            self.add_task(task)
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._duration = time.perf_counter() - self._started
+        if self._token is not None:
+            _active.reset(self._token)
+            self._token = None
+        if self._loop is None:
+            self.remove_thread(threading.get_ident())
+        with self._lock:
+            self._tasks.clear()
+
+    def add_thread(self, thread_id: int) -> None:
+        with self._lock:
+            self._thread_ids[thread_id] += 1
+
+    def remove_thread(self, thread_id: int) -> None:
+        with self._lock:
+            self._thread_ids[thread_id] -= 1
+            if self._thread_ids[thread_id] <= 0:
+                del self._thread_ids[thread_id]
+
+    def add_task(self, task: asyncio.Task) -> None:
+        with self._lock:
+            self._tasks.add(task)
+
+    def sample(self) -> None:
+        with self._lock:
+            thread_ids = set(self._thread_ids)
+            tasks = set(self._tasks)
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == self._loop_thread_id:
+                # 同じループで並行して動く他のリクエストやバックグラウンドのタスクは数えない
+                if self._loop is None or asyncio.current_task(self._loop) not in tasks:
+                    continue
+            elif thread_id not in thread_ids:
+                continue
+            stack = _stack(frame)
+            if stack is not None:
+                self.stacks[stack] += 1
+        self.samples += 1
+
+    def to_profile(self, profile_id: str, method: str, path: str) -> Profile:
+        return Profile(profile_id, method, path, self._duration, self.samples, self.stacks)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+
+# 計測中のリクエストのコンテキストでだけ設定される(タスクやスレッドプールにはコンテキストごとコピーされる)
+_active: ContextVar[SamplingProfiler | None] = ContextVar("profiler", default=None)
+
+
+def _current_task() -> asyncio.Task | None:
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        # イベントループの外
+        return None
+
+
+def enter_thread() -> SamplingProfiler | None:
+    """
+    計測中のリクエストのコンテキストなら、今のスレッドをサンプリングの対象に加える。
+    戻り値は抜けるときにexit_threadに渡す
+    """
+    profiler = _active.get()
+    if profiler is not None:
+        profiler.add_thread(threading.get_ident())
+    return profiler
+
+
+def exit_thread(profiler: SamplingProfiler | None) -> None:
+    if profiler is not None:
+        profiler.remove_thread(threading.get_ident())
+
+
+def sampled_in_thread(call: Callable[..., T]) -> Callable[..., T]:
+    """スレッドプールで呼ばれる関数を、計測中のリクエストからの呼び出しならその間だけサンプリングの対象にする"""
+
+    @functools.wraps(call)
+    def wrapper(*args: Any, **kwargs: Any) -> T:
+        profiler = enter_thread()
+        try:
+            return call(*args, **kwargs)
+        finally:
+            exit_thread(profiler)
+
+    return wrapper
+
+
+class _SampledExecutor(ThreadPoolExecutor):
+    """計測中のリクエストから投げられた処理(asyncio.to_threadなど)を、動いている間だけサンプリングの対象にする"""
+
+    def submit(self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> Future[T]:
+        # ワーカーのスレッドは投げた側のコンテキストの外で動くので、プロファイラーは投げるときに取っておく
+        profiler = _active.get()
+        if profiler is None:
+            return super().submit(fn, *args, **kwargs)
+        return super().submit(_run_sampled, profiler, fn, *args, **kwargs)
+
+
+def _run_sampled(profiler: SamplingProfiler, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    thread_id = threading.get_ident()
+    profiler.add_thread(thread_id)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler.remove_thread(thread_id)
+
+
+def _task_factory(loop: asyncio.AbstractEventLoop, coro: Any, context: Context | None = None) -> asyncio.Task:
+    task = asyncio.Task(coro, loop=loop, context=context)
+    # タスクを作った側のコンテキスト(contextを渡された場合はそのコンテキスト)が計測中なら対象にする
+    profiler = _active.get() if context is None else context.get(_active)
+    if profiler is not None:
+        profiler.add_task(task)
+    return task
+
+
+_instrumented_loops: "weakref.WeakSet[asyncio.AbstractEventLoop]" = weakref.WeakSet()
+
+
+def instrument_loop(loop: asyncio.AbstractEventLoop) -> None:
+    """
+    計測中のリクエストから作られたタスクと、デフォルトのExecutorに投げられた処理をサンプリングの対象にする。
+    ループごとに1回だけ入れる。すでに独自のタスクファクトリーがあるループでは、タスクの追跡は入れない
+    """
+    if loop in _instrumented_loops:
+        return
+    _instrumented_loops.add(loop)
+    if loop.get_task_factory() is None:
+        loop.set_task_factory(_task_factory)
+    loop.set_default_executor(_SampledExecutor())
+
+
+class ProfileStore:
+    """取ったプロファイルを新しい順にmax_size件だけ保持する(プロセス/Lambdaコンテナ単位)"""
+
+    def __init__(self, max_size: int = MAX_STORED_PROFILES) -> None:
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._profiles: OrderedDict[str, Profile] = OrderedDict()
+
+    def add(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles[profile.profile_id] = profile
+            while len(self._profiles) > self.max_size:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Profile | None:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+
+profiles = ProfileStore()
+register_cache("profiles", profiles)
@@ -0,0 +1,84 @@
+import time
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from types import TracebackType
+
+
+@dataclass
+class RequestTiming:
+    """
+    1リクエストの処理時間をフェーズ(トークンの読み込み、Spotifyの呼び出しなど)ごとに合計したもの。
+    スレッドプールや並行タスクにはコンテキストごとコピーされるので、同じオブジェクトに加算される
+    """
+
+    started_at: float
+    phases: dict[str, float] = field(default_factory=dict)
+    endpoint_finished_at: float | None = None
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def header_value(self, total_seconds: float) -> str:
+        """Server-Timingヘッダーの値(ミリ秒)"""
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.phases.items()]
+        entries.append(f"total;dur={total_seconds * 1000:.1f}")
+        return ", ".join(entries)
+
+
+# 計測していないリクエスト(や通知用のLambda)ではNoneのままにして、記録を何もしない
+_current: ContextVar[RequestTiming | None] = ContextVar("server_timing", default=None)
+
+
+def begin() -> tuple[RequestTiming, Token[RequestTiming | None]]:
+    timing = RequestTiming(started_at=time.perf_counter())
+    return timing, _current.set(timing)
+
+
+def end(token: Token[RequestTiming | None]) -> None:
+    _current.reset(token)
+
+
+def current() -> RequestTiming | None:
+    return _current.get()
+
+
+def add(name: str, seconds: float) -> None:
+    timing = _current.get()
+    if timing is not None:
+        timing.add(name, seconds)
+
+
+class Phase:
+    """with文で囲んだ処理の時間を、計測中のリクエストのフェーズとして加算する"""
+
+    __slots__ = ("name", "_timing", "_started")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._timing: RequestTiming | None = None
+        self._started = 0.0
+
+    def __enter__(self) -> "Phase":
+        self._timing = _current.get()
+        if self._timing is not None:
+            self._started = time.perf_counter()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if self._timing is not None:
+            self._timing.add(self.name, time.perf_counter() - self._started)
+
+
+def phase(name: str) -> Phase:
+    """
+    処理の時間をServer-Timingのフェーズとして計測する(計測中のリクエストでなければ何もしない)
+
+        with phase("translate"):
+            ...
+    """
+    return Phase(name)
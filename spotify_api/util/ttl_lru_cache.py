@@ -0,0 +1,90 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Generic, TypeVar
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    max_size: int
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+
+class TTLLRUCache(Generic[K, V]):
+    """
+    件数上限つき(LRUで追い出す)、有効期限つきのキャッシュ。
+    値がNoneのエントリは「存在しない」ことを表す negative cache として、短い有効期限で保持する。
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: float,
+        negative_ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (有効期限, 値)
+        self._entries: OrderedDict[K, tuple[float, V | None]] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: K) -> tuple[bool, V | None]:
+        """
+        (キャッシュにあったか, 値) を返す。
+        negative cacheにヒットした場合は (True, None) になる
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return False, None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self._misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return True, value
+
+    def set(self, key: K, value: V | None) -> None:
+        ttl_seconds = self.ttl_seconds if value is not None else self.negative_ttl_seconds
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                size=len(self._entries),
+                max_size=self.max_size,
+            )
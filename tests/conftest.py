@@ -1,8 +1,14 @@
 """Pytest configuration and fixtures."""
 
+import io
+import json
 import os
+import threading
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 import pytest
+from botocore.exceptions import ClientError
 
 # Set environment variables at module load time (before test collection)
 os.environ.setdefault("SPOTIPY_CLIENT_ID", "test_client_id")
@@ -40,3 +46,128 @@ def sample_track_data() -> dict:
         "type": "track",
         "uri": "spotify:track:track123",
     }
+
+
+class FakeS3Client:
+    """In-memory stand-in for the boto3 S3 client with ETag-conditional reads and writes."""
+
+    def __init__(self) -> None:
+        self.objects: dict[tuple[str, str], tuple[bytes, str]] = {}
+        self.put_count = 0
+        self.get_count = 0
+
+    def put_object(
+        self, Bucket: str, Key: str, Body: bytes, IfMatch: str | None = None, IfNoneMatch: str | None = None
+    ):
+        current = self.objects.get((Bucket, Key))
+        if IfMatch is not None and (current is None or current[1] != IfMatch):
+            raise ClientError({"Error": {"Code": "PreconditionFailed"}}, "PutObject")
+        if IfNoneMatch == "*" and current is not None:
+            raise ClientError({"Error": {"Code": "PreconditionFailed"}}, "PutObject")
+        self.put_count += 1
+        etag = f'"etag-{self.put_count}"'
+        self.objects[(Bucket, Key)] = (Body, etag)
+        return {"ETag": etag}
+
+    def get_object(self, Bucket: str, Key: str, IfNoneMatch: str | None = None):
+        self.get_count += 1
+        current = self.objects.get((Bucket, Key))
+        if current is None:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        body, etag = current
+        if IfNoneMatch is not None and IfNoneMatch == etag:
+            raise ClientError({"Error": {"Code": "304"}, "ResponseMetadata": {"HTTPStatusCode": 304}}, "GetObject")
+        return {"Body": io.BytesIO(body), "ETag": etag}
+
+
+@pytest.fixture
+def fake_s3_client() -> FakeS3Client:
+    """In-memory S3 client for repository tests."""
+    return FakeS3Client()
+
+
+class FakeSlackServer(ThreadingHTTPServer):
+    """Local stand-in for slack.com/api that can inject 429s, errors and latency.
+
+    Queue scripted responses per API method with ``script``; unscripted calls answer ``{"ok": true}``.
+    A ``bytes`` body is sent as-is, for responses that are not JSON.
+    """
+
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _FakeSlackHandler)
+        self.scripts: dict[str, list[tuple[int, dict | bytes, dict[str, str], float]]] = {}
+        self.calls: list[tuple[str, str, dict]] = []
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/api/"
+
+    def script(
+        self,
+        method: str,
+        status: int = 200,
+        body: dict | bytes | None = None,
+        headers: dict[str, str] | None = None,
+        delay: float = 0.0,
+    ) -> None:
+        self.scripts.setdefault(method, []).append((status, body or {"ok": True}, headers or {}, delay))
+
+    def next_response(self, method: str) -> tuple[int, dict | bytes, dict[str, str], float]:
+        with self._lock:
+            queue = self.scripts.get(method)
+            return queue.pop(0) if queue else (200, {"ok": True}, {}, 0.0)
+
+
+class _FakeSlackHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: FakeSlackServer
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self._respond({})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        self._respond(json.loads(self.rfile.read(length) or b"{}"))
+
+    def _respond(self, payload: dict) -> None:
+        method = self.path.split("?")[0].removeprefix("/api/")
+        self.server.calls.append((self.command, method, payload))
+        status, body, headers, delay = self.server.next_response(method)
+        # Not time.sleep: tests patch it to skip client-side waits.
+        threading.Event().wait(delay)
+        data = body if isinstance(body, bytes) else json.dumps(body).encode()
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (read timeout) and closed the socket.
+            self.close_connection = True
+
+
+@pytest.fixture
+def fake_slack_server() -> Iterator[FakeSlackServer]:
+    """Fake Slack Web API served on a local port."""
+    server = FakeSlackServer()
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -1,6 +1,7 @@
 """Tests for BlockBuilder domain class."""
 
 import sys
+from dataclasses import asdict, fields, replace
 from pathlib import Path
 
 import pytest
@@ -8,7 +9,7 @@ import pytest
 # Add spotify_api to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent / "spotify_api"))
 
-from domain.slack.block_builder import BlockBuilder
+from domain.slack.block_builder import BlockBuilder, PersistentBlockBuilder
 
 
 class TestBlockBuilder:
@@ -57,6 +58,22 @@ class TestBlockBuilder:
         assert element["style"] == "primary"
         assert element["action_id"] == "test_action"
 
+    def test_add_button_section(self) -> None:
+        """Test adding a section with a button accessory."""
+        blocks = (
+            BlockBuilder()
+            .add_button_section(text="Artist - Song", action_id="love", button_text="Love", value="track123")
+            .build()
+        )
+
+        assert len(blocks) == 1
+        assert blocks[0]["type"] == "section"
+        assert blocks[0]["text"]["text"] == "Artist - Song"
+        accessory = blocks[0]["accessory"]
+        assert accessory["type"] == "button"
+        assert accessory["value"] == "track123"
+        assert accessory["action_id"] == "love"
+
     def test_add_context_with_string(self) -> None:
         """Test adding a context block with string."""
         builder = BlockBuilder().add_context(text="Context info")
@@ -256,3 +273,99 @@ class TestBlockBuilder:
         assert original.blocks == []
         assert len(modified.blocks) == 1
         assert original is not modified
+
+    def test_add_many(self) -> None:
+        """Test adding prebuilt blocks in one call."""
+        blocks = BlockBuilder().add_divider().add_many([{"type": "divider"}, {"type": "section"}]).build()
+
+        assert [b["type"] for b in blocks] == ["divider", "divider", "section"]
+
+    def test_branches_from_the_same_builder_do_not_interfere(self) -> None:
+        """Test that two builders extended from one parent keep their own blocks."""
+        parent = BlockBuilder().add_section(text="Header")
+        left = parent.add_divider()
+        right = parent.add_context(text="Footer")
+
+        assert [b["type"] for b in parent.build()] == ["section"]
+        assert [b["type"] for b in left.build()] == ["section", "divider"]
+        assert [b["type"] for b in right.build()] == ["section", "context"]
+
+    def test_built_list_does_not_change_after_more_adds(self) -> None:
+        """Test that a list returned by build() is not extended by later adds."""
+        builder = BlockBuilder().add_section(text="Header")
+        built = builder.build()
+
+        extended = builder.add_divider()
+
+        assert len(built) == 1
+        assert len(extended.build()) == 2
+
+    def test_build_hands_out_the_list_without_copying(self) -> None:
+        """Test that build() returns the builder's own list."""
+        builder = BlockBuilder().add_section(text="Header")
+
+        assert builder.build() is builder.blocks
+
+    def test_works_with_dataclass_helpers(self) -> None:
+        """Test that blocks is a regular dataclass field for replace, fields and asdict."""
+        builder = BlockBuilder().add_divider()
+
+        assert [f.name for f in fields(builder)] == ["blocks"]
+        assert asdict(builder) == {"blocks": [{"type": "divider"}]}
+        assert replace(builder, blocks=[]).blocks == []
+
+    def test_equality_compares_blocks(self) -> None:
+        """Test that builders with the same blocks are equal."""
+        assert BlockBuilder().add_divider() == BlockBuilder(blocks=[{"type": "divider"}])
+        assert BlockBuilder().add_divider() != BlockBuilder()
+
+
+class TestPersistentBlockBuilder:
+    """Test cases for PersistentBlockBuilder."""
+
+    def test_builds_the_same_blocks_as_block_builder(self) -> None:
+        """Test that both builders share the add_* methods and produce identical blocks."""
+
+        def build(builder):
+            return (
+                builder.add_section(text="Header")
+                .add_divider()
+                .add_button_section(text="Song", action_id="LOVE", button_text="Love", value="id1")
+                .add_many([{"type": "divider"}, {"type": "context"}])
+                .build()
+            )
+
+        assert build(PersistentBlockBuilder()) == build(BlockBuilder())
+
+    def test_branches_from_the_same_builder_do_not_interfere(self) -> None:
+        """Test that two builders extended from one parent keep their own blocks."""
+        parent = PersistentBlockBuilder().add_section(text="Header")
+        left = parent.add_divider()
+        right = parent.add_context(text="Footer")
+
+        assert [b["type"] for b in parent.build()] == ["section"]
+        assert [b["type"] for b in left.build()] == ["section", "divider"]
+        assert [b["type"] for b in right.build()] == ["section", "context"]
+
+    def test_many_single_adds_keep_their_order(self) -> None:
+        """Test that a long chain of adds is flattened once in order."""
+        builder = PersistentBlockBuilder()
+        for i in range(1000):
+            builder = builder.add_section(text=str(i))
+
+        blocks = builder.build()
+
+        assert len(blocks) == 1000
+        assert [b["text"]["text"] for b in blocks[:3]] == ["0", "1", "2"]
+        assert blocks[-1]["text"]["text"] == "999"
+
+    def test_builder_is_immutable(self) -> None:
+        """Test that PersistentBlockBuilder is a frozen dataclass."""
+        from dataclasses import FrozenInstanceError
+
+        builder = PersistentBlockBuilder().add_divider()
+
+        with pytest.raises(FrozenInstanceError):
+            builder._last = None  # type: ignore[misc]
+        assert builder == PersistentBlockBuilder().add_divider()
+        assert builder != PersistentBlockBuilder()
@@ -1,20 +1,33 @@
 """Tests for infrastructure layer."""
 
+import asyncio
 import json
 import sys
+from datetime import datetime
 from pathlib import Path
 from unittest.mock import MagicMock, mock_open, patch
 
+import httpx
 import pytest
 
 # Add spotify_api to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent / "spotify_api"))
 
+from domain.infrastructure.token_info_repository import TokenInfoConflictError
+from domain.model.daily_digest import DailyDigest, DigestMessage, DigestTrack
 from domain.model.track import Track
 from domain.track_translator import TrackTranslator
+from infrastructure.async_spotipy import SAVED_TRACKS_MAX_CONCURRENCY, AsyncSpotipy
+from infrastructure.daily_digest_local_repository import DailyDigestLocalRepository
+from infrastructure.daily_digest_s3_repository import DailyDigestS3Repository
+from infrastructure.posted_track_local_repository import PostedTrackLocalRepository
+from infrastructure.posted_track_s3_repository import PostedTrackS3Repository
+from infrastructure.slack_client import SlackApiError, SlackClient
 from infrastructure.spotipy import Spotipy
+from infrastructure.token_info_cached_repository import TokenInfoCache, TokenInfoCachedRepository
 from infrastructure.token_info_local_repository import TokenInfoLocalRepository
 from infrastructure.token_info_s3_repository import TokenInfoS3Repository
+from util.metrics import upstream_bytes_total, upstream_request_duration_seconds, upstream_requests_total
 
 
 class TestTokenInfoLocalRepository:
@@ -48,89 +61,293 @@ class TestTokenInfoLocalRepository:
 class TestTokenInfoS3Repository:
     """Test cases for TokenInfoS3Repository."""
 
-    def test_save_uploads_to_s3(self) -> None:
-        """Test that save uploads token info to S3."""
+    def test_save_puts_object_from_memory(self, fake_s3_client) -> None:
+        """Test that save writes the JSON body straight to S3 without a temp file."""
         token_info = {"access_token": "test_token", "refresh_token": "refresh"}
-        m = mock_open()
-
-        with patch("builtins.open", m):
-            with patch("boto3.client") as mock_boto:
-                mock_s3 = MagicMock()
-                mock_boto.return_value = mock_s3
 
-                repo = TokenInfoS3Repository()
-                result = repo.save(token_info)
+        with patch("builtins.open") as mock_file:
+            repo = TokenInfoS3Repository(s3_client=fake_s3_client)
+            result = repo.save(token_info)
 
-                assert result is True
-                mock_s3.upload_file.assert_called_once()
+            assert result is True
+            mock_file.assert_not_called()
+        assert fake_s3_client.put_count == 1
 
     def test_save_returns_false_on_upload_error(self) -> None:
         """Test that save returns False when S3 upload fails."""
-        token_info = {"access_token": "test_token"}
-        m = mock_open()
+        mock_s3 = MagicMock()
+        mock_s3.put_object.side_effect = Exception("Upload failed")
 
-        with patch("builtins.open", m):
-            with patch("boto3.client") as mock_boto:
-                mock_s3 = MagicMock()
-                mock_s3.upload_file.side_effect = Exception("Upload failed")
-                mock_boto.return_value = mock_s3
+        repo = TokenInfoS3Repository(s3_client=mock_s3)
+        result = repo.save({"access_token": "test_token"})
+
+        assert result is False
+
+    def test_load_reads_object_from_s3(self, fake_s3_client) -> None:
+        """Test that load returns the token saved in S3."""
+        token_info = {"access_token": "test_token", "refresh_token": "refresh"}
+        TokenInfoS3Repository(s3_client=fake_s3_client).save(token_info)
 
-                repo = TokenInfoS3Repository()
-                result = repo.save(token_info)
+        repo = TokenInfoS3Repository(s3_client=fake_s3_client)
+        result = repo.load()
 
-                assert result is False
+        assert result == token_info
 
-    def test_load_downloads_from_s3(self) -> None:
-        """Test that load downloads token info from S3."""
+    def test_load_skips_body_when_etag_unchanged(self, fake_s3_client) -> None:
+        """Test that an unchanged object is answered by a 304 and the previously parsed token."""
         token_info = {"access_token": "test_token", "refresh_token": "refresh"}
-        m = mock_open(read_data=json.dumps(token_info))
+        TokenInfoS3Repository(s3_client=fake_s3_client).save(token_info)
+        repo = TokenInfoS3Repository(s3_client=fake_s3_client)
 
-        with patch("builtins.open", m):
-            with patch("boto3.client") as mock_boto:
-                mock_s3 = MagicMock()
-                mock_boto.return_value = mock_s3
+        first = repo.load()
+        with patch("infrastructure.token_info_s3_repository.json.loads") as mock_loads:
+            second = repo.load()
+            mock_loads.assert_not_called()
+
+        assert first == second == token_info
+        assert fake_s3_client.get_count == 2
 
-                repo = TokenInfoS3Repository()
-                result = repo.load()
+    def test_load_picks_up_changes_from_other_writers(self, fake_s3_client) -> None:
+        """Test that a changed ETag makes load return the new token."""
+        writer = TokenInfoS3Repository(s3_client=fake_s3_client)
+        reader = TokenInfoS3Repository(s3_client=fake_s3_client)
+        writer.save({"access_token": "first"})
+        assert reader.load() == {"access_token": "first"}
 
-                assert result == token_info
-                mock_s3.download_file.assert_called_once()
+        writer.save({"access_token": "second"})
+
+        assert reader.load() == {"access_token": "second"}
 
     def test_load_returns_none_on_download_error(self) -> None:
         """Test that load returns None when S3 download fails."""
-        with patch("boto3.client") as mock_boto:
-            mock_s3 = MagicMock()
-            mock_s3.download_file.side_effect = Exception("Download failed")
-            mock_boto.return_value = mock_s3
+        mock_s3 = MagicMock()
+        mock_s3.get_object.side_effect = Exception("Download failed")
 
-            repo = TokenInfoS3Repository()
-            result = repo.load()
+        repo = TokenInfoS3Repository(s3_client=mock_s3)
+        result = repo.load()
+
+        assert result is None
 
-            assert result is None
+    def test_load_returns_none_when_object_missing(self, fake_s3_client) -> None:
+        """Test that load returns None before any token has been saved."""
+        repo = TokenInfoS3Repository(s3_client=fake_s3_client)
 
-    def test_upload_to_s3_handles_file_not_found(self) -> None:
-        """Test that upload_to_s3 handles FileNotFoundError."""
-        with patch("boto3.client") as mock_boto:
-            mock_s3 = MagicMock()
-            mock_s3.upload_file.side_effect = FileNotFoundError()
-            mock_boto.return_value = mock_s3
+        assert repo.load() is None
 
-            repo = TokenInfoS3Repository()
-            result = repo.upload_to_s3()
+    def test_save_if_unchanged_raises_conflict_on_stale_version(self, fake_s3_client) -> None:
+        """Test that a conditional save with an outdated ETag is rejected."""
+        repo = TokenInfoS3Repository(s3_client=fake_s3_client)
+        assert repo.save_if_unchanged({"access_token": "first"}, version=None) is True
+        _, version = repo.load_with_version()
+        assert repo.save_if_unchanged({"access_token": "second"}, version=version) is True
 
-            assert result is False
+        with pytest.raises(TokenInfoConflictError):
+            repo.save_if_unchanged({"access_token": "third"}, version=version)
 
-    def test_download_from_s3_handles_file_not_found(self) -> None:
-        """Test that download_from_s3 handles FileNotFoundError."""
-        with patch("boto3.client") as mock_boto:
-            mock_s3 = MagicMock()
-            mock_s3.download_file.side_effect = FileNotFoundError()
-            mock_boto.return_value = mock_s3
+        token_info, _ = repo.load_with_version()
+        assert token_info == {"access_token": "second"}
 
+    def test_s3_client_is_created_on_first_use(self, fake_s3_client) -> None:
+        """Test that constructing the repository does not create an S3 client until it is needed."""
+        with patch("infrastructure.token_info_s3_repository.get_s3_client", return_value=fake_s3_client) as mock_get:
             repo = TokenInfoS3Repository()
-            result = repo.download_from_s3()
+            mock_get.assert_not_called()
+
+            repo.load()
+            repo.load()
+
+        mock_get.assert_called_once()
+
+
+class TestS3ClientMetrics:
+    """Test cases for the S3 call metrics recorded through botocore events."""
+
+    def test_s3_calls_are_recorded_per_operation(self) -> None:
+        """Test that each S3 API call is counted with its operation name and outcome."""
+        import boto3
+        from botocore.exceptions import ClientError
+        from botocore.stub import Stubber
+        from infrastructure.aws_client import _instrument
+
+        client = boto3.client("s3", region_name="ap-northeast-1", aws_access_key_id="x", aws_secret_access_key="x")
+        _instrument(client)
+        ok_before = upstream_requests_total.value("s3", "GetObject", "ok")
+        error_before = upstream_requests_total.value("s3", "GetObject", "error")
+        count_before = upstream_request_duration_seconds.count("s3", "GetObject")
+
+        with Stubber(client) as stubber:
+            stubber.add_response("get_object", {"ETag": '"1"'}, {"Bucket": "b", "Key": "k"})
+            stubber.add_client_error("get_object", "InternalError", http_status_code=500)
+            client.get_object(Bucket="b", Key="k")
+            with pytest.raises(ClientError):
+                client.get_object(Bucket="b", Key="k")
+
+        assert upstream_requests_total.value("s3", "GetObject", "ok") == ok_before + 1
+        assert upstream_requests_total.value("s3", "GetObject", "error") == error_before + 1
+        assert upstream_request_duration_seconds.count("s3", "GetObject") == count_before + 2
+
+    def test_s3_transfer_bytes_are_recorded(self) -> None:
+        """Test that uploaded bodies and downloaded content lengths are counted as S3 bytes."""
+        import boto3
+        from botocore.stub import Stubber
+        from infrastructure.aws_client import _instrument
+
+        client = boto3.client("s3", region_name="ap-northeast-1", aws_access_key_id="x", aws_secret_access_key="x")
+        _instrument(client)
+        bytes_before = upstream_bytes_total.value("s3")
+
+        with Stubber(client) as stubber:
+            stubber.add_response("put_object", {"ETag": '"1"'}, {"Bucket": "b", "Key": "k", "Body": "0123456789"})
+            client.put_object(Bucket="b", Key="k", Body="0123456789")
+
+        assert upstream_bytes_total.value("s3") == bytes_before + 10
+
+
+class TestPostedTrackLocalRepository:
+    """Test cases for PostedTrackLocalRepository."""
+
+    def test_save_and_load_by_day(self, tmp_path: Path) -> None:
+        """Test that posted track IDs round-trip per day."""
+        repo = PostedTrackLocalRepository(directory=str(tmp_path))
+
+        assert repo.load("2024-01-15") is None
+        assert repo.save("2024-01-15", {"a", "b"}) is True
+        assert repo.load("2024-01-15") == {"a", "b"}
+        assert repo.load("2024-01-16") is None
+
+
+class TestPostedTrackS3Repository:
+    """Test cases for PostedTrackS3Repository."""
+
+    def test_load_returns_none_when_day_is_missing(self, fake_s3_client) -> None:
+        """Test that a day without a stored object needs a rebuild."""
+        repo = PostedTrackS3Repository(s3_client=fake_s3_client)
+
+        assert repo.load("2024-01-15") is None
+
+    def test_save_and_load_uses_not_modified(self, fake_s3_client) -> None:
+        """Test that a reload of an unchanged day is answered by a 304 from memory."""
+        repo = PostedTrackS3Repository(s3_client=fake_s3_client)
+        repo.save("2024-01-15", {"a"})
+
+        first = repo.load("2024-01-15")
+        first.add("mutated")
+        second = repo.load("2024-01-15")
+
+        assert second == {"a"}
+        assert fake_s3_client.get_count == 2
+        assert ("spotify-api-bucket-koboriakira", "posted_tracks/2024-01-15.json") in fake_s3_client.objects
+
+    def test_load_reads_changes_from_another_process(self, fake_s3_client) -> None:
+        """Test that an object written elsewhere replaces the remembered copy."""
+        repo = PostedTrackS3Repository(s3_client=fake_s3_client)
+        repo.save("2024-01-15", {"a"})
+        PostedTrackS3Repository(s3_client=fake_s3_client).save("2024-01-15", {"a", "b"})
+
+        assert repo.load("2024-01-15") == {"a", "b"}
+
+
+class TestDailyDigestRepository:
+    """Test cases for the local and S3 daily digest repositories."""
+
+    @staticmethod
+    def _digest() -> DailyDigest:
+        tracks = [DigestTrack(track_id="a", title="アーティスト - 曲")]
+        return DailyDigest(day="2024-01-15", messages=[DigestMessage(channel="C1", ts="1.0", tracks=tracks)])
+
+    def test_local_round_trip(self, tmp_path: Path) -> None:
+        """Test that the local repository stores one file per day."""
+        repo = DailyDigestLocalRepository(directory=str(tmp_path))
+
+        assert repo.load("2024-01-15") is None
+        repo.save(self._digest())
+        assert repo.load("2024-01-15") == self._digest()
+
+    def test_s3_round_trip(self, fake_s3_client) -> None:
+        """Test that the S3 repository stores one object per day."""
+        repo = DailyDigestS3Repository(s3_client=fake_s3_client)
+
+        assert repo.load("2024-01-15") is None
+        assert repo.save(self._digest()) is True
+        assert repo.load("2024-01-15") == self._digest()
+        assert ("spotify-api-bucket-koboriakira", "daily_digests/2024-01-15.json") in fake_s3_client.objects
+
+
+class TestTokenInfoCachedRepository:
+    """Test cases for TokenInfoCachedRepository."""
+
+    def test_load_hits_cache_while_token_is_fresh(self) -> None:
+        """Test that a fresh token is served from the cache without reloading."""
+        token_info = {"access_token": "test_token", "expires_at": datetime.now().timestamp() + 3600}
+        mock_repository = MagicMock()
+        mock_repository.load.return_value = token_info
+        cache = TokenInfoCache()
+
+        repo = TokenInfoCachedRepository(mock_repository, cache=cache)
+        assert repo.load() == token_info
+        assert repo.load() == token_info
+
+        mock_repository.load.assert_called_once()
+        stats = cache.stats()
+        assert stats.hits == 1
+        assert stats.misses == 1
+
+    def test_load_reloads_when_token_is_close_to_expiry(self) -> None:
+        """Test that a token inside the expiry margin is reloaded every time."""
+        token_info = {"access_token": "test_token", "expires_at": datetime.now().timestamp() + 10}
+        mock_repository = MagicMock()
+        mock_repository.load.return_value = token_info
+        cache = TokenInfoCache(margin_seconds=60)
+
+        repo = TokenInfoCachedRepository(mock_repository, cache=cache)
+        repo.load()
+        repo.load()
+
+        assert mock_repository.load.call_count == 2
+        assert cache.stats().hits == 0
+
+    def test_load_does_not_cache_missing_token(self) -> None:
+        """Test that a missing token is not cached."""
+        mock_repository = MagicMock()
+        mock_repository.load.return_value = None
+        cache = TokenInfoCache()
+
+        repo = TokenInfoCachedRepository(mock_repository, cache=cache)
+        assert repo.load() is None
+        assert repo.load() is None
+
+        assert mock_repository.load.call_count == 2
+
+    def test_save_replaces_cached_token(self) -> None:
+        """Test that save invalidates the old token so the new one takes effect immediately."""
+        old_token = {"access_token": "old_token", "expires_at": datetime.now().timestamp() + 3600}
+        new_token = {"access_token": "new_token", "expires_at": datetime.now().timestamp() + 3600}
+        mock_repository = MagicMock()
+        mock_repository.load.return_value = old_token
+        mock_repository.save.return_value = True
+        cache = TokenInfoCache()
+
+        repo = TokenInfoCachedRepository(mock_repository, cache=cache)
+        repo.load()
+        assert repo.save(new_token) is True
+
+        assert repo.load() == new_token
+        mock_repository.load.assert_called_once()
 
-            assert result is False
+    def test_save_failure_leaves_cache_empty(self) -> None:
+        """Test that a failed save drops the cached token."""
+        old_token = {"access_token": "old_token", "expires_at": datetime.now().timestamp() + 3600}
+        mock_repository = MagicMock()
+        mock_repository.load.return_value = old_token
+        mock_repository.save.return_value = False
+        cache = TokenInfoCache()
+
+        repo = TokenInfoCachedRepository(mock_repository, cache=cache)
+        repo.load()
+        assert repo.save({"access_token": "new_token"}) is False
+
+        repo.load()
+        assert mock_repository.load.call_count == 2
 
 
 class TestSpotipy:
@@ -138,14 +355,27 @@ class TestSpotipy:
 
     def test_get_instance_creates_spotipy_client(self) -> None:
         """Test that get_instance creates a Spotipy instance."""
-        with patch("infrastructure.spotipy.spotipy.Spotify") as mock_spotify_class:
-            mock_spotify = MagicMock()
-            mock_spotify_class.return_value = mock_spotify
+        with patch("infrastructure.spotipy._shared_client", None):
+            with patch("infrastructure.spotipy.spotipy.Spotify") as mock_spotify_class:
+                mock_spotify = MagicMock()
+                mock_spotify_class.return_value = mock_spotify
+
+                instance = Spotipy.get_instance(access_token="test_token")
+
+                mock_spotify_class.assert_called_once()
+                mock_spotify.set_auth.assert_called_once_with("test_token")
+                assert instance.sp == mock_spotify
 
-            instance = Spotipy.get_instance(access_token="test_token")
+    def test_get_instance_reuses_client_with_new_token(self) -> None:
+        """Test that get_instance keeps one long-lived client and only swaps the bearer token."""
+        with patch("infrastructure.spotipy._shared_client", None):
+            with patch("infrastructure.spotipy.spotipy.Spotify") as mock_spotify_class:
+                first = Spotipy.get_instance(access_token="first_token")
+                second = Spotipy.get_instance(access_token="second_token")
 
-            mock_spotify_class.assert_called_once_with(auth="test_token")
-            assert instance.sp == mock_spotify
+                mock_spotify_class.assert_called_once()
+                assert first.sp is second.sp
+                second.sp.set_auth.assert_called_with("second_token")
 
     def test_get_track_returns_track(self, sample_track_data: dict) -> None:
         """Test that get_track returns a Track object."""
@@ -182,6 +412,29 @@ class TestSpotipy:
         assert isinstance(result, Track)
         assert result.id == "track123"
 
+    def test_get_playback_returns_progress(self, sample_track_data: dict) -> None:
+        """Test that get_playback carries the playback position."""
+        mock_sp = MagicMock()
+        mock_sp.current_user_playing_track.return_value = {
+            "item": sample_track_data,
+            "progress_ms": 42000,
+            "is_playing": True,
+        }
+
+        result = Spotipy(sp=mock_sp).get_playback()
+
+        assert result is not None
+        assert result.track.id == "track123"
+        assert result.progress_ms == 42000
+        assert result.is_playing is True
+
+    def test_get_playback_returns_none_without_item(self) -> None:
+        """Test that a response without an item (e.g. an ad) means nothing to notify."""
+        mock_sp = MagicMock()
+        mock_sp.current_user_playing_track.return_value = {"item": None, "progress_ms": 0}
+
+        assert Spotipy(sp=mock_sp).get_playback() is None
+
     def test_get_current_playing_returns_none_when_nothing_playing(self) -> None:
         """Test that get_current_playing returns None when nothing is playing."""
         mock_sp = MagicMock()
@@ -239,6 +492,259 @@ class TestSpotipy:
             spotipy.get_album(album_id="album123")
 
 
+class TestAsyncSpotipy:
+    """Test cases for AsyncSpotipy."""
+
+    @staticmethod
+    def _run(handler, call):
+        async def run():
+            transport = httpx.MockTransport(handler)
+            async with httpx.AsyncClient(transport=transport, base_url="https://api.spotify.com/v1/") as client:
+                return await call(AsyncSpotipy(client, access_token="test_token"))
+
+        return asyncio.run(run())
+
+    def test_get_track_returns_track(self, sample_track_data: dict) -> None:
+        """Test that get_track requests the track with the bearer token."""
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, json=sample_track_data)
+
+        result = self._run(handler, lambda sp: sp.get_track(track_id="track123"))
+
+        assert isinstance(result, Track)
+        assert result.id == "track123"
+        assert requests[0].url.path == "/v1/tracks/track123"
+        assert requests[0].headers["Authorization"] == "Bearer test_token"
+
+    def test_requests_are_recorded_once_per_call(self, sample_track_data: dict) -> None:
+        """Test that a call is recorded once with its operation, including the retries it needed."""
+        responses = iter([httpx.Response(503), httpx.Response(200, json=sample_track_data)])
+        before = upstream_requests_total.value("spotify", "track", "ok")
+
+        with patch("infrastructure.async_spotipy.asyncio.sleep"):
+            self._run(lambda request: next(responses), lambda sp: sp.get_track(track_id="track123"))
+
+        assert upstream_requests_total.value("spotify", "track", "ok") == before + 1
+
+    def test_get_tracks_uses_several_tracks_endpoint(self, sample_track_data: dict) -> None:
+        """Test that get_tracks sends one comma-separated request and maps nulls to None."""
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, json={"tracks": [sample_track_data, None]})
+
+        result = self._run(handler, lambda sp: sp.get_tracks(["track123", "missing"]))
+
+        assert result[0] is not None and result[0].id == "track123"
+        assert result[1] is None
+        assert requests[0].url.path == "/v1/tracks"
+        assert requests[0].url.params["ids"] == "track123,missing"
+
+    def test_get_current_playing_returns_none_on_no_content(self) -> None:
+        """Test that a 204 from currently-playing means nothing is playing."""
+        result = self._run(lambda request: httpx.Response(204), lambda sp: sp.get_current_playing())
+
+        assert result is None
+
+    def test_is_track_saved_and_love_track(self) -> None:
+        """Test the saved-tracks contains and add calls."""
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            if request.method == "GET":
+                return httpx.Response(200, json=[False])
+            return httpx.Response(200)
+
+        async def call(sp: AsyncSpotipy) -> bool:
+            is_saved = await sp.is_track_saved(track_id="track123")
+            await sp.love_track(track_id="track123")
+            return is_saved
+
+        assert self._run(handler, call) is False
+        assert requests[0].url.path == "/v1/me/tracks/contains"
+        assert requests[1].method == "PUT"
+        assert requests[1].url.params["ids"] == "track123"
+
+    def test_are_tracks_saved_and_love_tracks_send_one_request_each(self) -> None:
+        """Test that the batch contains/add calls send comma-separated IDs."""
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            if request.method == "GET":
+                return httpx.Response(200, json=[True, False])
+            return httpx.Response(200)
+
+        async def call(sp: AsyncSpotipy) -> list[bool]:
+            saved_flags = await sp.are_tracks_saved(["a", "b"])
+            await sp.love_tracks(["b"])
+            return saved_flags
+
+        assert self._run(handler, call) == [True, False]
+        assert requests[0].url.params["ids"] == "a,b"
+        assert requests[1].url.params["ids"] == "b"
+
+    def test_get_saved_track_ids_reads_every_page(self) -> None:
+        """Test that the library sync fetches all pages of saved tracks."""
+        offsets = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            offset = int(request.url.params["offset"])
+            offsets.append(offset)
+            items = [{"track": {"id": f"id{i}"}} for i in range(offset, min(offset + 50, 120))]
+            return httpx.Response(200, json={"items": items, "total": 120})
+
+        result = self._run(handler, lambda sp: sp.get_saved_track_ids())
+
+        assert sorted(offsets) == [0, 50, 100]
+        assert result == [f"id{i}" for i in range(120)]
+
+    def test_get_saved_track_ids_bounds_page_concurrency(self) -> None:
+        """Test that a large library is fetched a few pages at a time instead of all at once."""
+        in_flight = 0
+        max_in_flight = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.001)
+            in_flight -= 1
+            offset = int(request.url.params["offset"])
+            items = [{"track": {"id": f"id{i}"}} for i in range(offset, min(offset + 50, 1000))]
+            return httpx.Response(200, json={"items": items, "total": 1000})
+
+        result = self._run(handler, lambda sp: sp.get_saved_track_ids())
+
+        assert len(result) == 1000
+        assert max_in_flight == SAVED_TRACKS_MAX_CONCURRENCY
+
+    def test_retries_rate_limited_requests(self, sample_track_data: dict) -> None:
+        """Test that a 429 is retried after Retry-After."""
+        responses = [httpx.Response(429, headers={"Retry-After": "0"}), httpx.Response(200, json=sample_track_data)]
+
+        result = self._run(lambda request: responses.pop(0), lambda sp: sp.get_track(track_id="track123"))
+
+        assert result is not None
+        assert responses == []
+
+
+class TestSlackClient:
+    """Test cases for SlackClient against a local fake Slack server."""
+
+    @pytest.fixture(autouse=True)
+    def no_sleep(self):
+        """Record waits instead of sleeping so rate limiting does not slow the tests down."""
+        with patch("infrastructure.slack_client.time.sleep") as mock_sleep:
+            yield mock_sleep
+
+    def test_reuses_one_connection(self, fake_slack_server) -> None:
+        """Test that consecutive calls share a keep-alive connection."""
+        client = SlackClient(token="xoxb-test", base_url=fake_slack_server.base_url)
+
+        for _ in range(3):
+            client.chat_post_message(channel="C1", text="hello")
+
+        assert fake_slack_server.connections == 1
+        assert [call[1] for call in fake_slack_server.calls] == ["chat.postMessage"] * 3
+        assert fake_slack_server.calls[0][2] == {"channel": "C1", "text": "hello"}
+
+    def test_retries_429_after_retry_after(self, fake_slack_server, no_sleep) -> None:
+        """Test that a rate-limited call waits for Retry-After and then succeeds."""
+        fake_slack_server.script("chat.postMessage", status=429, body={"ok": False}, headers={"Retry-After": "7"})
+        fake_slack_server.script("chat.postMessage", body={"ok": True, "ts": "1.0", "channel": "C1"})
+        client = SlackClient(token="xoxb-test", base_url=fake_slack_server.base_url)
+
+        response = client.chat_post_message(channel="C1", text="hello")
+
+        assert response["ts"] == "1.0"
+        assert len(fake_slack_server.calls) == 2
+        assert any(call.args[0] > 6 for call in no_sleep.call_args_list)
+
+    def test_non_json_response_raises_slack_api_error(self, fake_slack_server) -> None:
+        """Test that an HTML error page surfaces as SlackApiError rather than a JSON decode error."""
+        fake_slack_server.script("chat.postMessage", status=400, body=b"<html>Bad Request</html>")
+        client = SlackClient(token="xoxb-test", base_url=fake_slack_server.base_url)
+
+        with pytest.raises(SlackApiError, match="HTTP 400"):
+            client.chat_post_message(channel="C1", text="hello")
+
+    def test_post_and_thread_reply_are_not_throttled(self, fake_slack_server, no_sleep) -> None:
+        """Test that a post and its thread reply go out back to back, and only a longer run is paced."""
+        client = SlackClient(token="xoxb-test", base_url=fake_slack_server.base_url)
+
+        client.chat_post_message(channel="C1", text="track")
+        client.chat_post_message(channel="C1", text="url", thread_ts="1.0")
+        assert no_sleep.call_args_list == []
+
+        for _ in range(2):
+            client.chat_post_message(channel="C1", text="more")
+        assert any(call.args[0] > 0.5 for call in no_sleep.call_args_list)
+
+    def test_post_is_not_retried_on_server_error(self, fake_slack_server) -> None:
+        """Test that a 5xx on chat.postMessage is not retried, since the message may already be posted."""
+        fake_slack_server.script("chat.postMessage", status=503, body={"ok": False, "error": "service_unavailable"})
+        client = SlackClient(token="xoxb-test", base_url=fake_slack_server.base_url)
+
+        with pytest.raises(SlackApiError):
+            client.chat_post_message(channel="C1", text="hello")
+
+        assert len(fake_slack_server.calls) == 1
+
+    def test_get_is_retried_on_server_error(self, fake_slack_server) -> None:
+        """Test that history reads are still retried on 5xx."""
+        fake_slack_server.script("conversations.history", status=503, body={"ok": False})
+        fake_slack_server.script("conversations.history", body={"ok": True, "messages": []})
+        client = SlackClient(token="xoxb-test", base_url=fake_slack_server.base_url)
+
+        assert client.conversations_history(channel="C1", oldest="0", latest="1")["messages"] == []
+        assert len(fake_slack_server.calls) == 2
+
+    def test_gives_up_after_max_retries(self, fake_slack_server) -> None:
+        """Test that persistent 429s surface as SlackApiError instead of hanging."""
+        for _ in range(4):
+            fake_slack_server.script("conversations.history", status=429, headers={"Retry-After": "1"})
+        client = SlackClient(token="xoxb-test", base_url=fake_slack_server.base_url)
+
+        with pytest.raises(SlackApiError):
+            client.conversations_history(channel="C1", oldest="0", latest="1")
+
+    def test_chat_update_sends_ts_and_blocks(self, fake_slack_server) -> None:
+        """Test that chat.update is posted with the message ts and the new blocks."""
+        client = SlackClient(token="xoxb-test", base_url=fake_slack_server.base_url)
+
+        client.chat_update(channel="C1", ts="1.0", text="digest", blocks=[{"type": "divider"}])
+
+        assert fake_slack_server.calls == [
+            ("POST", "chat.update", {"channel": "C1", "ts": "1.0", "text": "digest", "blocks": [{"type": "divider"}]})
+        ]
+
+    def test_raises_on_not_ok(self, fake_slack_server) -> None:
+        """Test that an ok: false body raises with Slack's error code."""
+        fake_slack_server.script("chat.postMessage", body={"ok": False, "error": "channel_not_found"})
+        client = SlackClient(token="xoxb-test", base_url=fake_slack_server.base_url)
+
+        with pytest.raises(SlackApiError, match="channel_not_found"):
+            client.chat_post_message(channel="C1", text="hello")
+
+    def test_slow_read_is_retried_only_for_get(self, fake_slack_server) -> None:
+        """Test that a read timeout retries history reads but not posts (to avoid double posting)."""
+        fake_slack_server.script("conversations.history", delay=0.5)
+        fake_slack_server.script("conversations.history", body={"ok": True, "messages": []})
+        fake_slack_server.script("chat.postMessage", delay=0.5)
+        client = SlackClient(token="xoxb-test", base_url=fake_slack_server.base_url)
+
+        with patch("infrastructure.slack_client.REQUESTS_TIMEOUT", (1, 0.1)):
+            assert client.conversations_history(channel="C1", oldest="0", latest="1")["messages"] == []
+            with pytest.raises(SlackApiError):
+                client.chat_post_message(channel="C1", text="hello")
+
+
 class TestTrackTranslator:
     """Test cases for TrackTranslator."""
 
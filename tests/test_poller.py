@@ -0,0 +1,67 @@
+"""Tests for the long-running notification poller."""
+
+import asyncio
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+# Add spotify_api to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "spotify_api"))
+
+import poller
+
+
+class TestPoller:
+    """Test cases for poller.run."""
+
+    def test_run_polls_until_stopped_and_cleans_up(self) -> None:
+        """Test that the loop notifies on the scheduled delay and shuts down gracefully."""
+        mock_track = MagicMock()
+        mock_track.next_poll_seconds.return_value = 0
+        mock_track.token_refresher.stop = AsyncMock()
+        mock_track.shutdown = AsyncMock()
+
+        async def run() -> None:
+            stop_event = asyncio.Event()
+
+            def post_current_playing() -> bool:
+                if mock_track.post_current_playing.call_count >= 3:
+                    stop_event.set()
+                return True
+
+            mock_track.post_current_playing.side_effect = post_current_playing
+            await asyncio.wait_for(poller.run(stop_event), timeout=5)
+
+        with patch("poller.track", mock_track):
+            asyncio.run(run())
+
+        assert mock_track.post_current_playing.call_count == 3
+        mock_track.token_refresher.start.assert_called_once()
+        mock_track.token_refresher.stop.assert_awaited_once()
+        mock_track.shutdown.assert_awaited_once()
+
+    def test_run_keeps_polling_after_a_failure(self) -> None:
+        """Test that a failed notification does not stop the daemon."""
+        mock_track = MagicMock()
+        mock_track.next_poll_seconds.return_value = 0
+        mock_track.token_refresher.stop = AsyncMock()
+        mock_track.shutdown = AsyncMock()
+
+        async def run() -> None:
+            stop_event = asyncio.Event()
+            results = [Exception("boom"), True]
+
+            def post_current_playing() -> bool:
+                result = results.pop(0)
+                if isinstance(result, Exception):
+                    raise result
+                stop_event.set()
+                return result
+
+            mock_track.post_current_playing.side_effect = post_current_playing
+            await asyncio.wait_for(poller.run(stop_event), timeout=5)
+
+        with patch("poller.track", mock_track), patch("poller.RETRY_INTERVAL_SECONDS", 0):
+            asyncio.run(run())
+
+        assert mock_track.post_current_playing.call_count == 2
@@ -1,18 +1,30 @@
 """Tests for router layer (API endpoints)."""
 
+import asyncio
+import os
+import subprocess
 import sys
+import time
 from pathlib import Path
 from unittest.mock import patch
 
 import pytest
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
+from spotipy.exceptions import SpotifyException
 
 # Add spotify_api to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent / "spotify_api"))
 
 from domain.model.track import Track
+from interface import track as track_interface
 from main import app
+from router import memory as memory_router
+from router import profiling as profiling_router
+from router import track as track_router
+from usecase.get_track_usecase import track_cache
 from usecase.love_track_usecase import LoveTrackResponse, LoveTrackResult
+from util.metrics import http_requests_total
 
 
 @pytest.fixture
@@ -58,12 +70,8 @@ class TestTrackRouter:
                 assert data["data"]["id"] == "track123"
                 assert data["data"]["name"] == "Test Track"
 
-    def test_get_track_returns_error_when_not_found(self, client: TestClient) -> None:
-        """Test GET /track/{track_id} returns 500 when track not found.
-
-        Note: Current implementation returns TrackResponse(data=None) which violates
-        the pydantic model constraint (data field is not optional).
-        """
+    def test_get_track_returns_404_when_not_found(self, client: TestClient) -> None:
+        """Test GET /track/{track_id} returns 404 when the track does not exist."""
         with patch("router.track.track.get_track") as mock_get_track:
             with patch("router.track.Environment.valid_access_token"):
                 mock_get_track.return_value = None
@@ -73,8 +81,23 @@ class TestTrackRouter:
                     headers={"access_token": "test_token"},
                 )
 
-                # Due to pydantic validation error, returns 500
-                assert response.status_code == 500
+                assert response.status_code == 404
+                assert response.json()["detail"] == "track not found."
+
+    def test_get_track_returns_404_for_a_negatively_cached_id(self, client: TestClient) -> None:
+        """Test that an ID Spotify rejects answers 404, and keeps answering 404 from the negative cache."""
+        track_cache.clear()
+        with (
+            patch("usecase.get_track_usecase.Spotipy") as mock_spotipy_class,
+            patch.object(track_interface.authorization_service, "get_access_token", return_value="test_access_token"),
+            patch("router.track.Environment.valid_access_token"),
+        ):
+            mock_spotipy_class.get_instance.return_value.get_track.side_effect = SpotifyException(404, -1, "not found")
+
+            responses = [client.get("/track/deadid", headers={"access_token": "test_token"}) for _ in range(2)]
+
+        assert [response.status_code for response in responses] == [404, 404]
+        assert mock_spotipy_class.get_instance.return_value.get_track.call_count == 1
 
     def test_get_track_validates_access_token(self, client: TestClient) -> None:
         """Test GET /track/{track_id} validates access token."""
@@ -90,6 +113,32 @@ class TestTrackRouter:
 
                 assert response.status_code == 500
 
+    def test_get_tracks_returns_tracks_in_order_with_nulls(self, client: TestClient, mock_track: Track) -> None:
+        """Test GET /track?ids=... returns results in input order with null for misses."""
+        with patch("router.track.track.get_tracks") as mock_get_tracks:
+            with patch("router.track.Environment.valid_access_token"):
+                mock_get_tracks.return_value = [mock_track, None]
+
+                response = client.get(
+                    "/track?ids=track123,missing",
+                    headers={"access_token": "test_token"},
+                )
+
+                assert response.status_code == 200
+                data = response.json()
+                assert data["data"][0]["id"] == "track123"
+                assert data["data"][1] is None
+                mock_get_tracks.assert_awaited_once_with(track_ids=["track123", "missing"])
+
+    def test_get_tracks_rejects_too_many_ids(self, client: TestClient) -> None:
+        """Test GET /track?ids=... rejects more IDs than the limit."""
+        with patch("router.track.Environment.valid_access_token"):
+            ids = ",".join(f"id{i}" for i in range(501))
+
+            response = client.get(f"/track?ids={ids}", headers={"access_token": "test_token"})
+
+            assert response.status_code == 400
+
     def test_love_track_returns_success(self, client: TestClient) -> None:
         """Test POST /track/{track_id}/love returns success."""
         with patch("router.track.track.love_track") as mock_love:
@@ -121,6 +170,23 @@ class TestTrackRouter:
                 data = response.json()
                 assert data["data"]["result"] == "already_loved"
 
+    def test_love_tracks_returns_result_per_id(self, client: TestClient) -> None:
+        """Test POST /track/love returns a result for each track ID."""
+        with patch("router.track.track.love_tracks") as mock_love:
+            with patch("router.track.Environment.valid_access_token"):
+                mock_love.return_value = {"a": LoveTrackResult.SUCCESS, "b": LoveTrackResult.ALREADY_LOVED}
+
+                response = client.post(
+                    "/track/love",
+                    json={"track_ids": ["a", "b"]},
+                    headers={"access_token": "test_token"},
+                )
+
+                assert response.status_code == 200
+                data = response.json()
+                assert data["data"]["results"] == {"a": "success", "b": "already_loved"}
+                mock_love.assert_awaited_once_with(track_ids=["a", "b"])
+
 
 class TestCurrentRouter:
     """Test cases for current router endpoints."""
@@ -202,3 +268,223 @@ class TestAuthorizeRouter:
 
         assert response.status_code == 400
         assert response.json()["detail"] == "code is not found."
+
+
+class TestMetricsRouter:
+    """Test cases for the /metrics endpoint and the route metrics middleware."""
+
+    def test_metrics_are_labelled_by_route_template(self, client: TestClient, mock_track: Track) -> None:
+        """Test that requests are counted per route template, not per concrete path."""
+        before = http_requests_total.value("GET", "/track/{track_id}", "200")
+        with (
+            patch("router.track.track.get_track", return_value=mock_track),
+            patch("router.track.Environment.valid_access_token"),
+        ):
+            client.get("/track/abc")
+            client.get("/track/def")
+
+        with patch("router.metrics.Environment.valid_access_token"):
+            response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert http_requests_total.value("GET", "/track/{track_id}", "200") == before + 2
+        assert 'http_requests_total{method="GET",route="/track/{track_id}",status="200"}' in response.text
+        assert "/track/abc" not in response.text
+
+    def test_unmatched_paths_share_one_label(self, client: TestClient) -> None:
+        """Test that 404s are not labelled with the requested path."""
+        before = http_requests_total.value("GET", "unmatched", "404")
+
+        client.get("/no/such/path")
+
+        assert http_requests_total.value("GET", "unmatched", "404") == before + 1
+
+
+class TestServerTiming:
+    """Test cases for the Server-Timing middleware."""
+
+    def test_breakdown_is_returned_when_enabled(self, client: TestClient, mock_track: Track) -> None:
+        """Test that endpoint, translation and serialization phases come back in the header."""
+        with (
+            patch.dict(os.environ, {"SERVER_TIMING": "true"}),
+            patch("router.track.track.get_track", return_value=mock_track),
+            patch("router.track.Environment.valid_access_token"),
+        ):
+            response = client.get("/track/track123")
+
+        names = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+        assert names == ["translate", "endpoint", "serialize", "total"]
+
+    def test_header_is_absent_when_disabled(self, client: TestClient) -> None:
+        """Test that nothing is added unless SERVER_TIMING is enabled."""
+        with patch.dict(os.environ, {}, clear=False):
+            os.environ.pop("SERVER_TIMING", None)
+            response = client.get("/healthcheck")
+
+        assert "server-timing" not in response.headers
+
+
+class TestProfiling:
+    """Test cases for the on-demand request profiling hook."""
+
+    @pytest.fixture
+    def profiling_client(self):
+        """Create a client for an app with the profiling hook enabled."""
+        profiling_app = FastAPI()
+        # Routes are rebuilt on include, so this is where PROFILING decides whether sync endpoints get the hook.
+        with patch("util.profiling.ENABLED", True):
+            profiling_app.include_router(track_router.router, prefix="/track")
+        profiling_app.include_router(profiling_router.router)
+        profiling_app.add_middleware(profiling_router.ProfilingMiddleware)
+        env = {"ENVIRONMENT": "prod", "SPOTIFY_CLIENT_SECRET": "secret"}
+        with patch.dict(os.environ, env), TestClient(profiling_app, raise_server_exceptions=False) as client:
+            yield client
+
+    def test_profiled_request_can_be_downloaded(self, profiling_client: TestClient, mock_track: Track) -> None:
+        """Test that a profiled request returns an id whose call tree includes the slow endpoint."""
+
+        def slow_get_track(track_id: str) -> Track:
+            time.sleep(0.1)
+            return mock_track
+
+        headers = {"x-profile": "true", "access-token": "secret"}
+        with patch("router.track.track.get_track", side_effect=slow_get_track):
+            response = profiling_client.get("/track/track123", headers=headers)
+        profile_id = response.headers["x-profile-id"]
+        tree = profiling_client.get(f"/profiles/{profile_id}", headers={"access-token": "secret"})
+        collapsed = profiling_client.get(
+            f"/profiles/{profile_id}", params={"format": "collapsed"}, headers={"access-token": "secret"}
+        )
+
+        assert response.status_code == 200
+        assert tree.status_code == 200
+        assert "slow_get_track" in tree.text
+        assert "get_track (" in collapsed.text
+        assert "router/track.py" in collapsed.text
+
+    def test_request_without_valid_token_is_not_profiled(self, profiling_client: TestClient) -> None:
+        """Test that the profile header alone does not turn the profiler on."""
+        response = profiling_client.get("/track/track123", headers={"x-profile": "true", "access-token": "wrong"})
+
+        assert "x-profile-id" not in response.headers
+        assert profiling_client.get("/profiles/unknown", headers={"access-token": "secret"}).status_code == 404
+
+    def test_hook_is_not_installed_by_default(self) -> None:
+        """Test that the app has no profiling middleware unless PROFILING is enabled."""
+        assert profiling_router.ProfilingMiddleware not in [middleware.cls for middleware in app.user_middleware]
+
+    def test_sync_endpoints_skip_the_profiler_by_default(self, client: TestClient, mock_track: Track) -> None:
+        """Test that requests do not touch the profiler unless PROFILING is enabled."""
+        with (
+            patch("router.track.track.get_track", return_value=mock_track),
+            patch("router.track.Environment.valid_access_token"),
+            patch("util.profiling.enter_thread") as enter_thread,
+        ):
+            response = client.get("/track/track123")
+
+        assert response.status_code == 200
+        enter_thread.assert_not_called()
+
+
+class TestMemoryTracking:
+    """Test cases for the memory tracking surface."""
+
+    def test_memory_report_includes_cache_sizes(self) -> None:
+        """Test that the report lists allocation sites and the size of each in-process cache."""
+        memory_app = FastAPI()
+        memory_app.include_router(memory_router.router)
+        memory_app.add_middleware(memory_router.MemoryTrackingMiddleware)
+        memory_router.tracker.start()
+        try:
+            with patch("router.memory.Environment.valid_access_token"):
+                response = TestClient(memory_app).get("/memory")
+        finally:
+            memory_router.tracker.stop()
+
+        body = response.json()
+        assert response.status_code == 200
+        assert {"track", "token_info", "notify_state", "metrics"} <= set(body["cache_sizes"])
+        assert body["requests"] == 0
+        assert "top_allocations" in body
+
+    def test_tracking_is_not_installed_by_default(self) -> None:
+        """Test that the app has no memory tracking middleware unless MEMORY_TRACKING is enabled."""
+        installed = [middleware.cls for middleware in app.user_middleware]
+
+        assert memory_router.MemoryTrackingMiddleware not in installed
+
+
+class TestLifespan:
+    """Test cases for startup prewarming and shutdown cleanup."""
+
+    def test_uvicorn_prewarms_and_cleans_up(self) -> None:
+        """Test that a long-running server prewarms, runs the refresher and closes the pools on shutdown."""
+        with (
+            patch.dict(os.environ, {}, clear=False),
+            patch("main.track.prewarm") as mock_prewarm,
+            patch("main.track.token_refresher.start") as mock_start,
+            patch("main.track.token_refresher.stop") as mock_stop,
+            patch("main.track.shutdown") as mock_shutdown,
+        ):
+            os.environ.pop("AWS_LAMBDA_FUNCTION_NAME", None)
+            with TestClient(app):
+                mock_prewarm.assert_awaited_once()
+                mock_start.assert_called_once()
+
+            mock_stop.assert_awaited_once()
+            mock_shutdown.assert_awaited_once()
+
+    def test_lambda_keeps_pools_between_invocations(self) -> None:
+        """Test that the per-invocation lifespan on Lambda neither starts the refresher nor closes the pools."""
+        with (
+            patch.dict(os.environ, {"AWS_LAMBDA_FUNCTION_NAME": "spotify-api"}),
+            patch("main.track.prewarm") as mock_prewarm,
+            patch("main.track.token_refresher.start") as mock_start,
+            patch("main.track.shutdown") as mock_shutdown,
+        ):
+            with TestClient(app):
+                pass
+
+            mock_prewarm.assert_awaited_once()
+            mock_start.assert_not_called()
+            mock_shutdown.assert_not_awaited()
+
+    def test_prewarm_runs_once_and_tolerates_failures(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that prewarm warms every client once per process even if loading the token fails."""
+        monkeypatch.setattr(track_interface, "_is_prewarmed", False)
+        with (
+            patch.object(
+                track_interface.authorization_service, "get_access_token_async", side_effect=Exception("no token")
+            ) as mock_token,
+            patch("infrastructure.spotipy.prewarm_shared_client") as mock_sync,
+            patch("infrastructure.async_spotipy.prewarm_shared_client") as mock_async,
+        ):
+            assert asyncio.run(track_interface.prewarm()) is True
+            assert asyncio.run(track_interface.prewarm()) is False
+
+        mock_token.assert_awaited_once()
+        mock_sync.assert_called_once_with(track_interface.PREWARM_CONNECTIONS)
+        mock_async.assert_awaited_once_with(track_interface.PREWARM_CONNECTIONS)
+
+
+class TestHandlerImports:
+    """Test cases for the cold-start import path of the Lambda handlers."""
+
+    def test_notifier_does_not_import_httpx_or_boto3(self) -> None:
+        """Test that importing the notifier handler leaves the async client and boto3 unloaded."""
+        code = (
+            "import sys\n"
+            "import spotify_api.notificate_current_playing\n"
+            "print(sorted(m for m in ('httpx', 'boto3') if m in sys.modules))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=Path(__file__).parent.parent,
+            env={**os.environ, "ENVIRONMENT": "prod", "AWS_DEFAULT_REGION": "ap-northeast-1"},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        assert result.stdout.strip() == "[]"
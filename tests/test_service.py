@@ -1,6 +1,9 @@
 """Tests for service layer."""
 
+import asyncio
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from unittest.mock import MagicMock, patch
@@ -10,7 +13,13 @@ import pytest
 # Add spotify_api to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent / "spotify_api"))
 
-from service.authorization_service import AuthorizationService
+from domain.model.playback import Playback
+from domain.model.track import Track
+from infrastructure.token_info_s3_repository import TokenInfoS3Repository
+from service.authorization_service import AuthorizationService, RefreshStats
+from service.poll_scheduler import PollScheduler
+from service.saved_track_index import SavedTrackIndex
+from service.token_refresher import TokenRefresher
 
 
 class TestAuthorizationService:
@@ -49,6 +58,8 @@ class TestAuthorizationService:
             "expires_at": datetime.now().timestamp() + 3600,
         }
 
+        mock_repository.load_with_version.return_value = (mock_repository.load.return_value, "etag-1")
+
         with patch("service.authorization_service.SpotifyOauth") as mock_oauth_class:
             mock_oauth = MagicMock()
             mock_oauth.refresh_access_token.return_value = new_token_info
@@ -59,7 +70,136 @@ class TestAuthorizationService:
 
             assert result == "new_token"
             mock_oauth.refresh_access_token.assert_called_once_with("refresh_token")
-            mock_repository.save.assert_called_once_with(token_info=new_token_info)
+            mock_repository.save_if_unchanged.assert_called_once_with(token_info=new_token_info, version="etag-1")
+
+    def test_get_access_token_coalesces_concurrent_refreshes(self) -> None:
+        """Test that concurrent callers in one process share a single refresh."""
+        past_timestamp = datetime.now().timestamp() - 3600
+        stored = {"access_token": "old_token", "refresh_token": "refresh_token", "expires_at": past_timestamp}
+        new_token_info = {
+            "access_token": "new_token",
+            "refresh_token": "refresh_token",
+            "expires_at": datetime.now().timestamp() + 3600,
+        }
+
+        mock_repository = MagicMock()
+        mock_repository.load.side_effect = lambda: stored
+        mock_repository.load_with_version.side_effect = lambda: (stored, "etag-1")
+
+        def save_if_unchanged(token_info: dict, version: str | None) -> bool:
+            stored.update(token_info)
+            return True
+
+        mock_repository.save_if_unchanged.side_effect = save_if_unchanged
+
+        def slow_refresh(refresh_token: str) -> dict:
+            time.sleep(0.05)
+            return dict(new_token_info)
+
+        with patch("service.authorization_service.SpotifyOauth") as mock_oauth_class:
+            mock_oauth = MagicMock()
+            mock_oauth.refresh_access_token.side_effect = slow_refresh
+            mock_oauth_class.return_value = mock_oauth
+
+            service = AuthorizationService(token_repository=mock_repository)
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(executor.map(lambda _: service.get_access_token(), range(8)))
+
+            assert results == ["new_token"] * 8
+            mock_oauth.refresh_access_token.assert_called_once()
+
+    def test_get_access_token_rereads_token_when_another_process_refreshed(self, fake_s3_client) -> None:
+        """Test that losing the conditional write adopts the token saved by the other process."""
+        past_timestamp = datetime.now().timestamp() - 3600
+        expired = {"access_token": "old_token", "refresh_token": "refresh_token", "expires_at": past_timestamp}
+        repository = TokenInfoS3Repository(s3_client=fake_s3_client)
+        repository.save_if_unchanged(token_info=expired, version=None)
+
+        def refresh_by_other_process(refresh_token: str) -> dict:
+            # While this process is talking to Spotify, another worker wins the race and saves its token.
+            _, version = repository.load_with_version()
+            winner = {"access_token": "winner_token", "refresh_token": refresh_token}
+            winner["expires_at"] = datetime.now().timestamp() + 3600
+            repository.save_if_unchanged(token_info=winner, version=version)
+            return {"access_token": "loser_token", "refresh_token": refresh_token, "expires_at": winner["expires_at"]}
+
+        with patch("service.authorization_service.SpotifyOauth") as mock_oauth_class:
+            mock_oauth = MagicMock()
+            mock_oauth.refresh_access_token.side_effect = refresh_by_other_process
+            mock_oauth_class.return_value = mock_oauth
+
+            service = AuthorizationService(token_repository=repository)
+            result = service.get_access_token()
+
+            assert result == "winner_token"
+            assert repository.load_with_version()[0]["access_token"] == "winner_token"
+
+    def test_get_access_token_counts_inline_refresh(self) -> None:
+        """Test that a refresh on the request path is recorded as inline."""
+        mock_repository = MagicMock()
+        expired = {"access_token": "old", "refresh_token": "refresh", "expires_at": datetime.now().timestamp() - 1}
+        mock_repository.load.return_value = expired
+        mock_repository.load_with_version.return_value = (expired, None)
+
+        with patch("service.authorization_service.SpotifyOauth") as mock_oauth_class:
+            mock_oauth_class.return_value.refresh_access_token.return_value = {
+                "access_token": "new",
+                "refresh_token": "refresh",
+                "expires_at": datetime.now().timestamp() + 3600,
+            }
+            service = AuthorizationService(token_repository=mock_repository)
+            service.get_access_token()
+
+            assert service.refresh_stats().inline == 1
+            assert service.refresh_stats().background == 0
+
+    def test_waiting_for_another_refresh_is_not_counted(self) -> None:
+        """Test that a caller who finds the token already refreshed under the lock records no refresh."""
+        mock_repository = MagicMock()
+        now = datetime.now().timestamp()
+        mock_repository.load.return_value = {"access_token": "old", "refresh_token": "refresh", "expires_at": now - 1}
+        refreshed = {"access_token": "new", "refresh_token": "refresh", "expires_at": now + 3600}
+        mock_repository.load_with_version.return_value = (refreshed, "etag-2")
+
+        with patch("service.authorization_service.SpotifyOauth") as mock_oauth_class:
+            service = AuthorizationService(token_repository=mock_repository)
+
+            assert service.get_access_token() == "new"
+            assert service.refresh_if_expiring(lead_seconds=0) is False
+            mock_oauth_class.return_value.refresh_access_token.assert_not_called()
+            assert service.refresh_stats() == RefreshStats(inline=0, background=0)
+
+    def test_refresh_if_expiring_refreshes_within_lead_time(self) -> None:
+        """Test that a token expiring within the lead time is refreshed ahead of time."""
+        mock_repository = MagicMock()
+        expiring = {"access_token": "old", "refresh_token": "refresh", "expires_at": datetime.now().timestamp() + 120}
+        mock_repository.load.return_value = expiring
+        mock_repository.load_with_version.return_value = (expiring, "etag-1")
+        new_token_info = {"access_token": "new", "refresh_token": "refresh", "expires_at": 0}
+
+        with patch("service.authorization_service.SpotifyOauth") as mock_oauth_class:
+            mock_oauth_class.return_value.refresh_access_token.return_value = new_token_info
+            service = AuthorizationService(token_repository=mock_repository)
+
+            assert service.refresh_if_expiring(lead_seconds=300) is True
+            mock_repository.save_if_unchanged.assert_called_once_with(token_info=new_token_info, version="etag-1")
+            assert service.refresh_stats().background == 1
+            assert service.refresh_stats().inline == 0
+
+    def test_refresh_if_expiring_skips_fresh_token(self) -> None:
+        """Test that a token far from expiry is left alone."""
+        mock_repository = MagicMock()
+        mock_repository.load.return_value = {
+            "access_token": "valid",
+            "refresh_token": "refresh",
+            "expires_at": datetime.now().timestamp() + 3600,
+        }
+
+        with patch("service.authorization_service.SpotifyOauth") as mock_oauth_class:
+            service = AuthorizationService(token_repository=mock_repository)
+
+            assert service.refresh_if_expiring(lead_seconds=300) is False
+            mock_oauth_class.return_value.refresh_access_token.assert_not_called()
 
     def test_get_access_token_raises_when_no_token(self) -> None:
         """Test that get_access_token raises exception when no token exists."""
@@ -73,3 +213,178 @@ class TestAuthorizationService:
                 service.get_access_token()
 
             assert "token_info is not found" in str(exc_info.value)
+
+
+class TestTokenRefresher:
+    """Test cases for TokenRefresher."""
+
+    def test_refresh_if_expiring_applies_lead_and_jitter(self) -> None:
+        """Test that the lead time passed to the service includes jitter."""
+        mock_service = MagicMock()
+        mock_service.refresh_if_expiring.return_value = True
+        refresher = TokenRefresher(authorization_service=mock_service, lead_seconds=300, jitter_seconds=60)
+
+        assert refresher.refresh_if_expiring() is True
+
+        lead_seconds = mock_service.refresh_if_expiring.call_args.kwargs["lead_seconds"]
+        assert 300 <= lead_seconds <= 360
+
+    def test_refresh_if_expiring_swallows_errors(self) -> None:
+        """Test that a failed pre-refresh does not propagate to the caller."""
+        mock_service = MagicMock()
+        mock_service.refresh_if_expiring.side_effect = Exception("network error")
+        refresher = TokenRefresher(authorization_service=mock_service)
+
+        assert refresher.refresh_if_expiring() is False
+
+    def test_background_task_refreshes_expiring_token(self) -> None:
+        """Test that the background task refreshes once the token is inside the lead time."""
+        expires_at = [datetime.now().timestamp() + 10]
+
+        def refresh_if_expiring(lead_seconds: float) -> bool:
+            expires_at[0] = datetime.now().timestamp() + 3600
+            return True
+
+        mock_service = MagicMock()
+        mock_service.get_expires_at.side_effect = lambda: expires_at[0]
+        mock_service.refresh_if_expiring.side_effect = refresh_if_expiring
+        refresher = TokenRefresher(authorization_service=mock_service, lead_seconds=300, jitter_seconds=0)
+
+        async def run() -> None:
+            refresher.start()
+            await asyncio.sleep(0.1)
+            await refresher.stop()
+
+        asyncio.run(run())
+
+        mock_service.refresh_if_expiring.assert_called_once()
+
+
+class TestSavedTrackIndex:
+    """Test cases for SavedTrackIndex."""
+
+    def test_lookup_is_none_until_synced_and_after_ttl(self) -> None:
+        """Test that the index only answers while it is fresh."""
+        now = [0.0]
+        index = SavedTrackIndex(ttl_seconds=10, clock=lambda: now[0])
+
+        assert index.lookup(["a"]) is None
+        index.replace(["a"])
+        assert index.lookup(["a", "b"]) == [True, False]
+        now[0] = 10
+        assert index.lookup(["a"]) is None
+
+    def test_ids_added_during_sync_survive_replace(self) -> None:
+        """Test that a love during a library sync is not lost when the sync finishes."""
+        index = SavedTrackIndex()
+
+        async def fetch() -> list[str]:
+            index.add(["loved_during_sync"])
+            return ["a"]
+
+        asyncio.run(index.sync(fetch))
+
+        assert index.lookup(["a", "loved_during_sync"]) == [True, True]
+        assert index.size() == 2
+
+    def test_schedule_sync_runs_once_while_in_flight(self) -> None:
+        """Test that concurrent stale lookups share one background sync."""
+        index = SavedTrackIndex()
+        calls = []
+
+        async def fetch() -> list[str]:
+            calls.append(1)
+            await asyncio.sleep(0)
+            return ["a"]
+
+        async def run() -> None:
+            index.schedule_sync(fetch)
+            index.schedule_sync(fetch)
+            await asyncio.sleep(0.01)
+
+        asyncio.run(run())
+
+        assert calls == [1]
+        assert index.is_stale() is False
+
+    def test_schedule_sync_is_skipped_without_background_sync(self) -> None:
+        """Test that no background task is started when background work cannot run (Lambda)."""
+        index = SavedTrackIndex(background_sync=False)
+        calls = []
+
+        async def fetch() -> list[str]:
+            calls.append(1)
+            return ["a"]
+
+        async def run() -> None:
+            index.schedule_sync(fetch)
+            await asyncio.sleep(0.01)
+
+        asyncio.run(run())
+
+        assert calls == []
+        assert index.lookup(["a"]) is None
+
+    def test_refresh_if_stale_syncs_inline_without_background_sync(self) -> None:
+        """Test that the first stale lookup on Lambda waits for the sync so later lookups answer locally."""
+        index = SavedTrackIndex(background_sync=False)
+
+        async def fetch() -> list[str]:
+            return ["a"]
+
+        asyncio.run(index.refresh_if_stale(fetch))
+
+        assert index.lookup(["a", "b"]) == [True, False]
+
+    def test_refresh_if_stale_gives_up_after_the_timeout_and_backs_off(self) -> None:
+        """Test that a sync that cannot finish in time is cancelled and not retried until the TTL passes."""
+        now = [0.0]
+        index = SavedTrackIndex(ttl_seconds=10, clock=lambda: now[0], background_sync=False, inline_sync_seconds=0.01)
+        calls = []
+
+        async def slow_fetch() -> list[str]:
+            calls.append(1)
+            await asyncio.sleep(1)
+            return ["a"]
+
+        asyncio.run(index.refresh_if_stale(slow_fetch))
+        asyncio.run(index.refresh_if_stale(slow_fetch))
+        assert calls == [1]
+        assert index.lookup(["a"]) is None
+
+        index.add(["b"])
+        now[0] = 10
+        asyncio.run(index.refresh_if_stale(slow_fetch))
+        assert calls == [1, 1]
+
+
+class TestPollScheduler:
+    """Test cases for PollScheduler."""
+
+    @staticmethod
+    def _playback(sample_track_data: dict, progress_ms: int, is_playing: bool = True) -> Playback:
+        track = Track.from_dict({**sample_track_data, "duration_ms": 180000})
+        return Playback(track=track, progress_ms=progress_ms, is_playing=is_playing)
+
+    def test_polls_shortly_after_the_track_ends(self, sample_track_data: dict) -> None:
+        """Test that the next poll is due when the remaining time has elapsed."""
+        scheduler = PollScheduler(min_seconds=5, max_seconds=60, margin_seconds=2)
+
+        assert scheduler.next_delay(self._playback(sample_track_data, progress_ms=150000)) == 32
+        assert scheduler.next_delay(self._playback(sample_track_data, progress_ms=179000)) == 5
+        assert scheduler.next_delay(self._playback(sample_track_data, progress_ms=0)) == 60
+
+    def test_backs_off_while_nothing_is_playing(self, sample_track_data: dict) -> None:
+        """Test that idle polls double up to the cap and reset on playback."""
+        scheduler = PollScheduler(max_seconds=60, idle_seconds=15, max_idle_seconds=50)
+
+        assert [scheduler.next_delay(None) for _ in range(4)] == [15, 30, 50, 50]
+        assert scheduler.next_delay(self._playback(sample_track_data, progress_ms=0, is_playing=False)) == 50
+        scheduler.next_delay(self._playback(sample_track_data, progress_ms=0))
+        assert scheduler.next_delay(None) == 15
+
+    def test_idle_backoff_never_exceeds_the_playing_cap(self) -> None:
+        """Test that idle polls stay within max_seconds so tracks starting during an idle gap are not missed."""
+        scheduler = PollScheduler(max_seconds=60, idle_seconds=15, max_idle_seconds=600)
+
+        assert max(scheduler.next_delay(None) for _ in range(10)) == 60
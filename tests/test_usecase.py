@@ -1,18 +1,44 @@
 """Tests for usecase layer."""
 
+import asyncio
 import sys
 from pathlib import Path
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import pytest
+from spotipy.exceptions import SpotifyException
 
 # Add spotify_api to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent / "spotify_api"))
 
+from domain.model.daily_digest import DailyDigest, DigestMessage, DigestTrack
+from domain.model.playback import Playback
 from domain.model.track import Track
+from service.saved_track_index import SavedTrackIndex
 from usecase.authorize_usecase import AuthorizeUsecase
+from usecase.current_playing_usecase import (
+    MAX_TRACKS_PER_DIGEST_MESSAGE,
+    CurrentPlayingUsecase,
+    NotifyResult,
+    NotifyState,
+    NotifyStats,
+)
+from usecase.get_current_playing_usecase import GetCurrentPlayingUsecase
 from usecase.get_track_usecase import GetTrackUsecase
+from usecase.get_tracks_usecase import GetTracksUsecase
 from usecase.love_track_usecase import LoveTrackResponse, LoveTrackResult, LoveTrackUsecase
+from util.memory import MemoryTracker
+from util.ttl_lru_cache import TTLLRUCache
+
+
+def _spotify_id(name: str) -> str:
+    """Pad a readable name into a well-formed 22-character Spotify ID."""
+    return name.ljust(22, "0")
+
+
+def _new_track_cache() -> TTLLRUCache:
+    return TTLLRUCache(max_size=100, ttl_seconds=3600, negative_ttl_seconds=60)
 
 
 class TestGetTrackUsecase:
@@ -30,7 +56,7 @@ class TestGetTrackUsecase:
             mock_spotipy.get_track.return_value = mock_track
             mock_spotipy_class.get_instance.return_value = mock_spotipy
 
-            usecase = GetTrackUsecase(authorization_service=mock_auth_service)
+            usecase = GetTrackUsecase(authorization_service=mock_auth_service, cache=_new_track_cache())
             result = usecase.execute(track_id="track123")
 
             assert result is not None
@@ -48,49 +74,645 @@ class TestGetTrackUsecase:
             mock_spotipy.get_track.return_value = None
             mock_spotipy_class.get_instance.return_value = mock_spotipy
 
-            usecase = GetTrackUsecase(authorization_service=mock_auth_service)
+            usecase = GetTrackUsecase(authorization_service=mock_auth_service, cache=_new_track_cache())
             result = usecase.execute(track_id="nonexistent")
 
             assert result is None
 
 
+class TestGetTracksUsecase:
+    """Test cases for GetTracksUsecase."""
+
+    def test_execute_chunks_ids_and_keeps_input_order(self, sample_track_data: dict) -> None:
+        """Test that IDs are fetched in chunks of 50 and returned in input order with None for misses."""
+        mock_auth_service = MagicMock()
+        mock_auth_service.get_access_token_async = AsyncMock(return_value="test_access_token")
+
+        async def get_tracks(track_ids: list[str]) -> list:
+            return [
+                None if track_id.startswith("missing") else Track.from_dict({**sample_track_data, "id": track_id})
+                for track_id in track_ids
+            ]
+
+        track_ids = [_spotify_id(f"id{i}x") for i in range(120)] + [_spotify_id("missing1"), _spotify_id("id0x")]
+
+        with patch("usecase.get_tracks_usecase.AsyncSpotipy") as mock_spotipy_class:
+            mock_spotipy = AsyncMock()
+            mock_spotipy.get_tracks.side_effect = get_tracks
+            mock_spotipy_class.get_instance.return_value = mock_spotipy
+
+            usecase = GetTracksUsecase(authorization_service=mock_auth_service, cache=_new_track_cache())
+            result = asyncio.run(usecase.execute(track_ids=track_ids))
+
+            assert [t.id if t is not None else None for t in result] == track_ids[:-2] + [None, _spotify_id("id0x")]
+            chunk_sizes = [len(c.args[0]) for c in mock_spotipy.get_tracks.await_args_list]
+            assert chunk_sizes == [50, 50, 21]
+
+    def test_execute_returns_empty_list_without_calling_spotify(self) -> None:
+        """Test that no request is made for an empty ID list."""
+        mock_auth_service = MagicMock()
+
+        with patch("usecase.get_tracks_usecase.AsyncSpotipy") as mock_spotipy_class:
+            usecase = GetTracksUsecase(authorization_service=mock_auth_service, cache=_new_track_cache())
+            result = asyncio.run(usecase.execute(track_ids=[]))
+
+            assert result == []
+            mock_spotipy_class.get_instance.assert_not_called()
+
+    def test_execute_only_fetches_uncached_ids(self, sample_track_data: dict) -> None:
+        """Test that cached tracks and cached misses are not requested again."""
+        mock_auth_service = MagicMock()
+        mock_auth_service.get_access_token_async = AsyncMock(return_value="test_access_token")
+        cached, known_missing, fresh = _spotify_id("cached"), _spotify_id("knownmissing"), _spotify_id("fresh")
+        cache = _new_track_cache()
+        cache.set(cached, Track.from_dict({**sample_track_data, "id": cached}))
+        cache.set(known_missing, None)
+
+        with patch("usecase.get_tracks_usecase.AsyncSpotipy") as mock_spotipy_class:
+            mock_spotipy = AsyncMock()
+            mock_spotipy.get_tracks.return_value = [Track.from_dict({**sample_track_data, "id": fresh})]
+            mock_spotipy_class.get_instance.return_value = mock_spotipy
+
+            usecase = GetTracksUsecase(authorization_service=mock_auth_service, cache=cache)
+            result = asyncio.run(usecase.execute(track_ids=[cached, known_missing, fresh]))
+
+            assert [t.id if t is not None else None for t in result] == [cached, None, fresh]
+            mock_spotipy.get_tracks.assert_awaited_once_with([fresh])
+
+    def test_execute_returns_none_for_malformed_ids_without_requesting_them(self, sample_track_data: dict) -> None:
+        """Test that malformed IDs become None and are left out of the request so they cannot fail it."""
+        mock_auth_service = MagicMock()
+        mock_auth_service.get_access_token_async = AsyncMock(return_value="test_access_token")
+        valid = _spotify_id("valid")
+
+        with patch("usecase.get_tracks_usecase.AsyncSpotipy") as mock_spotipy_class:
+            mock_spotipy = AsyncMock()
+            mock_spotipy.get_tracks.return_value = [Track.from_dict({**sample_track_data, "id": valid})]
+            mock_spotipy_class.get_instance.return_value = mock_spotipy
+
+            usecase = GetTracksUsecase(authorization_service=mock_auth_service, cache=_new_track_cache())
+            result = asyncio.run(usecase.execute(track_ids=["bad-id!", valid, "short"]))
+
+            assert [t.id if t is not None else None for t in result] == [None, valid, None]
+            mock_spotipy.get_tracks.assert_awaited_once_with([valid])
+
+    def test_execute_returns_none_for_a_chunk_rejected_with_400(self, sample_track_data: dict) -> None:
+        """Test that a 400 for one chunk nulls that chunk only, without caching it or failing the others."""
+        mock_auth_service = MagicMock()
+        mock_auth_service.get_access_token_async = AsyncMock(return_value="test_access_token")
+        track_ids = [_spotify_id(f"id{i}x") for i in range(60)]
+        cache = _new_track_cache()
+
+        async def get_tracks(chunk: list[str]) -> list:
+            if chunk[0] == track_ids[0]:
+                request = httpx.Request("GET", "https://api.spotify.com/v1/tracks")
+                response = httpx.Response(400, request=request, text="invalid id")
+                raise httpx.HTTPStatusError("bad request", request=request, response=response)
+            return [Track.from_dict({**sample_track_data, "id": track_id}) for track_id in chunk]
+
+        with patch("usecase.get_tracks_usecase.AsyncSpotipy") as mock_spotipy_class:
+            mock_spotipy = AsyncMock()
+            mock_spotipy.get_tracks.side_effect = get_tracks
+            mock_spotipy_class.get_instance.return_value = mock_spotipy
+
+            usecase = GetTracksUsecase(authorization_service=mock_auth_service, cache=cache)
+            result = asyncio.run(usecase.execute(track_ids=track_ids))
+
+            assert result[:50] == [None] * 50
+            assert [t.id for t in result[50:] if t is not None] == track_ids[50:]
+            assert cache.get(track_ids[0]) == (False, None)
+
+
+class TestGetTrackUsecaseCache:
+    """Test cases for the track metadata cache in front of GetTrackUsecase."""
+
+    def test_execute_serves_repeated_lookups_from_cache(self, sample_track_data: dict) -> None:
+        """Test that a second lookup of the same ID does not call Spotify or load the token."""
+        mock_auth_service = MagicMock()
+        mock_auth_service.get_access_token.return_value = "test_access_token"
+        cache = _new_track_cache()
+
+        with patch("usecase.get_track_usecase.Spotipy") as mock_spotipy_class:
+            mock_spotipy = MagicMock()
+            mock_spotipy.get_track.return_value = Track.from_dict(sample_track_data)
+            mock_spotipy_class.get_instance.return_value = mock_spotipy
+
+            usecase = GetTrackUsecase(authorization_service=mock_auth_service, cache=cache)
+            first = usecase.execute(track_id="track123")
+            second = usecase.execute(track_id="track123")
+
+            assert first is second
+            mock_spotipy.get_track.assert_called_once()
+            mock_auth_service.get_access_token.assert_called_once()
+            assert cache.stats().hits == 1
+
+    def test_execute_caches_missing_tracks(self) -> None:
+        """Test that an empty result is negatively cached."""
+        mock_auth_service = MagicMock()
+        mock_auth_service.get_access_token.return_value = "test_access_token"
+        cache = _new_track_cache()
+
+        with patch("usecase.get_track_usecase.Spotipy") as mock_spotipy_class:
+            mock_spotipy = MagicMock()
+            mock_spotipy.get_track.return_value = None
+            mock_spotipy_class.get_instance.return_value = mock_spotipy
+
+            usecase = GetTrackUsecase(authorization_service=mock_auth_service, cache=cache)
+            assert usecase.execute(track_id="nonexistent") is None
+            assert usecase.execute(track_id="nonexistent") is None
+
+            mock_spotipy.get_track.assert_called_once()
+
+    @pytest.mark.parametrize("http_status", [400, 404])
+    def test_execute_caches_ids_that_spotify_rejects(self, http_status: int) -> None:
+        """Test that a 404/400 raised by spotipy is negatively cached instead of hitting Spotify every time."""
+        mock_auth_service = MagicMock()
+        mock_auth_service.get_access_token.return_value = "test_access_token"
+        cache = _new_track_cache()
+
+        with patch("usecase.get_track_usecase.Spotipy") as mock_spotipy_class:
+            mock_spotipy = MagicMock()
+            mock_spotipy.get_track.side_effect = SpotifyException(http_status, -1, "non existing id")
+            mock_spotipy_class.get_instance.return_value = mock_spotipy
+
+            usecase = GetTrackUsecase(authorization_service=mock_auth_service, cache=cache)
+            assert usecase.execute(track_id="deadid") is None
+            assert usecase.execute(track_id="deadid") is None
+
+            mock_spotipy.get_track.assert_called_once()
+
+    def test_execute_does_not_cache_server_errors(self) -> None:
+        """Test that other Spotify errors propagate and are retried on the next lookup."""
+        mock_auth_service = MagicMock()
+        mock_auth_service.get_access_token.return_value = "test_access_token"
+        cache = _new_track_cache()
+
+        with patch("usecase.get_track_usecase.Spotipy") as mock_spotipy_class:
+            mock_spotipy = MagicMock()
+            mock_spotipy.get_track.side_effect = SpotifyException(502, -1, "bad gateway")
+            mock_spotipy_class.get_instance.return_value = mock_spotipy
+
+            usecase = GetTrackUsecase(authorization_service=mock_auth_service, cache=cache)
+            with pytest.raises(SpotifyException):
+                usecase.execute(track_id="track123")
+
+            assert cache.get("track123") == (False, None)
+
+
+class TestGetTrackUsecaseMemory:
+    """Test cases for memory retained by repeated track lookups in a warm process."""
+
+    # 1曲(約180件のavailable_markets)をキャッシュに残すと10KB程度になるので、それより十分小さい値にする
+    MAX_RETAINED_BYTES_PER_REQUEST = 1024
+
+    @staticmethod
+    def _retained_bytes_per_request(cache: TTLLRUCache, sample_track_data: dict) -> float:
+        """Measure memory retained per lookup of a new track ID after the cache has warmed up."""
+
+        class FakeAuthorizationService:
+            def get_access_token(self) -> str:
+                return "test_access_token"
+
+        class FakeSpotipy:
+            # MagicMockは呼び出しを記録し続けるので、計測には使わない
+            @classmethod
+            def get_instance(cls, access_token: str) -> "FakeSpotipy":
+                return cls()
+
+            def get_track(self, track_id: str) -> Track:
+                markets = [f"{chr(65 + i // 26)}{chr(65 + i % 26)}" for i in range(180)]
+                return Track.from_dict({**sample_track_data, "id": track_id, "available_markets": markets})
+
+        tracker = MemoryTracker(report_every=100)
+        usecase = GetTrackUsecase(authorization_service=FakeAuthorizationService(), cache=cache)
+        reports = []
+        with patch("usecase.get_track_usecase.Spotipy", FakeSpotipy):
+            tracker.start()
+            try:
+                for i in range(300):
+                    usecase.execute(track_id=f"track{i}")
+                    reports.append(tracker.on_request())
+            finally:
+                tracker.stop()
+        # 最初のレポートまではキャッシュが埋まっていく途中なので、それ以降で見る
+        return max(report.retained_bytes_per_request for report in reports[100:] if report is not None)
+
+    def test_retained_memory_is_bounded_by_the_cache_size(self, sample_track_data: dict) -> None:
+        """Test that once the cache is full, new lookups do not keep growing memory."""
+        cache = TTLLRUCache(max_size=50, ttl_seconds=3600, negative_ttl_seconds=60)
+
+        retained = self._retained_bytes_per_request(cache, sample_track_data)
+
+        assert retained < self.MAX_RETAINED_BYTES_PER_REQUEST
+
+    def test_unbounded_cache_is_detected(self, sample_track_data: dict) -> None:
+        """Test that the check fails when every lookup stays in memory."""
+        cache = TTLLRUCache(max_size=100_000, ttl_seconds=3600, negative_ttl_seconds=60)
+
+        retained = self._retained_bytes_per_request(cache, sample_track_data)
+
+        assert retained > self.MAX_RETAINED_BYTES_PER_REQUEST
+
+
 class TestLoveTrackUsecase:
     """Test cases for LoveTrackUsecase."""
 
     def test_execute_success_when_not_saved(self) -> None:
         """Test that love_track succeeds when track is not already saved."""
         mock_auth_service = MagicMock()
-        mock_auth_service.get_access_token.return_value = "test_access_token"
+        mock_auth_service.get_access_token_async = AsyncMock(return_value="test_access_token")
 
-        with patch("usecase.love_track_usecase.Spotipy") as mock_spotipy_class:
-            mock_spotipy = MagicMock()
+        with patch("usecase.love_track_usecase.AsyncSpotipy") as mock_spotipy_class:
+            mock_spotipy = AsyncMock()
             mock_spotipy.is_track_saved.return_value = False
             mock_spotipy_class.get_instance.return_value = mock_spotipy
 
-            usecase = LoveTrackUsecase(authorization_service=mock_auth_service)
-            result = usecase.execute(track_id="track123")
+            usecase = LoveTrackUsecase(authorization_service=mock_auth_service, saved_track_index=SavedTrackIndex())
+            result = asyncio.run(usecase.execute(track_id="track123"))
 
             assert isinstance(result, LoveTrackResponse)
             assert result.result == LoveTrackResult.SUCCESS
-            mock_spotipy.love_track.assert_called_once_with("track123")
+            mock_spotipy_class.get_instance.assert_called_once_with(access_token="test_access_token")
+            mock_spotipy.love_track.assert_awaited_once_with("track123")
 
     def test_execute_already_loved_when_saved(self) -> None:
         """Test that love_track returns already_loved when track is saved."""
         mock_auth_service = MagicMock()
-        mock_auth_service.get_access_token.return_value = "test_access_token"
+        mock_auth_service.get_access_token_async = AsyncMock(return_value="test_access_token")
 
-        with patch("usecase.love_track_usecase.Spotipy") as mock_spotipy_class:
-            mock_spotipy = MagicMock()
+        with patch("usecase.love_track_usecase.AsyncSpotipy") as mock_spotipy_class:
+            mock_spotipy = AsyncMock()
             mock_spotipy.is_track_saved.return_value = True
             mock_spotipy_class.get_instance.return_value = mock_spotipy
 
-            usecase = LoveTrackUsecase(authorization_service=mock_auth_service)
-            result = usecase.execute(track_id="track123")
+            usecase = LoveTrackUsecase(authorization_service=mock_auth_service, saved_track_index=SavedTrackIndex())
+            result = asyncio.run(usecase.execute(track_id="track123"))
 
             assert isinstance(result, LoveTrackResponse)
             assert result.result == LoveTrackResult.ALREADY_LOVED
             mock_spotipy.love_track.assert_not_called()
 
+    def test_execute_many_batches_contains_and_add(self) -> None:
+        """Test that execute_many checks 50 IDs at a time and regroups only unsaved IDs into full save batches."""
+        mock_auth_service = MagicMock()
+        mock_auth_service.get_access_token_async = AsyncMock(return_value="test_access_token")
+        track_ids = [_spotify_id(f"id{i}x") for i in range(120)]
+
+        def is_even(track_id: str) -> bool:
+            return int(track_id[2:].split("x")[0]) % 2 == 0
+
+        async def are_tracks_saved(ids: list[str]) -> list[bool]:
+            return [is_even(track_id) for track_id in ids]
+
+        with patch("usecase.love_track_usecase.AsyncSpotipy") as mock_spotipy_class:
+            mock_spotipy = AsyncMock()
+            mock_spotipy.are_tracks_saved.side_effect = are_tracks_saved
+            mock_spotipy_class.get_instance.return_value = mock_spotipy
+
+            usecase = LoveTrackUsecase(authorization_service=mock_auth_service, saved_track_index=SavedTrackIndex())
+            results = asyncio.run(usecase.execute_many(track_ids=track_ids + [_spotify_id("id1x")]))
+
+            assert list(results) == track_ids
+            assert results[_spotify_id("id0x")] == LoveTrackResult.ALREADY_LOVED
+            assert results[_spotify_id("id1x")] == LoveTrackResult.SUCCESS
+            assert [len(c.args[0]) for c in mock_spotipy.are_tracks_saved.await_args_list] == [50, 50, 20]
+            saved = [track_id for c in mock_spotipy.love_tracks.await_args_list for track_id in c.args[0]]
+            assert sorted(saved) == sorted(track_id for track_id in track_ids if not is_even(track_id))
+            # The 60 unsaved IDs are regrouped across check chunks into full batches of 50
+            assert [len(c.args[0]) for c in mock_spotipy.love_tracks.await_args_list] == [50, 10]
+
+    def test_execute_many_marks_failed_chunk(self) -> None:
+        """Test that a failed add marks only that chunk's unsaved tracks as failed."""
+        mock_auth_service = MagicMock()
+        mock_auth_service.get_access_token_async = AsyncMock(return_value="test_access_token")
+
+        with patch("usecase.love_track_usecase.AsyncSpotipy") as mock_spotipy_class:
+            mock_spotipy = AsyncMock()
+            mock_spotipy.are_tracks_saved.return_value = [True, False]
+            mock_spotipy.love_tracks.side_effect = httpx.HTTPError("boom")
+            mock_spotipy_class.get_instance.return_value = mock_spotipy
+
+            usecase = LoveTrackUsecase(authorization_service=mock_auth_service, saved_track_index=SavedTrackIndex())
+            saved, new = _spotify_id("saved"), _spotify_id("new")
+            results = asyncio.run(usecase.execute_many(track_ids=[saved, new]))
+
+            assert results == {saved: LoveTrackResult.ALREADY_LOVED, new: LoveTrackResult.FAILED}
+
+    def test_execute_many_fails_malformed_ids_without_failing_their_chunk(self) -> None:
+        """Test that malformed IDs are FAILED on their own and left out of the contains check and save."""
+        mock_auth_service = MagicMock()
+        mock_auth_service.get_access_token_async = AsyncMock(return_value="test_access_token")
+        saved, new = _spotify_id("saved"), _spotify_id("new")
+
+        with patch("usecase.love_track_usecase.AsyncSpotipy") as mock_spotipy_class:
+            mock_spotipy = AsyncMock()
+            mock_spotipy.are_tracks_saved.return_value = [True, False]
+            mock_spotipy_class.get_instance.return_value = mock_spotipy
+
+            usecase = LoveTrackUsecase(authorization_service=mock_auth_service, saved_track_index=SavedTrackIndex())
+            results = asyncio.run(usecase.execute_many(track_ids=["bad-id!", saved, "short", new]))
+
+            assert results == {
+                "bad-id!": LoveTrackResult.FAILED,
+                saved: LoveTrackResult.ALREADY_LOVED,
+                "short": LoveTrackResult.FAILED,
+                new: LoveTrackResult.SUCCESS,
+            }
+            mock_spotipy.are_tracks_saved.assert_awaited_once_with([saved, new])
+            mock_spotipy.love_tracks.assert_awaited_once_with([new])
+
+    def test_execute_answers_from_fresh_index(self) -> None:
+        """Test that a track in a fresh index is already loved without calling Spotify."""
+        mock_auth_service = MagicMock()
+        index = SavedTrackIndex()
+        index.replace(["track123"])
+
+        with patch("usecase.love_track_usecase.AsyncSpotipy") as mock_spotipy_class:
+            usecase = LoveTrackUsecase(authorization_service=mock_auth_service, saved_track_index=index)
+            result = asyncio.run(usecase.execute(track_id="track123"))
+
+            assert result.result == LoveTrackResult.ALREADY_LOVED
+            mock_spotipy_class.get_instance.assert_not_called()
+
+    def test_execute_skips_contains_check_when_index_is_fresh(self) -> None:
+        """Test that an unindexed track is saved without a contains call and then indexed."""
+        mock_auth_service = MagicMock()
+        mock_auth_service.get_access_token_async = AsyncMock(return_value="test_access_token")
+        index = SavedTrackIndex()
+        index.replace([])
+
+        with patch("usecase.love_track_usecase.AsyncSpotipy") as mock_spotipy_class:
+            mock_spotipy = AsyncMock()
+            mock_spotipy_class.get_instance.return_value = mock_spotipy
+
+            usecase = LoveTrackUsecase(authorization_service=mock_auth_service, saved_track_index=index)
+            result = asyncio.run(usecase.execute(track_id="track123"))
+
+            assert result.result == LoveTrackResult.SUCCESS
+            mock_spotipy.is_track_saved.assert_not_called()
+            assert index.lookup(["track123"]) == [True]
+
+    def test_execute_falls_back_to_api_and_syncs_when_stale(self) -> None:
+        """Test that a stale index asks Spotify and schedules a library sync."""
+        mock_auth_service = MagicMock()
+        mock_auth_service.get_access_token_async = AsyncMock(return_value="test_access_token")
+        index = SavedTrackIndex()
+
+        with patch("usecase.love_track_usecase.AsyncSpotipy") as mock_spotipy_class:
+            mock_spotipy = AsyncMock()
+            mock_spotipy.is_track_saved.return_value = True
+            mock_spotipy.get_saved_track_ids.return_value = ["track123", "other"]
+            mock_spotipy_class.get_instance.return_value = mock_spotipy
+
+            async def run() -> LoveTrackResponse:
+                response = await usecase.execute(track_id="track123")
+                await asyncio.sleep(0)
+                return response
+
+            usecase = LoveTrackUsecase(authorization_service=mock_auth_service, saved_track_index=index)
+            result = asyncio.run(run())
+
+            assert result.result == LoveTrackResult.ALREADY_LOVED
+            mock_spotipy.is_track_saved.assert_awaited_once_with("track123")
+            assert index.lookup(["track123", "other"]) == [True, True]
+
+    def test_execute_syncs_a_stale_index_inline_without_background_sync(self) -> None:
+        """Test that on Lambda a stale index is synced within the request and answers without a contains call."""
+        mock_auth_service = MagicMock()
+        mock_auth_service.get_access_token_async = AsyncMock(return_value="test_access_token")
+        index = SavedTrackIndex(background_sync=False)
+
+        with patch("usecase.love_track_usecase.AsyncSpotipy") as mock_spotipy_class:
+            mock_spotipy = AsyncMock()
+            mock_spotipy.get_saved_track_ids.return_value = ["track123"]
+            mock_spotipy_class.get_instance.return_value = mock_spotipy
+
+            usecase = LoveTrackUsecase(authorization_service=mock_auth_service, saved_track_index=index)
+            result = asyncio.run(usecase.execute(track_id="track123"))
+
+            assert result.result == LoveTrackResult.ALREADY_LOVED
+            mock_spotipy.is_track_saved.assert_not_called()
+            assert index.is_stale() is False
+
+    def test_execute_many_with_no_ids(self) -> None:
+        """Test that an empty list makes no calls."""
+        mock_auth_service = MagicMock()
+
+        with patch("usecase.love_track_usecase.AsyncSpotipy") as mock_spotipy_class:
+            usecase = LoveTrackUsecase(authorization_service=mock_auth_service, saved_track_index=SavedTrackIndex())
+
+            assert asyncio.run(usecase.execute_many(track_ids=[])) == {}
+            mock_spotipy_class.get_instance.assert_not_called()
+
+
+class TestCurrentPlayingUsecase:
+    """Test cases for posting the playing track to Slack."""
+
+    @staticmethod
+    def _usecase(
+        repository: MagicMock,
+        track: Track,
+        progress_ms: int = 0,
+        state: NotifyState | None = None,
+        slack_client: MagicMock | None = None,
+        daily_digest_repository: MagicMock | None = None,
+    ) -> CurrentPlayingUsecase:
+        mock_auth_service = MagicMock()
+        mock_auth_service.get_access_token.return_value = "test_access_token"
+        with patch("usecase.current_playing_usecase.Spotipy") as mock_spotipy_class:
+            mock_spotipy_class.get_instance.return_value.get_playback.return_value = Playback(
+                track=track, progress_ms=progress_ms, is_playing=True
+            )
+            return CurrentPlayingUsecase(
+                authorization_service=mock_auth_service,
+                posted_track_repository=repository,
+                slack_client=slack_client if slack_client is not None else MagicMock(),
+                state=state or NotifyState(),
+                daily_digest_repository=daily_digest_repository,
+            )
+
+    def test_skips_track_already_posted_today(self, sample_track_data: dict) -> None:
+        """Test that the dedup store answers without reading Slack history."""
+        repository = MagicMock()
+        repository.load.return_value = {"track123"}
+        slack_client = MagicMock()
+        usecase = self._usecase(repository, Track.from_dict(sample_track_data), slack_client=slack_client)
+
+        assert usecase.notificate_current_playing() is True
+
+        assert slack_client.mock_calls == []
+        repository.save.assert_not_called()
+
+    def test_rebuilds_store_from_history_and_records_post(self, sample_track_data: dict) -> None:
+        """Test that a missing store is rebuilt from paginated history before posting."""
+        repository = MagicMock()
+        repository.load.return_value = None
+        slack_client = MagicMock()
+        slack_client.conversations_history.side_effect = [
+            {
+                "messages": [{"blocks": [{"type": "actions", "elements": [{"value": "old1"}]}]}],
+                "has_more": True,
+                "response_metadata": {"next_cursor": "cursor1"},
+            },
+            {"messages": [{"blocks": [{"type": "actions", "elements": [{"value": "old2"}]}]}], "has_more": False},
+        ]
+        slack_client.chat_post_message.return_value = {"ts": "1.0", "channel": "C1"}
+        usecase = self._usecase(repository, Track.from_dict(sample_track_data), slack_client=slack_client)
+
+        assert usecase.notificate_current_playing() is True
+
+        assert slack_client.conversations_history.call_args_list[1].kwargs["cursor"] == "cursor1"
+        assert slack_client.chat_post_message.call_count == 2
+        assert slack_client.chat_post_message.call_args_list[1].kwargs["thread_ts"] == "1.0"
+        saved = [c.args[1] for c in repository.save.call_args_list]
+        assert saved[-1] == {"old1", "old2", "track123"}
+
+    def test_track_without_spotify_url_skips_thread_reply(self, sample_track_data: dict) -> None:
+        """Test that a track with no Spotify URL (e.g. a local file) is posted without the URL reply."""
+        repository = MagicMock()
+        repository.load.return_value = set()
+        slack_client = MagicMock()
+        slack_client.chat_post_message.return_value = {"ts": "1.0", "channel": "C1"}
+        track = Track.from_dict({**sample_track_data, "external_urls": {}})
+        usecase = self._usecase(repository, track, slack_client=slack_client)
+
+        assert usecase.notificate_current_playing() is True
+
+        slack_client.chat_post_message.assert_called_once()
+        assert "thread_ts" not in slack_client.chat_post_message.call_args.kwargs
+
+    def test_same_playback_as_last_skips_slack(self, sample_track_data: dict) -> None:
+        """Test that a still-playing track exits after the Spotify call and is counted as skipped."""
+        repository = MagicMock()
+        repository.load.return_value = {"track123"}
+        state = NotifyState()
+        track = Track.from_dict(sample_track_data)
+        self._usecase(repository, track, progress_ms=1000, state=state).notificate_current_playing()
+
+        slack_client = MagicMock()
+        self._usecase(
+            repository, track, progress_ms=61000, state=state, slack_client=slack_client
+        ).notificate_current_playing()
+
+        assert slack_client.mock_calls == []
+        assert repository.load.call_count == 1
+        stats = state.stats()
+        assert stats.skipped_already_posted == 1
+        assert stats.skipped_same_as_last == 1
+        assert stats.last_result == NotifyResult.SAME_AS_LAST
+
+    def test_replayed_track_checks_store_again(self, sample_track_data: dict) -> None:
+        """Test that a restart of the same track (progress went back) is not short-circuited."""
+        repository = MagicMock()
+        repository.load.return_value = {"track123"}
+        state = NotifyState()
+        track = Track.from_dict(sample_track_data)
+        self._usecase(repository, track, progress_ms=120000, state=state).notificate_current_playing()
+        self._usecase(repository, track, progress_ms=5000, state=state).notificate_current_playing()
+
+        assert repository.load.call_count == 2
+        assert state.stats().skipped_same_as_last == 0
+
+    def test_stats_since_returns_only_the_latest_run(self, sample_track_data: dict) -> None:
+        """Test that stats taken before a run can be subtracted to get that run's counts."""
+        repository = MagicMock()
+        repository.load.return_value = {"track123"}
+        state = NotifyState()
+        track = Track.from_dict(sample_track_data)
+        self._usecase(repository, track, progress_ms=1000, state=state).notificate_current_playing()
+        before = state.stats()
+        self._usecase(repository, track, progress_ms=61000, state=state).notificate_current_playing()
+
+        assert state.stats().since(before) == NotifyStats(
+            posted=0,
+            skipped_same_as_last=1,
+            skipped_already_posted=0,
+            not_playing=0,
+            last_result=NotifyResult.SAME_AS_LAST,
+        )
+        assert state.stats().skipped_already_posted == 1
+
+
+class TestCurrentPlayingUsecaseDigest:
+    """Test cases for the daily digest notification mode."""
+
+    @staticmethod
+    def _notify(sample_track_data: dict, track_id: str, digest: DailyDigest | None) -> tuple[MagicMock, MagicMock]:
+        repository = MagicMock()
+        repository.load.return_value = digest
+        slack_client = MagicMock()
+        slack_client.chat_post_message.return_value = {"channel": "C1", "ts": "2.0"}
+        track = Track.from_dict({**sample_track_data, "id": track_id})
+        TestCurrentPlayingUsecase._usecase(
+            MagicMock(), track, slack_client=slack_client, daily_digest_repository=repository
+        ).notificate_current_playing()
+        return repository, slack_client
+
+    def test_first_track_of_the_day_posts_digest(self, sample_track_data: dict) -> None:
+        """Test that the first track starts a digest message with a Love button."""
+        repository, slack_client = self._notify(sample_track_data, "track123", digest=None)
+
+        blocks = slack_client.chat_post_message.call_args.kwargs["blocks"]
+        assert len(blocks) == 2
+        assert blocks[1]["accessory"]["value"] == "track123"
+        saved = repository.save.call_args.args[0]
+        assert saved.messages[0].ts == "2.0"
+        assert [t.track_id for t in saved.messages[0].tracks] == ["track123"]
+
+    def test_later_tracks_update_the_digest_in_place(self, sample_track_data: dict) -> None:
+        """Test that a new track rewrites the existing message with chat.update."""
+        digest = DailyDigest(
+            day="2024-01-15", messages=[DigestMessage(channel="C1", ts="1.0", tracks=[DigestTrack("old", "Old")])]
+        )
+        repository, slack_client = self._notify(sample_track_data, "track123", digest=digest)
+
+        slack_client.chat_post_message.assert_not_called()
+        kwargs = slack_client.chat_update.call_args.kwargs
+        assert kwargs["ts"] == "1.0"
+        assert [b["accessory"]["value"] for b in kwargs["blocks"][1:]] == ["old", "track123"]
+        assert len(repository.save.call_args.args[0].messages[0].tracks) == 2
+
+    def test_full_message_rolls_over_to_a_new_one(self, sample_track_data: dict) -> None:
+        """Test that a message at the block limit is left alone and a new one is posted."""
+        tracks = [DigestTrack(f"id{i}", f"Song {i}") for i in range(MAX_TRACKS_PER_DIGEST_MESSAGE)]
+        digest = DailyDigest(day="2024-01-15", messages=[DigestMessage(channel="C1", ts="1.0", tracks=tracks)])
+        repository, slack_client = self._notify(sample_track_data, "track123", digest=digest)
+
+        slack_client.chat_update.assert_not_called()
+        slack_client.chat_post_message.assert_called_once()
+        assert len(repository.save.call_args.args[0].messages) == 2
+
+    def test_track_already_in_digest_is_skipped(self, sample_track_data: dict) -> None:
+        """Test that a track already in today's digest makes no Slack call."""
+        digest = DailyDigest(
+            day="2024-01-15",
+            messages=[DigestMessage(channel="C1", ts="1.0", tracks=[DigestTrack("track123", "Song")])],
+        )
+        repository, slack_client = self._notify(sample_track_data, "track123", digest=digest)
+
+        assert slack_client.mock_calls == []
+        repository.save.assert_not_called()
+
+
+class TestGetCurrentPlayingUsecase:
+    """Test cases for GetCurrentPlayingUsecase."""
+
+    def test_execute_returns_current_track(self, sample_track_data: dict) -> None:
+        """Test that execute awaits the async client for the playing track."""
+        mock_auth_service = MagicMock()
+        mock_auth_service.get_access_token_async = AsyncMock(return_value="test_access_token")
+
+        with patch("usecase.get_current_playing_usecase.AsyncSpotipy") as mock_spotipy_class:
+            mock_spotipy = AsyncMock()
+            mock_spotipy.get_current_playing.return_value = Track.from_dict(sample_track_data)
+            mock_spotipy_class.get_instance.return_value = mock_spotipy
+
+            usecase = GetCurrentPlayingUsecase(authorization_service=mock_auth_service)
+            result = asyncio.run(usecase.execute())
+
+            assert result is not None
+            assert result.id == "track123"
+
 
 class TestLoveTrackResponse:
     """Test cases for LoveTrackResponse."""
@@ -1,7 +1,13 @@
 """Tests for utility functions."""
 
+import asyncio
+import contextvars
+import json
+import logging
 import os
 import sys
+import threading
+import time
 from datetime import datetime as DatetimeObject
 from pathlib import Path
 from unittest.mock import patch
@@ -11,8 +17,13 @@ import pytest
 # Add spotify_api to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent / "spotify_api"))
 
+from custom_logger import SamplingFilter, get_logger
+from util import invocation_metrics, profiling, server_timing
 from util.datetime import get_current_day_and_tomorrow
 from util.environment import Environment
+from util.memory import MemoryTracker, deep_sizeof, register_cache
+from util.metrics import MetricsRegistry, observe, record_upstream_bytes, upstream_requests_total
+from util.ttl_lru_cache import TTLLRUCache
 
 
 class TestGetCurrentDayAndTomorrow:
@@ -93,6 +104,20 @@ class TestEnvironment:
             os.environ.pop("ENVIRONMENT", None)
             assert Environment.is_dev() is False
 
+    def test_is_lambda(self) -> None:
+        """Test is_lambda is True only inside the Lambda runtime."""
+        with patch.dict(os.environ, {"AWS_LAMBDA_FUNCTION_NAME": "spotify-api"}):
+            assert Environment.is_lambda() is True
+        with patch.dict(os.environ, {}, clear=True):
+            assert Environment.is_lambda() is False
+
+    def test_is_digest_mode(self) -> None:
+        """Test is_digest_mode follows SLACK_NOTIFY_MODE and defaults to per-track posts."""
+        with patch.dict(os.environ, {"SLACK_NOTIFY_MODE": "digest"}):
+            assert Environment.is_digest_mode() is True
+        with patch.dict(os.environ, {}, clear=True):
+            assert Environment.is_digest_mode() is False
+
     def test_is_local_returns_true_when_local(self) -> None:
         """Test is_local returns True when ENVIRONMENT is local."""
         with patch.dict(os.environ, {"ENVIRONMENT": "local"}):
@@ -122,3 +147,353 @@ class TestEnvironment:
                 Environment.valid_access_token("wrong_secret")
 
             assert "invalid secret" in str(exc_info.value)
+
+
+class TestTTLLRUCache:
+    """Test cases for TTLLRUCache."""
+
+    @staticmethod
+    def _cache(max_size: int = 2) -> tuple[TTLLRUCache, list[float]]:
+        now = [0.0]
+        cache: TTLLRUCache = TTLLRUCache(
+            max_size=max_size, ttl_seconds=100, negative_ttl_seconds=10, clock=lambda: now[0]
+        )
+        return cache, now
+
+    def test_get_returns_cached_value(self) -> None:
+        """Test that a stored value is returned and counted as a hit."""
+        cache, _ = self._cache()
+        cache.set("a", "value")
+
+        assert cache.get("a") == (True, "value")
+        assert cache.get("b") == (False, None)
+        stats = cache.stats()
+        assert (stats.hits, stats.misses, stats.size) == (1, 1, 1)
+        assert stats.hit_ratio == 0.5
+
+    def test_entries_expire_after_ttl(self) -> None:
+        """Test that entries older than the TTL are dropped."""
+        cache, now = self._cache()
+        cache.set("a", "value")
+
+        now[0] = 100
+        assert cache.get("a") == (False, None)
+        assert cache.stats().size == 0
+
+    def test_negative_entries_use_short_ttl(self) -> None:
+        """Test that None is cached as a miss marker with the negative TTL."""
+        cache, now = self._cache()
+        cache.set("missing", None)
+
+        now[0] = 5
+        assert cache.get("missing") == (True, None)
+        now[0] = 10
+        assert cache.get("missing") == (False, None)
+
+    def test_evicts_least_recently_used(self) -> None:
+        """Test that the least recently used entry is evicted when full."""
+        cache, _ = self._cache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") == (False, None)
+        assert cache.get("a") == (True, 1)
+        assert cache.get("c") == (True, 3)
+        assert cache.stats().evictions == 1
+
+
+class TestGetLogger:
+    """Test cases for get_logger and SamplingFilter."""
+
+    def test_get_logger_adds_handler_once(self) -> None:
+        """Test that calling get_logger repeatedly for the same name does not stack handlers."""
+        first = get_logger("test_utils.idempotent")
+        second = get_logger("test_utils.idempotent", sample_every=5)
+        third = get_logger("test_utils.idempotent", sample_every=5)
+
+        assert first is second is third
+        assert len(first.handlers) == 1
+        assert len(first.filters) == 1
+
+    def test_loggers_share_one_handler(self) -> None:
+        """Test that every logger writes through the same handler (and listener)."""
+        assert get_logger("test_utils.a").handlers == get_logger("test_utils.b").handlers
+
+    def test_sampling_filter_passes_every_nth_record_per_message(self) -> None:
+        """Test that info records are sampled per message while warnings always pass."""
+        sampling_filter = SamplingFilter(every=3)
+
+        def record(level: int, msg: str) -> logging.LogRecord:
+            return logging.LogRecord("test", level, __file__, 0, msg, None, None)
+
+        passed = [sampling_filter.filter(record(logging.INFO, "chat.postMessage")) for _ in range(7)]
+        other = sampling_filter.filter(record(logging.INFO, "conversations.history"))
+        warnings = [sampling_filter.filter(record(logging.WARNING, "chat.postMessage")) for _ in range(3)]
+
+        assert passed == [True, False, False, True, False, False, True]
+        assert other is True
+        assert warnings == [True, True, True]
+
+
+class TestMetrics:
+    """Test cases for the in-process metrics registry."""
+
+    def test_render_counter_and_histogram(self) -> None:
+        """Test that counters and cumulative histogram buckets are rendered in the text exposition format."""
+        registry = MetricsRegistry()
+        counter = registry.counter("calls_total", "Calls.", ("route",))
+        histogram = registry.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+        counter.inc("/a")
+        counter.inc("/a")
+        histogram.observe(0.05, "/a")
+        histogram.observe(0.5, "/a")
+        histogram.observe(3.0, "/a")
+
+        lines = registry.render().splitlines()
+
+        assert "# TYPE calls_total counter" in lines
+        assert 'calls_total{route="/a"} 2' in lines
+        assert "# TYPE latency_seconds histogram" in lines
+        assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{route="/a",le="1"} 2' in lines
+        assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+        assert 'latency_seconds_sum{route="/a"} 3.55' in lines
+        assert 'latency_seconds_count{route="/a"} 3' in lines
+
+    def test_label_values_are_escaped(self) -> None:
+        """Test that quotes and backslashes in label values cannot break the exposition format."""
+        registry = MetricsRegistry()
+        registry.counter("calls_total", "Calls.", ("route",)).inc('a"b\\c')
+
+        assert 'calls_total{route="a\\"b\\\\c"} 1' in registry.render()
+
+    def test_observe_records_outcome(self) -> None:
+        """Test that observe counts successful and failed upstream calls separately."""
+        ok_before = upstream_requests_total.value("test", "op", "ok")
+        error_before = upstream_requests_total.value("test", "op", "error")
+
+        with observe("test", "op"):
+            pass
+        with pytest.raises(ValueError), observe("test", "op"):
+            raise ValueError("boom")
+        with observe("test", "op") as call:
+            call.outcome = "error"
+
+        assert upstream_requests_total.value("test", "op", "ok") == ok_before + 1
+        assert upstream_requests_total.value("test", "op", "error") == error_before + 2
+
+
+class TestServerTiming:
+    """Test cases for per-request phase timing."""
+
+    def test_phase_is_noop_outside_a_measured_request(self) -> None:
+        """Test that phases and upstream calls record nothing when no request is being measured."""
+        with server_timing.phase("translate"):
+            pass
+        with observe("spotify", "track"):
+            pass
+
+        assert server_timing.current() is None
+
+    def test_phases_accumulate_across_threads(self) -> None:
+        """Test that phases recorded in worker threads and upstream calls land in the request's timing."""
+
+        def work() -> None:
+            with server_timing.phase("token"):
+                pass
+            with observe("spotify", "track"):
+                pass
+
+        async def run() -> server_timing.RequestTiming:
+            timing, token = server_timing.begin()
+            try:
+                await asyncio.gather(asyncio.to_thread(work), asyncio.to_thread(work))
+            finally:
+                server_timing.end(token)
+            return timing
+
+        timing = asyncio.run(run())
+
+        assert set(timing.phases) == {"token", "spotify"}
+        assert server_timing.current() is None
+
+    def test_header_value_is_in_milliseconds(self) -> None:
+        """Test the Server-Timing header format."""
+        timing = server_timing.RequestTiming(started_at=0.0)
+        timing.add("spotify", 0.0351)
+        timing.add("spotify", 0.001)
+
+        assert timing.header_value(0.05) == "spotify;dur=36.1, total;dur=50.0"
+
+
+class TestInvocationMetrics:
+    """Test cases for the per-invocation embedded metric format log line."""
+
+    def test_handler_emits_one_emf_line_per_invocation(self, capsys: pytest.CaptureFixture[str]) -> None:
+        """Test that upstream calls made during an invocation are summed into a single EMF record."""
+
+        @invocation_metrics.instrument_handler("test")
+        def handler(event: dict, context: dict) -> str:
+            with observe("spotify", "track"):
+                pass
+            with observe("s3", "GetObject") as call:
+                call.outcome = "error"
+            record_upstream_bytes("spotify", 120)
+            return "done"
+
+        with patch.object(invocation_metrics, "_is_cold_start", True):
+            assert handler({}, {}) == "done"
+            handler({}, {})
+
+        first, second = (json.loads(line) for line in capsys.readouterr().out.splitlines())
+        directive = first["_aws"]["CloudWatchMetrics"][0]
+        assert directive["Dimensions"] == [["Handler"]]
+        assert {"Name": "SpotifyCalls", "Unit": "Count"} in directive["Metrics"]
+        assert first["Handler"] == "test"
+        assert first["SpotifyCalls"] == 1
+        assert first["SpotifyBytes"] == 120
+        assert first["S3Calls"] == 1
+        assert first["S3Errors"] == 1
+        assert first["SlackCalls"] == 0
+        assert (first["ColdStart"], second["ColdStart"]) == (1, 0)
+
+    def test_calls_from_worker_threads_are_counted(self, capsys: pytest.CaptureFixture[str]) -> None:
+        """Test that calls made in threads started during the invocation land in its record."""
+
+        def work() -> None:
+            with observe("slack", "chat.postMessage"):
+                pass
+
+        @invocation_metrics.instrument_handler("test")
+        def handler(event: dict, context: dict) -> None:
+            async def run() -> None:
+                await asyncio.gather(asyncio.to_thread(work), asyncio.to_thread(work))
+
+            asyncio.run(run())
+
+        handler({}, {})
+        with observe("slack", "chat.postMessage"):
+            pass
+
+        record = json.loads(capsys.readouterr().out)
+        assert record["SlackCalls"] == 2
+
+
+class TestSamplingProfiler:
+    """Test cases for the per-request sampling profiler."""
+
+    def test_samples_only_threads_serving_the_request(self) -> None:
+        """Test that a thread entered from the request context is sampled and an unrelated busy thread is not."""
+        entered = threading.Barrier(3)
+        release = threading.Event()
+
+        def request_work() -> None:
+            profiler = profiling.enter_thread()
+            entered.wait()
+            release.wait()
+            profiling.exit_thread(profiler)
+
+        def unrelated_work() -> None:
+            entered.wait()
+            release.wait()
+
+        # Treat this test file as the package so its frames pass the package filter.
+        profiler = profiling.SamplingProfiler(interval=60)
+        with patch("util.profiling.PACKAGE_DIR", str(Path(__file__).parent)):
+            profiler.start()
+            threads = [
+                threading.Thread(target=contextvars.copy_context().run, args=(request_work,)),
+                threading.Thread(target=unrelated_work),
+            ]
+            try:
+                for thread in threads:
+                    thread.start()
+                entered.wait()
+                profiler.sample()
+            finally:
+                release.set()
+                for thread in threads:
+                    thread.join()
+                profiler.stop()
+
+        functions = {label.split(" ")[0] for stack in profiler.stacks for label in stack}
+        assert any(function.endswith("request_work") for function in functions)
+        assert not any(function.endswith("unrelated_work") for function in functions)
+
+    def test_samples_only_tasks_and_to_thread_work_of_the_request(self) -> None:
+        """Test that tasks and to_thread work started by the request are sampled and a concurrent task is not."""
+
+        def unrelated_task_work() -> None:
+            time.sleep(0.05)
+
+        def child_task_work() -> None:
+            time.sleep(0.05)
+
+        def to_thread_work() -> None:
+            time.sleep(0.05)
+
+        async def unrelated_task() -> None:
+            unrelated_task_work()
+
+        async def child_task() -> None:
+            child_task_work()
+
+        async def request() -> profiling.SamplingProfiler:
+            profiling.instrument_loop(asyncio.get_running_loop())
+            # Created before profiling starts, like a concurrent request or a background task.
+            unrelated = asyncio.create_task(unrelated_task())
+            profiler = profiling.SamplingProfiler(interval=0.002)
+            profiler.start()
+            try:
+                await asyncio.gather(child_task(), asyncio.to_thread(to_thread_work), unrelated)
+            finally:
+                profiler.stop()
+            return profiler
+
+        # Treat this test file as the package so its frames pass the package filter.
+        with patch("util.profiling.PACKAGE_DIR", str(Path(__file__).parent)):
+            profiler = asyncio.run(request())
+
+        functions = {label.split(" ")[0] for stack in profiler.stacks for label in stack}
+        assert any(function.endswith("child_task_work") for function in functions)
+        assert any(function.endswith("to_thread_work") for function in functions)
+        assert not any(function.endswith("unrelated_task_work") for function in functions)
+
+
+class TestMemoryTracking:
+    """Test cases for the tracemalloc-based memory report."""
+
+    def test_deep_sizeof_counts_shared_objects_once(self) -> None:
+        """Test that nested containers are counted and shared values are not double counted."""
+        markets = [f"market{i}" for i in range(100)]
+        one = deep_sizeof({"a": markets})
+        shared = deep_sizeof({"a": markets, "b": markets})
+        copy = list(markets)
+        copied = deep_sizeof({"a": markets, "b": copy})
+
+        assert one > sys.getsizeof(markets)
+        assert shared - one < sys.getsizeof(markets)
+        assert copied - shared == sys.getsizeof(copy)
+
+    def test_report_every_n_requests_includes_cache_sizes(self) -> None:
+        """Test that a report comes every N requests with allocation sites and registered cache sizes."""
+        cache = TTLLRUCache(max_size=10, ttl_seconds=60, negative_ttl_seconds=60)
+        register_cache("test", cache)
+        tracker = MemoryTracker(report_every=3)
+        tracker.start()
+        try:
+            reports = []
+            for i in range(6):
+                cache.set(f"key{i}", [str(i) * 1000])
+                reports.append(tracker.on_request())
+        finally:
+            tracker.stop()
+
+        assert [report is not None for report in reports] == [False, False, True, False, False, True]
+        report = reports[-1]
+        assert report is not None
+        assert report.requests == 6
+        assert report.top_allocations
+        assert report.cache_sizes["test"] > 6 * 1000